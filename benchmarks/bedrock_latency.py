@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Bedrock latency benchmark
+Runs analyze_finding_with_ai against a fake model provider with heavy-tailed
+latency and reports p50/p90/p99, with and without request hedging.
+
+No AWS calls are made; only boto3 needs to be installed.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-2')
+os.environ.setdefault('ANALYSIS_STORE_PATH', ':memory:')
+
+import chatbot  # noqa: E402
+from hedging import HedgedCaller  # noqa: E402
+from providers import FakeProvider  # noqa: E402
+from ratelimit import BedrockRateLimiter  # noqa: E402
+
+SAMPLE_FINDING = {
+    'Id': 'arn:aws:securityhub:ap-southeast-2:123456789012:finding/bench',
+    'Title': 'Security groups should not allow ingress from 0.0.0.0/0 to port 22',
+    'Description': 'This control checks whether security groups allow unrestricted incoming traffic on port 22.',
+    'Severity': {'Label': 'HIGH'},
+    'Compliance': {'Status': 'FAILED', 'SecurityControlId': 'EC2.13'},
+    'Resources': [{'Id': 'arn:aws:ec2:ap-southeast-2:123456789012:security-group/sg-0123456789abcdef0',
+                   'Type': 'AwsEc2SecurityGroup', 'Region': 'ap-southeast-2'}]
+}
+
+SAMPLE_ANALYSIS = {
+    'remediation_action': 'revoke_sg_rule',
+    'ssm_document': 'SecurityHub-RemediateUnrestrictedSSH-dev',
+    'parameters': {},
+    'explanation': 'Port 22 is open to the internet; revoke the 0.0.0.0/0 rule.',
+    'severity_assessment': 'HIGH',
+    'automated': True
+}
+
+
+class HeavyTailLatency:
+    """Log-normal latency with occasional slow outliers"""
+
+    def __init__(self, median: float, tail_probability: float, tail_factor: float):
+        self.median = median
+        self.tail_probability = tail_probability
+        self.tail_factor = tail_factor
+
+    def __call__(self) -> float:
+        latency = random.lognormvariate(0, 0.25) * self.median
+        if random.random() < self.tail_probability:
+            latency *= self.tail_factor
+        return latency
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run(bot, requests: int, concurrency: int):
+    def one(_):
+        start = time.perf_counter()
+        bot.analyze_finding_with_ai(SAMPLE_FINDING, 'Fix unrestricted SSH access')
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(requests)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--median', type=float, default=0.05, help='median model latency in seconds')
+    parser.add_argument('--tail-probability', type=float, default=0.05)
+    parser.add_argument('--tail-factor', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    latency = HeavyTailLatency(args.median, args.tail_probability, args.tail_factor)
+    limiter = BedrockRateLimiter(requests_per_minute=1000000, tokens_per_minute=1000000000)
+
+    print(f"{'mode':<10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'extra calls':>12}")
+    for mode in ('baseline', 'hedged'):
+        random.seed(args.seed)
+        hedger = HedgedCaller() if mode == 'hedged' else None
+        bot = chatbot.SecurityHubChatbot()
+        bot.provider = FakeProvider(lambda request: json.dumps(SAMPLE_ANALYSIS), latency,
+                                    limiter=limiter, hedger=hedger)
+
+        latencies = run(bot, args.requests, args.concurrency)
+        extra = hedger.stats()['hedges'] if hedger else 0
+        print(f"{mode:<10} {percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 90) * 1000:>8.1f} "
+              f"{percentile(latencies, 99) * 1000:>8.1f} {extra:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Model routing benchmark
+Triages a synthetic finding mix, routes the findings that need AI through
+ModelRouter and runs analyze_finding_with_ai against a fake provider with
+per-model latency. Reports per-model decisions and latency from
+ModelRouter.stats() next to a single-model baseline.
+
+No AWS calls are made; only boto3 needs to be installed.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-2')
+os.environ.setdefault('ANALYSIS_STORE_PATH', ':memory:')
+
+import chatbot  # noqa: E402
+from providers import FakeProvider  # noqa: E402
+from router import HAIKU_MODEL_ID, SONNET_MODEL_ID, TITAN_MODEL_ID, ModelRouter  # noqa: E402
+from triage import NEEDS_AI, classify_finding  # noqa: E402
+
+# Median seconds per call, scaled by --scale
+MODEL_LATENCY = {HAIKU_MODEL_ID: 2.0, SONNET_MODEL_ID: 6.0, TITAN_MODEL_ID: 3.5}
+
+FINDING_SHAPES = [
+    ('Network ACLs should not allow ingress from 0.0.0.0/0 to port 22 or port 3389', 'EC2.21',
+     'AwsEc2NetworkAcl'),
+    ('IAM policies should not allow full "*" administrative privileges', 'IAM.1', 'AwsIamPolicy'),
+    ('S3 general purpose buckets should block public access', 'S3.8', 'AwsS3Bucket'),
+    ('EC2 instances should not have a public IPv4 address', 'EC2.9', 'AwsEc2Instance'),
+    ('Unusual API activity from an unfamiliar principal', None, 'AwsIamRole'),
+    ('Instance role can read every secret in the account', None, 'AwsIamRole'),
+]
+LABELS = ['CRITICAL', 'HIGH', 'MEDIUM']
+
+SAMPLE_ANALYSIS = {
+    'remediation_action': 'manual_review',
+    'ssm_document': None,
+    'parameters': {},
+    'explanation': 'Review the finding and apply the documented remediation.',
+    'severity_assessment': 'HIGH',
+    'automated': False
+}
+
+
+def synthetic_findings(count: int):
+    findings = []
+    for i in range(count):
+        title, control, resource_type = random.choice(FINDING_SHAPES)
+        compliance = {'Status': 'FAILED'}
+        if control:
+            compliance['SecurityControlId'] = control
+        findings.append({
+            'Id': f'finding-{i}',
+            'Title': title,
+            'Severity': {'Label': random.choice(LABELS)},
+            'Compliance': compliance,
+            'Resources': [{'Id': f'resource-{i}', 'Type': resource_type}]
+        })
+    return findings
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def respond(scale: float):
+    def responder(request):
+        median = MODEL_LATENCY.get(request['modelId'], 3.0) * scale
+        time.sleep(random.lognormvariate(0, 0.25) * median)
+        return json.dumps(SAMPLE_ANALYSIS)
+    return responder
+
+
+def run(bot, findings, routed: bool, budget: float):
+    latencies = []
+    start = time.perf_counter()
+    for finding in findings:
+        model_id = bot.model_id
+        if routed:
+            model_id, _ = bot.router.choose(finding, remaining_budget=budget - (time.perf_counter() - start))
+        call_start = time.perf_counter()
+        bot.analyze_finding_with_ai(finding, 'How do I fix this?', model_id=model_id)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--findings', type=int, default=200)
+    parser.add_argument('--scale', type=float, default=0.005, help='fraction of real model latency to sleep')
+    parser.add_argument('--budget', type=float, default=None, help='latency budget in seconds for the run')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    findings = [f for f in synthetic_findings(args.findings)
+                if classify_finding(f, 'dev')['classification'] == NEEDS_AI]
+    budget = args.budget if args.budget is not None else float('inf')
+
+    print(f"findings needing AI: {len(findings)} of {args.findings}")
+    print(f"{'mode':<10} {'p50 ms':>8} {'p90 ms':>8} {'total s':>8}")
+    stats = None
+    for mode in ('sonnet', 'routed'):
+        random.seed(args.seed)
+        bot = chatbot.SecurityHubChatbot()
+        bot.model_id = SONNET_MODEL_ID
+        bot.structured_output = False
+        bot.router = ModelRouter()
+        # Priors on the same scale as the simulated latency
+        for model_id in bot.router.models:
+            bot.router._latency[model_id] *= args.scale
+        bot.provider = FakeProvider(respond(args.scale))
+
+        latencies = run(bot, findings, mode == 'routed', budget)
+        print(f"{mode:<10} {percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 90) * 1000:>8.1f} "
+              f"{sum(latencies):>8.2f}")
+        if mode == 'routed':
+            stats = bot.router.stats()
+
+    print()
+    print(f"{'decision':<56} {'count':>6}")
+    for decision, count in sorted(stats['decisions'].items(), key=lambda item: -item[1]):
+        print(f"{decision:<56} {count:>6}")
+    print()
+    print(f"{'model':<56} {'ewma ms':>8}")
+    for model_id, seconds in stats['latency_ewma'].items():
+        print(f"{model_id:<56} {seconds * 1000:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Output token benchmark
+Compares the full and compact analysis response modes. The fake model's
+latency grows with the number of output tokens it generates, as real
+generation does, so the table shows both token and latency savings.
+
+No AWS calls are made; only boto3 needs to be installed.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-2')
+os.environ.setdefault('ANALYSIS_STORE_PATH', ':memory:')
+
+import chatbot  # noqa: E402
+from providers import FakeProvider  # noqa: E402
+from bedrock_latency import SAMPLE_FINDING  # noqa: E402
+
+FULL_ANSWER = {
+    'remediation_action': 'revoke_sg_rule',
+    'ssm_document': 'SecurityHub-RemediateUnrestrictedSSH-dev',
+    'parameters': {'SecurityGroupId': 'sg-0123456789abcdef0'},
+    'explanation': ('The security group permits inbound SSH on port 22 from 0.0.0.0/0, exposing any attached '
+                    'instance to brute-force attempts from the internet. Revoking the rule closes the exposure; '
+                    'administrators should use Session Manager or a restricted CIDR instead.'),
+    'severity_assessment': 'High risk: internet-reachable administrative port on a production security group.',
+    'automated': True
+}
+
+COMPACT_ANSWER = {'a': 'RSG', 'd': 'SSH', 'r': 'H', 'w': 'Port 22 open to the internet'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--ms-per-output-token', type=float, default=8.0)
+    parser.add_argument('--base-ms', type=float, default=150.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'output tokens':>14} {'mean ms':>9}")
+    for mode, answer in (('full', FULL_ANSWER), ('compact', COMPACT_ANSWER)):
+        text = json.dumps(answer)
+
+        def responder(request, text=text):
+            output_tokens = len(text) // 4
+            time.sleep((args.base_ms + output_tokens * args.ms_per_output_token) / 1000.0)
+            return {'text': text, 'usage': {'input_tokens': 0, 'output_tokens': output_tokens,
+                                            'cache_read_input_tokens': 0, 'cache_write_input_tokens': 0}}
+
+        os.environ['ANALYSIS_RESPONSE_MODE'] = mode
+        os.environ['STRUCTURED_OUTPUT'] = 'off'
+        bot = chatbot.SecurityHubChatbot()
+        bot.provider = FakeProvider(responder)
+
+        tokens = 0
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            analysis = bot.analyze_finding_with_ai(SAMPLE_FINDING, 'Fix unrestricted SSH access')
+            assert not analysis.get('degraded'), analysis
+            tokens += analysis['usage']['output_tokens']
+        elapsed = time.perf_counter() - start
+        print(f"{mode:<10} {tokens / args.requests:>14.1f} {elapsed / args.requests * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Prioritization benchmark
+Times feature extraction, vectorized scoring and top-k selection over a
+large synthetic finding set.
+
+No AWS calls are made; only numpy needs to be installed.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from prioritize import extract_features, score_features, top_k  # noqa: E402
+
+LABELS = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW', 'INFORMATIONAL']
+TAGS = [{}, {'Environment': 'prod'}, {'Environment': 'dev'}, {'criticality': 'high'}]
+
+
+def synthetic_findings(count: int):
+    now = datetime.now(timezone.utc)
+    findings = []
+    for i in range(count):
+        findings.append({
+            'Id': f'finding-{i}',
+            'Title': random.choice(['Port 22 open to 0.0.0.0/0', 'S3 bucket logging disabled',
+                                    'IAM policy allows full admin', 'Public snapshot']),
+            'Severity': {'Label': random.choice(LABELS)},
+            'FirstObservedAt': (now - timedelta(days=random.randint(0, 365))).isoformat(),
+            'Compliance': {'Status': random.choice(['FAILED', 'PASSED', 'WARNING'])},
+            'Resources': [{'Type': 'AwsEc2SecurityGroup', 'Tags': random.choice(TAGS)}]
+        })
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--findings', type=int, default=100000)
+    parser.add_argument('--top', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(7)
+    findings = synthetic_findings(args.findings)
+
+    start = time.perf_counter()
+    features = extract_features(findings)
+    extract_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        scores = score_features(features)
+        best = top_k(scores, args.top)
+    score_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+    print(f"findings:            {args.findings}")
+    print(f"feature extraction:  {extract_ms:.1f} ms")
+    print(f"score + top-{args.top}:       {score_ms:.2f} ms")
+    print(f"top findings:        {[findings[i]['Title'] for i in best]}")
+
+
+if __name__ == '__main__':
+    main()
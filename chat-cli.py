@@ -12,6 +12,11 @@ from datetime import datetime
 
 # Configuration
 API_ENDPOINT = "https://cxwxf8coz6.execute-api.ap-southeast-2.amazonaws.com/dev/chat"
+# Function URL of the streaming endpoint (StreamEndpoint stack output); empty uses API_ENDPOINT
+STREAM_ENDPOINT = ""
+
+# Conversation session, so follow-ups like "fix number 2" reuse earlier findings
+SESSION_ID = None
 
 def format_response(response_data):
     """Format the JSON response into human-readable text"""
@@ -38,7 +43,7 @@ def format_response(response_data):
         print("-" * 60)
         
         for i, rem in enumerate(remediations, 1):
-            status_icon = "✅" if rem.get('execution', {}).get('status') == 'success' else "⚠️"
+            status_icon = {"success": "✅", "submitted": "⏳"}.get((rem.get('execution') or {}).get('status'), "⚠️")
             severity_icon = {"CRITICAL": "🔴", "HIGH": "🟠", "MEDIUM": "🟡", "LOW": "🟢"}.get(rem.get('severity', ''), "⚪")
             
             print(f"\n{i}. {status_icon} {rem.get('finding_title', 'Unknown Finding')}")
@@ -68,8 +73,9 @@ def format_response(response_data):
 
 def send_query(message):
     """Send query to the API and return response"""
+    global SESSION_ID
     try:
-        payload = {"message": message}
+        payload = {"message": message, "session_id": SESSION_ID}
         response = requests.post(
             API_ENDPOINT,
             headers={"Content-Type": "application/json"},
@@ -77,7 +83,15 @@ def send_query(message):
             timeout=30
         )
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        
+        # Oversized responses are returned as a link to the stored result
+        if 'result_url' in data:
+            stored = requests.get(data['result_url'], timeout=30)
+            stored.raise_for_status()
+            data = stored.json()
+        SESSION_ID = data.get('session_id') or SESSION_ID
+        return data
     
     except requests.exceptions.RequestException as e:
         print(f"❌ Error connecting to API: {e}")
@@ -86,6 +100,79 @@ def send_query(message):
         print(f"❌ Error parsing response: {e}")
         return None
 
+def print_event(event, titles):
+    """Print one streamed event as soon as it arrives"""
+    stage = event.get('stage')
+    
+    if stage == 'findings':
+        print(f"\n📋 Found {event.get('findings_count', 0)} findings:")
+        for i, finding in enumerate(event.get('findings', []), 1):
+            titles[finding['finding_id']] = finding.get('finding_title', 'Unknown Finding')
+            severity_icon = {"CRITICAL": "🔴", "HIGH": "🟠", "MEDIUM": "🟡", "LOW": "🟢"}.get(finding.get('severity', ''), "⚪")
+            print(f"   {i}. {severity_icon} {titles[finding['finding_id']]}")
+        print()
+    elif stage == 'analysis':
+        analysis = event.get('analysis') or {}
+        action = "🤖 Automated remediation" if analysis.get('automated') else "👤 Manual review required"
+        print(f"🔍 {titles.get(event['finding_id'], event['finding_id'])}: {event.get('status', '')}")
+        print(f"   Action: {action}")
+        if analysis.get('explanation'):
+            print(f"   Issue: {analysis['explanation']}")
+    elif stage == 'remediation':
+        execution = event.get('execution') or {}
+        icon = {"success": "✅", "submitted": "⏳"}.get(execution.get('status'), "❌")
+        print(f"   Result: {icon} {execution.get('message', execution.get('status', ''))}")
+    elif stage == 'done':
+        if event.get('follow_up'):
+            print(f"\n💬 {event.get('response', '')}")
+        print("\n" + "="*60)
+        print(f"📊 SUMMARY: {event.get('findings_count', 0)} analyzed, "
+              f"{event.get('automated_count', 0)} automatically remediated, "
+              f"{event.get('manual_count', 0)} require manual review")
+        print(f"⏰ Analysis completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print("="*60 + "\n")
+    elif stage == 'error':
+        print(f"❌ Error: {event.get('error')}")
+
+def stream_query(message):
+    """Send query to the streaming endpoint, printing events as they arrive"""
+    global SESSION_ID
+    try:
+        response = requests.post(
+            STREAM_ENDPOINT,
+            headers={"Content-Type": "application/json"},
+            json={"message": message, "session_id": SESSION_ID},
+            stream=True,
+            timeout=(10, 120)
+        )
+        response.raise_for_status()
+        
+        titles = {}
+        last_stage = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                event = json.loads(line)
+                last_stage = event.get('stage')
+                SESSION_ID = event.get('session_id') or SESSION_ID
+                print_event(event, titles)
+        return last_stage == 'done'
+    
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error connecting to API: {e}")
+        return False
+    except json.JSONDecodeError as e:
+        print(f"❌ Error parsing response: {e}")
+        return False
+
+def run_query(message):
+    """Run one query, streamed when a stream endpoint is set; returns True on success"""
+    if STREAM_ENDPOINT:
+        return stream_query(message)
+    response = send_query(message)
+    if response:
+        format_response(response)
+    return response is not None
+
 def interactive_mode():
     """Run in interactive chat mode"""
     print("🛡️  Security Hub AI Chatbot")
@@ -104,11 +191,7 @@ def interactive_mode():
                 continue
             
             print("\n⏳ Analyzing security findings...")
-            response = send_query(message)
-            
-            if response:
-                format_response(response)
-            else:
+            if not run_query(message):
                 print("❌ Failed to get response. Please try again.")
                 
         except KeyboardInterrupt:
@@ -118,6 +201,7 @@ def interactive_mode():
             print(f"❌ Unexpected error: {e}")
 
 def main():
+    global API_ENDPOINT, STREAM_ENDPOINT
     parser = argparse.ArgumentParser(
         description="Security Hub AI Chatbot CLI",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -141,19 +225,22 @@ Examples:
         help='API endpoint URL'
     )
     
+    parser.add_argument(
+        '--stream-endpoint',
+        default=STREAM_ENDPOINT,
+        help='Streaming Function URL; results are printed as each stage completes'
+    )
+    
     args = parser.parse_args()
     
     # Update global endpoint if provided
-    global API_ENDPOINT
     API_ENDPOINT = args.endpoint
+    STREAM_ENDPOINT = args.stream_endpoint
     
     if args.message:
         # Single query mode
         print("⏳ Analyzing security findings...")
-        response = send_query(args.message)
-        if response:
-            format_response(response)
-        else:
+        if not run_query(args.message):
             sys.exit(1)
     else:
         # Interactive mode
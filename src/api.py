@@ -1,10 +1,114 @@
+import os
 import json
+import base64
 import boto3
 from chatbot import SecurityHubChatbot
+from jobs import dispatch_job, get_job_store, run_job
+from objectstore import get_object_store
+from payload import InvalidCursor, encode_response, paginate, parse_fields, project
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Content-Type': 'application/json'
+}
+
+
+def run_job_worker(job_id):
+    """Process a queued job with a chatbot configured for large analyses"""
+    chatbot = SecurityHubChatbot()
+    chatbot.max_findings = int(os.environ.get('ASYNC_MAX_FINDINGS', '50'))
+    chatbot.ai_budget = int(os.environ.get('ASYNC_AI_ANALYSIS_BUDGET', '20'))
+    chatbot.summary_read_seconds = float(os.environ.get('ASYNC_SUMMARY_READ_SECONDS', '300'))
+    return run_job(job_id, get_job_store(chatbot.region), chatbot)
+
+
+def respond(status_code, body, event):
+    """JSON response, gzipped when the client accepts it and spilled to S3 when too large"""
+    return encode_response(
+        status_code, body, CORS_HEADERS, event,
+        get_object_store(os.environ.get('AWS_REGION')),
+        spill_bytes=int(os.environ.get('RESPONSE_SPILL_BYTES', str(1024 * 1024)))
+    )
+
+
+def get_job(job_id, event):
+    """GET /chat/{job_id}: current state of an asynchronous job"""
+    jobs = get_job_store(os.environ.get('AWS_REGION'))
+    job = jobs.get(job_id)
+    if job is None:
+        return {
+            'statusCode': 404,
+            'headers': CORS_HEADERS,
+            'body': json.dumps({'error': f'Job {job_id} not found'})
+        }
+    # The item only points at the result; load it so clients still get it inline (or spilled when large)
+    return respond(200, dict(job, result=jobs.result(job)), event)
+
+
+def remediation_status(event):
+    """GET /remediations?finding_ids=a,b: tracked outcome of submitted remediations"""
+    params = event.get('queryStringParameters') or {}
+    finding_ids = [f.strip() for f in params.get('finding_ids', '').split(',') if f.strip()]
+    if not finding_ids:
+        return {
+            'statusCode': 400,
+            'headers': CORS_HEADERS,
+            'body': json.dumps({'error': 'finding_ids is required'})
+        }
+    
+    chatbot = SecurityHubChatbot()
+    # Poll once now; the background tracker thread is frozen once this response returns
+    records = chatbot.tracker.status(finding_ids, refresh=True)
+    return respond(200, {
+        'remediations': {finding_id: records.get(finding_id) for finding_id in finding_ids},
+        'tracking': chatbot.tracker.stats()
+    }, event)
+
+
+def chat(message, options, event, context):
+    """POST /chat: run the message and return one page of projected remediations"""
+    fields = parse_fields(options.get('fields'))
+    limit = int(options['limit']) if options.get('limit') is not None else None
+    cursor = options.get('cursor')
+    
+    # Later pages come from the stored result of the first request
+    result = {} if cursor else SecurityHubChatbot().process_session_message(message, options.get('session_id'))
+    result, next_cursor = paginate(result, limit, cursor, get_object_store(os.environ.get('AWS_REGION')))
+    
+    body = {
+        'message': result.get('response'),
+        'findings_count': result.get('findings_count', 0),
+        'remediations': [project(rem, fields) for rem in result.get('remediations', [])],
+        'session_id': result.get('session_id'),
+        'timestamp': context.aws_request_id
+    }
+    if next_cursor:
+        body['next_cursor'] = next_cursor
+    return respond(200, body, event)
+
+
+def start_job(message, context):
+    """POST /chat with "async": true: queue the message and return its job id straight away"""
+    job = get_job_store(os.environ.get('AWS_REGION')).create(message)
+    dispatch_job(job['job_id'], getattr(context, 'function_name', None), run_job_worker)
+    return {
+        'statusCode': 202,
+        'headers': CORS_HEADERS,
+        'body': json.dumps({
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'status_url': f"/chat/{job['job_id']}"
+        })
+    }
+
 
 def lambda_handler(event, context):
     """API Gateway handler for chatbot interactions"""
     
+    # Asynchronous self-invocation carrying a queued job
+    if 'job_id' in event and 'httpMethod' not in event:
+        return run_job_worker(event['job_id'])
+    
     # Handle CORS preflight
     if event['httpMethod'] == 'OPTIONS':
         return {
@@ -17,28 +121,32 @@ def lambda_handler(event, context):
         }
     
     try:
-        # Parse request body
-        body = json.loads(event.get('body', '{}'))
+        if event['httpMethod'] == 'GET' and event.get('path', '').endswith('/remediations'):
+            return remediation_status(event)
+        if event['httpMethod'] == 'GET':
+            return get_job((event.get('pathParameters') or {}).get('job_id', ''), event)
+        
+        # Parse request body (base64 encoded because the API allows binary media types)
+        raw_body = event.get('body') or '{}'
+        if event.get('isBase64Encoded'):
+            raw_body = base64.b64decode(raw_body).decode('utf-8')
+        body = json.loads(raw_body)
         message = body.get('message', 'Show me security findings that need remediation')
         
-        # Initialize chatbot
-        chatbot = SecurityHubChatbot()
-        result = chatbot.process_chat_message(message)
+        if body.get('async'):
+            return start_job(message, context)
+        # fields / limit / cursor may come from the body or the query string
+        options = dict(event.get('queryStringParameters') or {}, **{
+            k: body[k] for k in ('fields', 'limit', 'cursor', 'session_id') if body.get(k) is not None
+        })
+        return chat(message, options, event, context)
         
+    except (InvalidCursor, ValueError) as e:
         return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Content-Type': 'application/json'
-            },
-            'body': json.dumps({
-                'message': result['response'],
-                'findings_count': result['findings_count'],
-                'remediations': result.get('remediations', []),
-                'timestamp': context.aws_request_id
-            })
+            'statusCode': 400,
+            'headers': CORS_HEADERS,
+            'body': json.dumps({'error': str(e), 'message': 'Invalid request'})
         }
-        
     except Exception as e:
         return {
             'statusCode': 500,
@@ -0,0 +1,90 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger()
+
+
+class MicroBatcher:
+    """Collects requests for a few milliseconds and runs them as one batch.
+
+    Requests with the same key share a single future, whether the
+    duplicate is still waiting for its batch or already running. The
+    first submission in an empty window starts a short-lived collector
+    thread that waits at most `max_wait` seconds (less if `max_batch`
+    requests arrive) before calling `batch_fn({key: item})`, which must
+    return `{key: result}`; results and errors are fanned back out to
+    every waiting caller.
+    """
+
+    def __init__(self, batch_fn: Callable[[Dict[Hashable, Any]], Dict[Hashable, Any]],
+                 max_wait: float = 0.005, max_batch: int = 16):
+        self.batch_fn = batch_fn
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._pending: Dict[Hashable, tuple] = {}
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._collecting = False
+        self.submitted = 0
+        self.deduplicated = 0
+        self.batches = 0
+
+    def submit(self, key: Hashable, item: Any) -> Future:
+        """Queue an item for the next batch, or join an identical queued/running one"""
+        with self._cond:
+            self.submitted += 1
+            existing = self._pending.get(key)
+            future = existing[1] if existing else self._in_flight.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+
+            future = Future()
+            self._pending[key] = (item, future)
+            if not self._collecting:
+                self._collecting = True
+                threading.Thread(target=self._collect, name='micro-batcher', daemon=True).start()
+            elif len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+            return future
+
+    def _collect(self):
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending, {}
+            for key, (_, future) in batch.items():
+                self._in_flight[key] = future
+            self._collecting = False
+            self.batches += 1
+
+        logger.info(f"Running micro-batch of {len(batch)} unique requests")
+        try:
+            results = self.batch_fn({key: item for key, (item, _) in batch.items()})
+            error: Optional[Exception] = None
+        except Exception as e:
+            logger.error(f"Micro-batch failed: {str(e)}")
+            results, error = {}, e
+
+        with self._cond:
+            for key in batch:
+                self._in_flight.pop(key, None)
+
+        for key, (_, future) in batch.items():
+            if error is not None:
+                future.set_exception(error)
+            elif key in results:
+                future.set_result(results[key])
+            else:
+                future.set_exception(KeyError(f"No result returned for batch key {key!r}"))
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {'submitted': self.submitted, 'deduplicated': self.deduplicated, 'batches': self.batches}
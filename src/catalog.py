@@ -0,0 +1,132 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# Documents shipped in template.yaml; REMEDIATION_DOCUMENTS overrides the list
+DEFAULT_DOCUMENTS = (
+    'SecurityHub-RemediateUnrestrictedSSH-{environment}',
+    'SecurityHub-RemediateUnrestrictedRDP-{environment}',
+    'SecurityHub-RemediateUnrestrictedPorts-{environment}',
+)
+
+
+# A schema that failed to load is retried after this many seconds instead of the full TTL
+FAILED_RETRY_SECONDS = 30.0
+
+
+class InvalidRemediation(ValueError):
+    """A remediation that would be rejected by Systems Manager"""
+
+
+def parse_parameters(content: str) -> Dict[str, Dict]:
+    """Parameter schemas from the JSON content of an SSM document"""
+    schemas = {}
+    for name, spec in (json.loads(content).get('parameters') or {}).items():
+        pattern = spec.get('allowedPattern')
+        schemas[name] = {
+            'type': spec.get('type', 'String'),
+            'required': 'default' not in spec,
+            'pattern': re.compile(pattern) if pattern else None,
+            'allowed_values': [str(v) for v in spec['allowedValues']] if spec.get('allowedValues') else None
+        }
+    return schemas
+
+
+class DocumentCatalog:
+    """Remediation documents and their parameter schemas, loaded once per container.
+
+    Each configured document is read with GetDocument (JSON format) the
+    first time it is needed and cached for `ttl_seconds`. validate()
+    checks a document name and its parameters against the cached schema
+    before any command is sent. A schema that could not be loaded is
+    retried after `failed_retry_seconds`, and until then commands for
+    that document are refused.
+    """
+
+    def __init__(self, ssm: Any, names: List[str], ttl_seconds: float = 3600.0,
+                 failed_retry_seconds: float = FAILED_RETRY_SECONDS):
+        self.ssm = ssm
+        self.names = list(names)
+        self.ttl_seconds = ttl_seconds
+        self.failed_retry_seconds = failed_retry_seconds
+        self._schemas: Optional[Dict[str, Dict]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def schemas(self) -> Dict[str, Optional[Dict]]:
+        """Parameter schema per document; None for documents whose schema is unavailable"""
+        with self._lock:
+            ttl = self.ttl_seconds
+            if self._schemas is not None and None in self._schemas.values():
+                ttl = min(ttl, self.failed_retry_seconds)
+            if self._schemas is None or time.monotonic() - self._loaded_at > ttl:
+                self._schemas = self._load()
+                self._loaded_at = time.monotonic()
+            return self._schemas
+
+    def _load(self) -> Dict[str, Optional[Dict]]:
+        schemas: Dict[str, Optional[Dict]] = {}
+        for name in self.names:
+            try:
+                document = self.ssm.get_document(Name=name, DocumentFormat='JSON')
+                schemas[name] = parse_parameters(document['Content'])
+            except ClientError as e:
+                error_code = e.response['Error']['Code']
+                if error_code == 'InvalidDocument':
+                    logger.warning(f"Remediation document {name} is not deployed")
+                    continue
+                logger.error(f"Error loading remediation document {name}: {error_code}")
+                schemas[name] = None
+            except (KeyError, ValueError) as e:
+                logger.error(f"Unreadable remediation document {name}: {str(e)}")
+                schemas[name] = None
+        logger.info(f"Loaded {sum(s is not None for s in schemas.values())} remediation document schemas")
+        return schemas
+
+    def validate(self, document: str, parameters: Dict) -> Dict[str, str]:
+        """Return the parameters as strings, or raise InvalidRemediation"""
+        schemas = self.schemas()
+        if document not in schemas:
+            raise InvalidRemediation(f"Unknown remediation document: {document}")
+        values = {name: str(value) for name, value in parameters.items()}
+        schema = schemas[document]
+        if schema is None:
+            # Fail closed: without the schema the parameters cannot be checked
+            raise InvalidRemediation(f"Parameter schema for {document} is unavailable; try again shortly")
+
+        unknown = sorted(set(values) - set(schema))
+        if unknown:
+            raise InvalidRemediation(f"{document} does not accept parameters: {', '.join(unknown)}")
+        for name, spec in schema.items():
+            if name not in values:
+                if spec['required']:
+                    raise InvalidRemediation(f"{document} requires parameter {name}")
+                continue
+            if spec['allowed_values'] is not None and values[name] not in spec['allowed_values']:
+                raise InvalidRemediation(f"{name}={values[name]!r} is not an allowed value for {document}")
+            if spec['pattern'] is not None and not spec['pattern'].search(values[name]):
+                raise InvalidRemediation(f"{name}={values[name]!r} does not match {spec['pattern'].pattern}")
+        return values
+
+
+_catalog: Optional[DocumentCatalog] = None
+
+
+def get_document_catalog(ssm: Any, environment: str) -> DocumentCatalog:
+    """Return the per-container document catalog"""
+    global _catalog
+    if _catalog is None:
+        configured = os.environ.get('REMEDIATION_DOCUMENTS', '')
+        names = ([name.strip() for name in configured.split(',') if name.strip()] or
+                 [name.format(environment=environment) for name in DEFAULT_DOCUMENTS])
+        _catalog = DocumentCatalog(ssm, names,
+                                   ttl_seconds=float(os.environ.get('DOCUMENT_CATALOG_TTL_SECONDS', '3600')))
+    return _catalog
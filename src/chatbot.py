@@ -1,14 +1,85 @@
 import json
 import boto3
+import numpy as np
 import os
+import time
 import logging
-from typing import Dict, List, Any, Optional
+from functools import partial
+from itertools import islice
+from typing import Dict, List, Any, Callable, Iterator, Optional
 from botocore.exceptions import ClientError, NoCredentialsError
 
+from batching import MicroBatcher
+from catalog import InvalidRemediation, get_document_catalog
+from compact import COMPACT_MAX_TOKENS, COMPACT_SCHEMA, expand_compact, validate_compact
+from executor import get_remediation_executor
+from hedging import get_hedged_caller
+from ledger import get_remediation_ledger, ledger_key
+from planner import apply_preflight, document_port, plan_remediations, security_group_id
+from prioritize import load_weights, prioritize_findings, top_k
+from prompts import (
+    DEFAULT_TOKEN_BUDGET, build_finding_message, build_system_prompt,
+    estimate_tokens, prompt_caching_minimum, supports_prompt_caching
+)
+from providers import get_model_provider
+from ratelimit import get_bedrock_limiter
+from router import get_model_router
+from schema import (
+    REMEDIATION_SCHEMA, parse_remediation, remediation_tool_config,
+    repair_instructions, repair_turns, supports_tool_use, validate_remediation
+)
+from sessions import get_session_store, is_fix_request, resolve_reference
+from sgcache import get_security_group_cache
+from singleflight import SingleFlight, request_key
+from store import ANALYSIS, REMEDIATION, finding_fingerprint, get_analysis_store
+from summarize import aggregate_findings, is_summary_request, summarize_groups
+from tracker import SUBMITTED, SUCCESS, get_remediation_tracker
+from triage import AUTO_REMEDIABLE, KNOWN_MANUAL, NEEDS_AI, classify_finding
+from workflow import ALREADY_REMEDIATED_NOTE, finding_identifier, get_workflow_updater
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+TRIAGE_STATUS = {
+    AUTO_REMEDIABLE: "⚙️ Rule-matched",
+    KNOWN_MANUAL: "📋 Known manual",
+    NEEDS_AI: "🤖 AI-analyzed"
+}
+
+_analysis_batcher: Optional[MicroBatcher] = None
+_single_flight: Optional[SingleFlight] = None
+
+
+def _run_analysis_batch(items: Dict) -> Dict:
+    """Analyze one micro-batch of (chatbot, finding, message, model_id) items on the provider's pool"""
+    futures = {
+        key: bot.provider.executor().submit(bot.analyze_finding_with_ai, finding, message, model_id=model_id)
+        for key, (bot, finding, message, model_id) in items.items()
+    }
+    return {key: future.result() for key, future in futures.items()}
+
+
+def get_analysis_batcher() -> MicroBatcher:
+    """Return the micro-batcher shared by all requests in this container"""
+    global _analysis_batcher
+    if _analysis_batcher is None:
+        _analysis_batcher = MicroBatcher(
+            _run_analysis_batch,
+            max_wait=float(os.environ.get('ANALYSIS_BATCH_WAIT_MS', '5')) / 1000.0,
+            max_batch=int(os.environ.get('ANALYSIS_BATCH_SIZE', '16'))
+        )
+    return _analysis_batcher
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the chat request coalescer shared by all requests in this container"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight(ttl_seconds=float(os.environ.get('CHAT_RESULT_TTL_SECONDS', '30')))
+    return _single_flight
+
+
 class SecurityHubChatbot:
     def __init__(self):
         """Initialize the Security Hub Chatbot with AWS clients"""
@@ -18,12 +89,58 @@ class SecurityHubChatbot:
             self.environment = os.environ.get('ENVIRONMENT', 'dev')
             
             # Initialize AWS clients
-            self.bedrock = boto3.client('bedrock-runtime', region_name=self.region)
             self.securityhub = boto3.client('securityhub', region_name=self.region)
             self.ssm = boto3.client('ssm', region_name=self.region)
             self.ec2 = boto3.client('ec2', region_name=self.region)
             
             self.model_id = os.environ.get('BEDROCK_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+            self.hedging = os.environ.get('BEDROCK_HEDGING', 'disabled') == 'enabled'
+            
+            # Bedrock Converse provider, rate limited and optionally hedged
+            self.provider = get_model_provider(
+                self.region,
+                limiter=get_bedrock_limiter(),
+                hedger=get_hedged_caller() if self.hedging else None
+            )
+            
+            self.prompt_token_budget = int(os.environ.get('PROMPT_TOKEN_BUDGET', str(DEFAULT_TOKEN_BUDGET)))
+            self.prompt_caching = os.environ.get('PROMPT_CACHING', 'auto') == 'auto'
+            self.structured_output = os.environ.get('STRUCTURED_OUTPUT', 'auto') == 'auto'
+            self.response_mode = os.environ.get('ANALYSIS_RESPONSE_MODE', 'full')
+            
+            # Optional per-finding model routing; BEDROCK_MODEL_ID is used when disabled
+            self.router = get_model_router()
+            self.model_routing = os.environ.get('MODEL_ROUTING', 'disabled') == 'enabled'
+            self.latency_budget = float(os.environ.get('LATENCY_BUDGET_SECONDS', '25'))
+            
+            # Findings triaged as needing AI that get a model call per request
+            self.ai_budget = int(os.environ.get('AI_ANALYSIS_BUDGET', '3'))
+            self.max_findings = int(os.environ.get('MAX_FINDINGS', '5'))
+            self.priority_weights = load_weights()
+            self.summary_max_findings = int(os.environ.get('SUMMARY_MAX_FINDINGS', '5000'))
+            self.summary_read_seconds = float(os.environ.get('SUMMARY_READ_SECONDS', '10'))
+            self.batcher = get_analysis_batcher()
+            self.single_flight = get_single_flight()
+            self.sessions = get_session_store(self.region)
+            
+            # Persistent analysis store shared across containers and functions
+            self.store = get_analysis_store(self.region)
+            self.analysis_ttl = int(os.environ.get('ANALYSIS_TTL_SECONDS', '86400'))
+            # Deduplicates remediation commands across concurrent requests and containers
+            self.ledger = get_remediation_ledger(self.store)
+            self.executor = get_remediation_executor()
+            # Deployed remediation documents, checked locally before commands are sent
+            self.catalog = get_document_catalog(self.ssm, self.environment)
+            
+            # Security group state for remediation pre-flight checks and verification
+            self.sg_cache = get_security_group_cache(
+                self.ec2, ttl_seconds=float(os.environ.get('SECURITY_GROUP_CACHE_TTL_SECONDS', '60'))
+            )
+            # Remediated findings are resolved in Security Hub so they drop out of the default filter
+            self.workflow = (get_workflow_updater(self.securityhub)
+                             if os.environ.get('FINDING_WORKFLOW_UPDATES', 'enabled') == 'enabled' else None)
+            self.tracker = get_remediation_tracker(self.ssm, self.store, ttl_seconds=self.analysis_ttl,
+                                                   verifier=self.verify_remediations, workflow=self.workflow)
             
             logger.info(f"Initialized SecurityHubChatbot for region: {self.region}, environment: {self.environment}")
             
@@ -31,28 +148,30 @@ class SecurityHubChatbot:
             logger.error(f"Failed to initialize SecurityHubChatbot: {str(e)}")
             raise
 
+    def iter_security_hub_findings(self, filters: Optional[Dict] = None,
+                                   max_results: Optional[int] = None) -> Iterator[Dict]:
+        """Yield active Security Hub findings page by page, without holding the full set"""
+        # Default filters for active findings
+        default_filters = {
+            'RecordState': [{'Value': 'ACTIVE', 'Comparison': 'EQUALS'}],
+            'WorkflowStatus': [{'Value': 'NEW', 'Comparison': 'EQUALS'}]
+        }
+        
+        if filters:
+            default_filters.update(filters)
+        
+        pagination = {'PageSize': 100}
+        if max_results:
+            pagination['MaxItems'] = max_results
+        
+        paginator = self.securityhub.get_paginator('get_findings')
+        for page in paginator.paginate(Filters=default_filters, PaginationConfig=pagination):
+            yield from page['Findings']
+    
     def get_security_hub_findings(self, filters: Optional[Dict] = None, max_results: int = 5) -> List[Dict]:
         """Retrieve Security Hub findings with optional filters"""
         try:
-            # Default filters for active findings
-            default_filters = {
-                'RecordState': [{'Value': 'ACTIVE', 'Comparison': 'EQUALS'}],
-                'WorkflowStatus': [{'Value': 'NEW', 'Comparison': 'EQUALS'}]
-            }
-            
-            if filters:
-                default_filters.update(filters)
-            
-            paginator = self.securityhub.get_paginator('get_findings')
-            findings = []
-            
-            for page in paginator.paginate(
-                Filters=default_filters,
-                PaginationConfig={'MaxItems': max_results}
-            ):
-                findings.extend(page['Findings'])
-                if len(findings) >= max_results:
-                    break
+            findings = list(islice(self.iter_security_hub_findings(filters, max_results), max_results))
             
             logger.info(f"Retrieved {len(findings)} Security Hub findings")
             return findings[:max_results]
@@ -69,129 +188,108 @@ class SecurityHubChatbot:
             logger.error(f"Unexpected error retrieving findings: {str(e)}")
             return []
 
-    def analyze_finding_with_ai(self, finding: Dict, user_query: str) -> Dict:
+    def analyze_finding_with_ai(self, finding: Dict, user_query: str, model_id: Optional[str] = None) -> Dict:
         """Use Bedrock to analyze finding and suggest remediation"""
+        model_id = model_id or self.model_id
         try:
-            # Extract key information from finding
             title = finding.get('Title', 'N/A')
-            description = finding.get('Description', 'N/A')
             severity = finding.get('Severity', {}).get('Label', 'N/A')
-            compliance_status = finding.get('Compliance', {}).get('Status', 'N/A')
             
-            # Get resource information
-            resources = finding.get('Resources', [])
-            resource_info = []
-            for resource in resources[:3]:  # Limit to first 3 resources
-                resource_info.append({
-                    'id': resource.get('Id', 'N/A'),
-                    'type': resource.get('Type', 'N/A'),
-                    'region': resource.get('Region', 'N/A')
-                })
-            
-            prompt = f"""You are a security expert analyzing AWS Security Hub findings. Based on the user query and finding details, provide a JSON response with remediation recommendations.
-
-User Query: {user_query}
-
-Finding Details:
-- Title: {title}
-- Description: {description}
-- Severity: {severity}
-- Compliance Status: {compliance_status}
-- Resources: {json.dumps(resource_info, indent=2)}
-
-Analyze this finding and provide a JSON response with these exact fields:
-{{
-    "remediation_action": "specific action to take (e.g., 'revoke_sg_rule', 'manual_review', 'update_policy')",
-    "ssm_document": "SSM document name if applicable (e.g., 'SecurityHub-RemediateUnrestrictedSSH-{self.environment}') or null",
-    "parameters": {{"key": "value pairs needed for remediation"}},
-    "explanation": "brief explanation of the issue and fix",
-    "severity_assessment": "your assessment of the risk level",
-    "automated": true/false whether this can be automatically remediated
-}}
-
-Focus on common Security Hub findings like:
-- Unrestricted SSH (port 22) access from 0.0.0.0/0
-- Unrestricted RDP (port 3389) access from 0.0.0.0/0
-- Security group misconfigurations
-- IAM policy issues
-
-Only suggest automated remediation for well-defined, low-risk changes."""
-
-            # Call Bedrock
-            if 'anthropic' in self.model_id:
-                # Anthropic format
-                response = self.bedrock.invoke_model(
-                    modelId=self.model_id,
-                    body=json.dumps({
-                        "anthropic_version": "bedrock-2023-05-31",
-                        "max_tokens": 1000,
-                        "temperature": 0.1,
-                        "messages": [{"role": "user", "content": prompt}]
-                    })
-                )
-                result = json.loads(response['body'].read())
-                ai_response = result['content'][0]['text']
+            # Static, cacheable instructions plus a compact per-finding message
+            structured = self.structured_output and supports_tool_use(model_id)
+            compact = self.response_mode == 'compact'
+            # The remediation catalog is only worth its tokens when the prompt is cached
+            catalog = self.prompt_caching and prompt_caching_minimum(model_id) is not None
+            system_prompt = build_system_prompt(self.environment, structured, compact, catalog)
+            if compact:
+                schema, validator, max_tokens = COMPACT_SCHEMA, validate_compact, COMPACT_MAX_TOKENS
             else:
-                # Amazon Titan format
-                response = self.bedrock.invoke_model(
-                    modelId=self.model_id,
-                    body=json.dumps({
-                        "inputText": prompt,
-                        "textGenerationConfig": {
-                            "maxTokenCount": 1000,
-                            "temperature": 0.1,
-                            "topP": 0.9
-                        }
-                    })
+                schema, validator, max_tokens = REMEDIATION_SCHEMA, validate_remediation, 1000
+            message, message_tokens = build_finding_message(finding, user_query, self.prompt_token_budget)
+            estimated_tokens = estimate_tokens(system_prompt) + message_tokens
+            tool_config = remediation_tool_config(schema) if structured else None
+            # Bedrock ignores checkpoints below the model's minimum, so only add one when the static prefix is long enough
+            prefix_tokens = estimate_tokens(system_prompt) + (estimate_tokens(json.dumps(tool_config)) if tool_config else 0)
+            cache_system = self.prompt_caching and supports_prompt_caching(model_id, prefix_tokens)
+            logger.info(f"Prompt for '{title}' estimated at {estimated_tokens} input tokens "
+                        f"({message_tokens} per-finding)")
+            
+            # Call Bedrock, with at most one targeted repair retry on invalid output
+            usage = {}
+            analysis = None
+            errors = []
+            call_start = time.time()
+            history = None
+            for attempt in range(2):
+                turn = message
+                if attempt:
+                    # Replay the invalid answer so the model corrects it instead of starting over
+                    history = repair_turns(response, errors)
+                    if not history:
+                        turn = message + repair_instructions(errors)
+                response = self.provider.converse(
+                    model_id, system_prompt, turn,
+                    max_tokens=max_tokens,
+                    temperature=0.1,
+                    cache_system=cache_system,
+                    tool_config=tool_config,
+                    estimated_tokens=estimated_tokens,
+                    history=history
+                )
+                for key, value in response['usage'].items():
+                    usage[key] = usage.get(key, 0) + value
+                
+                analysis, errors = parse_remediation(response, validator)
+                if analysis is not None:
+                    if compact:
+                        analysis = expand_compact(analysis, self.environment)
+                    break
+                logger.warning(f"Invalid AI output for '{title}' (attempt {attempt + 1}): {'; '.join(errors)}")
+            self.router.record_latency(model_id, time.time() - call_start)
+            
+            if analysis is None:
+                ai_response = response['text'] or json.dumps((response['tool_use'] or {}).get('input'), default=str)
+                analysis = self._manual_review_analysis(
+                    f"AI analysis completed but response parsing failed: {ai_response[:200]}...",
+                    severity
                 )
-                result = json.loads(response['body'].read())
-                ai_response = result['results'][0]['outputText']
             
-            # Parse JSON response from AI
-            try:
-                # Extract JSON from the response (in case there's extra text)
-                start_idx = ai_response.find('{')
-                end_idx = ai_response.rfind('}') + 1
-                if start_idx != -1 and end_idx != -1:
-                    json_str = ai_response[start_idx:end_idx]
-                    analysis = json.loads(json_str)
-                else:
-                    raise ValueError("No JSON found in AI response")
-                    
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.warning(f"Failed to parse AI JSON response: {str(e)}")
-                analysis = {
-                    "remediation_action": "manual_review",
-                    "ssm_document": None,
-                    "parameters": {},
-                    "explanation": f"AI analysis completed but response parsing failed: {ai_response[:200]}...",
-                    "severity_assessment": severity,
-                    "automated": False
-                }
+            analysis['usage'] = dict(
+                usage,
+                model_id=model_id,
+                estimated_input_tokens=estimated_tokens,
+                latency_ms=int((time.time() - call_start) * 1000),
+                structured_output=structured,
+                response_mode=self.response_mode,
+                attempts=attempt + 1
+            )
+            logger.info(f"Bedrock usage for '{title}': {usage['input_tokens']} input uncached, "
+                        f"{usage['cache_read_input_tokens']} cache read, "
+                        f"{usage['cache_write_input_tokens']} cache write, "
+                        f"{usage['output_tokens']} output in {analysis['usage']['latency_ms']}ms")
             
             logger.info(f"AI analysis completed for finding: {title}")
             return analysis
             
         except ClientError as e:
             logger.error(f"Bedrock API error: {str(e)}")
-            return {
-                "remediation_action": "manual_review",
-                "ssm_document": None,
-                "parameters": {},
-                "explanation": f"AI analysis failed due to Bedrock error: {str(e)}",
-                "severity_assessment": "unknown",
-                "automated": False
-            }
+            return self._manual_review_analysis(f"AI analysis failed due to Bedrock error: {str(e)}")
         except Exception as e:
             logger.error(f"Unexpected error in AI analysis: {str(e)}")
-            return {
-                "remediation_action": "manual_review",
-                "ssm_document": None,
-                "parameters": {},
-                "explanation": f"AI analysis failed: {str(e)}",
-                "severity_assessment": "unknown",
-                "automated": False
-            }
+            return self._manual_review_analysis(f"AI analysis failed: {str(e)}")
+
+    @staticmethod
+    def _manual_review_analysis(explanation: str, severity_assessment: str = "unknown") -> Dict:
+        """Fallback analysis used when the AI result is unavailable; never cached"""
+        return {
+            "remediation_action": "manual_review",
+            "ssm_document": None,
+            "parameters": {},
+            "explanation": explanation,
+            "severity_assessment": severity_assessment,
+            "automated": False,
+            "degraded": True
+        }
 
     def execute_remediation(self, remediation: Dict, finding: Dict) -> Dict:
         """Execute the suggested remediation using Systems Manager"""
@@ -214,41 +312,14 @@ Only suggest automated remediation for well-defined, low-risk changes."""
                 }
             
             # For security group remediations, extract SG ID from resource
-            resource_id = resources[0].get('Id', '')
-            
-            if 'security-group' in resource_id.lower():
-                # Extract security group ID (format: arn:aws:ec2:region:account:security-group/sg-xxxxxxxxx)
-                sg_id = resource_id.split('/')[-1] if '/' in resource_id else resource_id.split(':')[-1]
-                
-                if sg_id.startswith('sg-'):
-                    parameters['SecurityGroupId'] = sg_id
-                    
-                    # Execute SSM document
-                    response = self.ssm.send_command(
-                        DocumentName=ssm_document,
-                        Parameters={k: [str(v)] for k, v in parameters.items()},
-                        Targets=[{
-                            'Key': 'tag:Name',
-                            'Values': ['*']
-                        }],
-                        MaxConcurrency='1',
-                        MaxErrors='0'
-                    )
-                    
-                    command_id = response['Command']['CommandId']
-                    
-                    logger.info(f"Remediation command executed: {command_id} for SG: {sg_id}")
-                    
-                    return {
-                        "status": "success",
-                        "command_id": command_id,
-                        "message": f"Remediation initiated for security group {sg_id}",
-                        "resource_id": sg_id
-                    }
+            sg_id = security_group_id(finding)
+            if sg_id:
+                parameters['SecurityGroupId'] = sg_id
+                return self._send_remediation_command(ssm_document, parameters, sg_id)
             
             return {
                 "status": "error",
-                "message": f"Unsupported resource type for automated remediation: {resource_id}"
+                "message": f"Unsupported resource type for automated remediation: {resources[0].get('Id', '')}"
             }
             
         except ClientError as e:
@@ -265,23 +336,315 @@ Only suggest automated remediation for well-defined, low-risk changes."""
                 "message": f"Remediation failed: {str(e)}"
             }
 
-    def process_chat_message(self, message: str) -> Dict:
+    def _send_remediation_command(self, ssm_document: str, parameters: Dict, sg_id: str) -> Dict:
+        """Send one SSM remediation command unless the same one is already running or recently ran"""
+        try:
+            parameters = self.catalog.validate(ssm_document, parameters)
+        except InvalidRemediation as e:
+            logger.warning(f"Rejected remediation for SG {sg_id}: {str(e)}")
+            return {
+                "status": "error",
+                "message": f"Remediation rejected: {str(e)}",
+                "resource_id": sg_id,
+                "ssm_document": ssm_document
+            }
+        
+        key = ledger_key(sg_id, ssm_document, parameters)
+        result, source = self.ledger.run(
+            key,
+            # The key travels with the record so the tracker can release it if the command fails
+            lambda: dict(self._submit_command(ssm_document, parameters, sg_id), ledger_key=key),
+            succeeded=lambda r: r.get('status') == SUBMITTED
+        )
+        if source == 'attached':
+            logger.info(f"Duplicate remediation for SG {sg_id} attached to an existing execution")
+            result = dict(result, deduplicated=True)
+        return result
+    
+    def _submit_command(self, ssm_document: str, parameters: Dict, sg_id: str) -> Dict:
+        """Send the SSM command; the tracker follows it to completion"""
+        response = self.ssm.send_command(
+            DocumentName=ssm_document,
+            Parameters={k: [str(v)] for k, v in parameters.items()},
+            Targets=[{
+                'Key': 'tag:Name',
+                'Values': ['*']
+            }],
+            MaxConcurrency='1',
+            MaxErrors='0'
+        )
+        
+        command_id = response['Command']['CommandId']
+        
+        logger.info(f"Remediation command executed: {command_id} for SG: {sg_id}")
+        
+        # The command only ran once the tracker sees its invocations finish
+        return {
+            "status": SUBMITTED,
+            "command_id": command_id,
+            "command_status": "Pending",
+            "message": f"Remediation submitted for security group {sg_id}",
+            "resource_id": sg_id,
+            "ssm_document": ssm_document,
+            "submitted_at": int(time.time())
+        }
+    
+    def execute_plan(self, plan: Dict) -> Dict[str, Dict]:
+        """Run a remediation plan, returning the execution result for every finding it covers.
+        
+        The current rules of every targeted group are read first (one batched
+        lookup), so ports that are already closed are not remediated again.
+        """
+        open_by_group = self.sg_cache.open_ports_by_group(
+            {action['security_group_id']: action['ports'] for action in plan['actions']}
+        )
+        results = apply_preflight(plan, open_by_group, self.environment)
+        
+        # Commands go through the shared executor: bounded concurrency, most severe first, rate limited
+        # per endpoint. Every call uses self.ssm, so the bucket is keyed on its account and region.
+        account = self.account_id or ''
+        futures = []
+        for action in plan['actions']:
+            send = partial(self._send_remediation_command, action['document'], dict(action['parameters']),
+                           action['security_group_id'])
+            futures.append(self.executor.submit(send, priority=action['priority'], account=account, region=self.region))
+        skipped_futures = [
+            self.executor.submit(partial(self.execute_remediation, skipped['analysis'], skipped['finding']),
+                                 priority=skipped['priority'], account=account, region=self.region)
+            for skipped in plan['skipped']
+        ]
+        
+        for action, future in zip(plan['actions'], futures):
+            try:
+                result = future.result()
+                result['ports'] = action['ports']
+                if action.get('ipv6_ports'):
+                    result['ipv6_ports'] = action['ipv6_ports']
+                    result['message'] += (f"; ports {', '.join(str(p) for p in action['ipv6_ports'])} are also open "
+                                          f"to ::/0 and need manual remediation")
+                if action.get('broad_ports'):
+                    result['broad_ports'] = action['broad_ports']
+                    result['message'] += (f"; ports {', '.join(str(p) for p in action['broad_ports'])} are also open "
+                                          f"through an all-traffic or port-range rule and need manual remediation")
+            except ClientError as e:
+                error_code = e.response['Error']['Code']
+                logger.error(f"AWS API error during remediation: {error_code} - {str(e)}")
+                result = {
+                    "status": "error",
+                    "message": f"Remediation failed: {error_code} - {str(e)}"
+                }
+            except Exception as e:
+                logger.error(f"Unexpected error during remediation: {str(e)}")
+                result = {
+                    "status": "error",
+                    "message": f"Remediation failed: {str(e)}"
+                }
+            if len(action['finding_ids']) > 1:
+                result['merged_findings'] = len(action['finding_ids'])
+            for finding_id in action['finding_ids']:
+                results[finding_id] = dict(result)
+        
+        self.sg_cache.invalidate(action['security_group_id'] for action in plan['actions'])
+        for skipped, future in zip(plan['skipped'], skipped_futures):
+            try:
+                results[skipped['finding_id']] = future.result()
+            except Exception as e:
+                logger.error(f"Unexpected error during remediation: {str(e)}")
+                results[skipped['finding_id']] = {"status": "error", "message": f"Remediation failed: {str(e)}"}
+        return results
+    
+    def _record_remediation(self, finding_id: str, product_arn: Optional[str], result: Dict):
+        """Store a remediation outcome and follow it up until it is confirmed"""
+        if product_arn:
+            result['product_arn'] = product_arn
+        self.store.put(REMEDIATION, finding_id, result, ttl_seconds=self.analysis_ttl)
+        self.tracker.track(finding_id, result)
+        if result.get('no_op') and self.workflow is not None:
+            identifier = finding_identifier(finding_id, product_arn)
+            if identifier:
+                self.workflow.resolve([identifier], note=ALREADY_REMEDIATED_NOTE)
+    
+    def flush(self):
+        """Write out buffered store records and finding workflow updates"""
+        self.store.flush()
+        if self.workflow is not None:
+            self.workflow.flush()
+    
+    def verify_remediations(self, records: List[Dict]) -> Dict[str, bool]:
+        """Check that succeeded security group commands left their ports closed to the internet"""
+        ports_by_group = {}
+        for record in records:
+            ports = record.get('ports') or [document_port(record.get('ssm_document', ''))]
+            if record.get('resource_id') and None not in ports:
+                ports_by_group.setdefault(record['resource_id'], set()).update(ports)
+        if not ports_by_group:
+            return {}
+        
+        self.sg_cache.invalidate(ports_by_group)
+        open_by_group = self.sg_cache.open_ports_by_group(ports_by_group)
+        verified = {}
+        for record in records:
+            still_open = open_by_group.get(record.get('resource_id'))
+            if still_open is not None:
+                ports = record.get('ports') or [document_port(record['ssm_document'])]
+                # An IPv6 or port-range rule left behind keeps the finding open, so it fails verification too
+                verified[record['command_id']] = not (still_open['ipv4'] | still_open['ipv6'] | still_open['broad']) & set(ports)
+        return verified
+    
+    def summarize_findings(self, message: str, filters: Dict, start_time: float) -> Dict:
+        """Answer summary questions with a map-reduce summary over the matching findings.
+        
+        Reading stops at SUMMARY_MAX_FINDINGS findings or after
+        summary_read_seconds, whichever comes first, so the model calls
+        still fit in the request.
+        """
+        try:
+            findings = self.iter_security_hub_findings(filters, self.summary_max_findings)
+            groups, totals = aggregate_findings(findings, self.environment,
+                                                deadline=start_time + self.summary_read_seconds)
+        except ClientError as e:
+            logger.error(f"Error retrieving Security Hub findings: {str(e)}")
+            groups, totals = [], {}
+        
+        if not groups:
+            return {
+                "response": "No active Security Hub findings found that match your criteria.",
+                "findings_count": 0,
+                "remediations": []
+            }
+        
+        logger.info(f"Summarizing {totals['findings']} findings in {len(groups)} groups")
+        summary = summarize_groups(self.provider, self.model_id, groups, totals, message)
+        total_time = time.time() - start_time
+        logger.info(f"Summary usage: {json.dumps(summary['usage'])}, took {total_time:.2f}s")
+        
+        response = summary['summary']
+        if totals.get('truncated'):
+            response = (f"Partial summary of the first {totals['findings']} findings read within "
+                        f"{self.summary_read_seconds:.0f}s; send the question with \"async\": true to cover more.\n\n"
+                        + response)
+        return {
+            "response": response,
+            "truncated": bool(totals.get('truncated')),
+            "findings_count": totals['findings'],
+            "remediations": [],
+            "groups": [group.to_dict() for group in groups],
+            "usage": summary['usage'],
+            "processing_time": f"{total_time:.1f}s"
+        }
+    
+    @staticmethod
+    def build_filters(message: str) -> Dict:
+        """Security Hub filters implied by the chat message"""
+        filters = {}
+        if 'critical' in message.lower():
+            filters['SeverityLabel'] = [{'Value': 'CRITICAL', 'Comparison': 'EQUALS'}]
+        elif 'high' in message.lower():
+            filters['SeverityLabel'] = [{'Value': 'HIGH', 'Comparison': 'EQUALS'}]
+        return filters
+    
+    def process_session_message(self, message: str, session_id: Optional[str] = None,
+                                on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Process a chat turn, answering follow-ups about earlier findings from the session"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            session_id = session_id or self.sessions.new_session_id()
+        else:
+            matches = resolve_reference(message, session.get('items', []))
+            if len(matches) == 1:
+                return dict(self._follow_up(session, matches[0], message), session_id=session_id)
+            if len(matches) > 1:
+                options = '\n'.join(f"{i + 1}. {session['items'][i]['finding_title']}" for i in matches)
+                return {
+                    "response": f"That could mean more than one finding. Which one?\n{options}",
+                    "findings_count": 0,
+                    "remediations": [],
+                    "session_id": session_id,
+                    "follow_up": True
+                }
+        
+        result = self.process_chat_message(message, on_progress=on_progress)
+        if 'error' not in result:
+            self.sessions.record_result(session_id, message, result)
+        return dict(result, session_id=session_id)
+    
+    def _follow_up(self, session: Dict, index: int, message: str) -> Dict:
+        """Explain or remediate a finding from an earlier turn without refetching or re-analysing it"""
+        start_time = time.time()
+        item = session['items'][index]
+        analysis = item.get('analysis') or {}
+        # The tracker may have recorded the command's outcome since the session was saved. Stored state is
+        # enough here; polling SSM is left to GET /remediations so follow-ups stay a single store read.
+        stored = self.tracker.status([item['finding_id']]).get(item['finding_id'])
+        if stored:
+            item['execution'] = stored
+        execution = item.get('execution') or {}
+        logger.info(f"Follow-up on session finding {index + 1}: {item.get('finding_title')}")
+        
+        if is_fix_request(message):
+            if execution.get('status') in (SUBMITTED, SUCCESS):
+                text = (f"Remediation for \"{item['finding_title']}\" was already initiated "
+                        f"(command {execution.get('command_id')}, {execution.get('command_status', 'Pending')}).")
+            elif analysis.get('automated') and analysis.get('ssm_document'):
+                finding = {'Id': item['finding_id'], 'Title': item['finding_title'], 'Resources': item.get('resources') or []}
+                plan = plan_remediations([(finding, dict(analysis))], self.environment)
+                item['execution'] = self.execute_plan(plan)[item['finding_id']]
+                self._record_remediation(item['finding_id'], item.get('product_arn'), item['execution'])
+                self.flush()
+                self.sessions.save(session)
+                text = f"{item['execution'].get('message', 'Remediation attempted')} for \"{item['finding_title']}\"."
+            else:
+                text = (f"\"{item['finding_title']}\" can't be remediated automatically. "
+                        f"{analysis.get('explanation', 'Manual review is required.')}")
+        else:
+            text = f"{index + 1}. {item['finding_title']} ({item.get('severity')}) - {item.get('status')}\n"
+            text += f"Recommended action: {analysis.get('remediation_action', 'manual_review')}\n"
+            if analysis.get('ssm_document'):
+                text += f"SSM document: {analysis['ssm_document']}\n"
+            if analysis.get('severity_assessment'):
+                text += f"Risk: {analysis['severity_assessment']}\n"
+            text += f"Details: {analysis.get('explanation', 'No details available')}"
+            if item.get('execution'):
+                text += f"\nRemediation: {item['execution'].get('message', item['execution'].get('status'))}"
+        
+        automated = (item.get('execution') or {}).get('status') in (SUBMITTED, SUCCESS)
+        return {
+            "response": text,
+            "findings_count": 1,
+            "remediations": [item],
+            "automated_count": 1 if automated else 0,
+            "manual_count": 0 if automated else 1,
+            "processing_time": f"{time.time() - start_time:.3f}s",
+            "follow_up": True
+        }
+    
+    def process_chat_message(self, message: str, on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Process user chat message, sharing work with identical concurrent or recent requests"""
+        filters = self.build_filters(message)
+        key = request_key(message, filters, scope=f"{self.max_findings}/{self.ai_budget}")
+        result, source = self.single_flight.do(
+            key,
+            lambda: self._process_chat_message(message, filters, on_progress),
+            cacheable=lambda result: 'error' not in result
+        )
+        if source != 'computed':
+            logger.info(f"Served chat message from {source} result: {message[:100]}")
+        return dict(result, served_from=source)
+    
+    def _process_chat_message(self, message: str, filters: Dict,
+                              on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
         """Process user chat message and provide response with remediation actions"""
+        report = on_progress or (lambda event: None)
         try:
-            import time
             start_time = time.time()
             
             logger.info(f"Processing chat message: {message[:100]}...")
             
-            # Get recent findings based on message context - limit to 2 for speed
-            filters = {}
-            if 'critical' in message.lower():
-                filters['SeverityLabel'] = [{'Value': 'CRITICAL', 'Comparison': 'EQUALS'}]
-            elif 'high' in message.lower():
-                filters['SeverityLabel'] = [{'Value': 'HIGH', 'Comparison': 'EQUALS'}]
+            if is_summary_request(message):
+                return self.summarize_findings(message, filters, start_time)
             
             findings_start = time.time()
-            findings = self.get_security_hub_findings(filters=filters, max_results=5)  # Increased from 2
+            findings = self.get_security_hub_findings(filters=filters, max_results=self.max_findings)
             findings_time = time.time() - findings_start
             logger.info(f"Security Hub query took: {findings_time:.2f}s")
             
@@ -292,23 +655,102 @@ Only suggest automated remediation for well-defined, low-risk changes."""
                     "remediations": []
                 }
             
-            # Process only 1 finding with AI for speed, show others without AI
             responses = []
             automated_count = 0
             manual_count = 0
             
-            for i, finding in enumerate(findings[:3]):  # AI-analyze 3 findings with fast Claude
+            # Triage every finding locally; only the needs-AI bucket spends model calls
+            triaged = [classify_finding(f, self.environment) for f in findings]
+            
+            # Spend the AI budget on the highest-priority findings that need it
+            priorities = prioritize_findings(findings, self.priority_weights)
+            needs_ai = np.array([i for i, t in enumerate(triaged) if t['classification'] == NEEDS_AI], dtype=np.int64)
+            ai_indexes = needs_ai[top_k(priorities[needs_ai], self.ai_budget)].tolist() if len(needs_ai) else []
+            logger.info(f"Triage: {sum(t['classification'] == AUTO_REMEDIABLE for t in triaged)} auto-remediable, "
+                        f"{sum(t['classification'] == KNOWN_MANUAL for t in triaged)} known manual, "
+                        f"{sum(t['classification'] == NEEDS_AI for t in triaged)} need AI")
+            
+            order = top_k(priorities, len(findings)).tolist()
+            report({
+                'stage': 'findings',
+                'findings_count': len(findings),
+                'findings': [{
+                    "finding_id": findings[i].get('Id', 'unknown'),
+                    "finding_title": findings[i].get('Title', 'Unknown Finding'),
+                    "severity": findings[i].get('Severity', {}).get('Label', 'Unknown'),
+                    "classification": triaged[i]['classification'],
+                    "priority": round(float(priorities[i]), 3)
+                } for i in order]
+            })
+            
+            # One batched lookup for previously stored analyses of the AI bucket
+            # Route first so stored analyses are keyed by the model that produces them
+            model_ids = {}
+            for i in ai_indexes:
+                model_ids[i] = self.model_id
+                if self.model_routing:
+                    remaining = self.latency_budget - (time.time() - start_time)
+                    model_ids[i], _ = self.router.choose(findings[i], remaining_budget=remaining)
+            fingerprints = {i: finding_fingerprint(findings[i], model_ids[i]) for i in ai_indexes}
+            cached_analyses = self.store.batch_get(ANALYSIS, fingerprints.values())
+            
+            # Analyses not in the store go through the shared micro-batcher, which
+            # runs them concurrently and dedupes findings other requests are analysing
+            pending_analyses = {}
+            for i in ai_indexes:
+                if fingerprints[i] in cached_analyses:
+                    continue
+                finding = findings[i]
                 logger.info(f"AI analyzing finding {i+1}: {finding.get('Title', 'Unknown')}")
                 
-                ai_start = time.time()
-                analysis = self.analyze_finding_with_ai(finding, message)
-                ai_time = time.time() - ai_start
-                logger.info(f"AI analysis took: {ai_time:.2f}s")
+                # The fingerprint covers the model; the message keeps different questions apart
+                batch_key = (fingerprints[i], message)
+                pending_analyses[i] = self.batcher.submit(batch_key, (self, finding, message, model_ids[i]))
+            
+            ai_start = time.time()
+            analyses = {}
+            for i in order:
+                finding, triage = findings[i], triaged[i]
+                analysis = triage['analysis']
+                status = TRIAGE_STATUS[triage['classification']]
+                
+                if i in fingerprints:
+                    fingerprint = fingerprints[i]
+                    if i in pending_analyses:
+                        # Copy so concurrent requests sharing the result don't see each other's edits
+                        analysis = dict(pending_analyses[i].result())
+                        if not analysis.get('degraded'):
+                            self.store.put(ANALYSIS, fingerprint, analysis, ttl_seconds=self.analysis_ttl)
+                    else:
+                        analysis = cached_analyses[fingerprint]
+                        logger.info(f"Using stored analysis for finding {i+1}: {finding.get('Title', 'Unknown')}")
+                elif analysis is None:
+                    # Needs AI, but the per-request analysis budget is spent
+                    status = "⏳ Needs AI (budget exhausted)"
+                    analysis = {
+                        "remediation_action": "manual_review",
+                        "explanation": "Needs AI analysis - ask again or narrow the query to analyze it",
+                        "automated": False
+                    }
+                
+                analyses[i] = (status, analysis)
+                report({'stage': 'analysis', 'finding_id': finding.get('Id', 'unknown'), 'status': status,
+                        'analysis': analysis})
+            
+            # Remediate in bulk: one command per security group, duplicates removed
+            plan = plan_remediations([(findings[i], analyses[i][1]) for i in order], self.environment)
+            executions = self.execute_plan(plan)
+            
+            for i in order:
+                finding, triage = findings[i], triaged[i]
+                status, analysis = analyses[i]
+                finding_id = finding.get('Id', 'unknown')
                 
-                remediation_result = None
-                if analysis.get('automated', False) and analysis.get('ssm_document'):
-                    remediation_result = self.execute_remediation(analysis, finding)
-                    if remediation_result.get('status') == 'success':
+                remediation_result = executions.get(finding_id)
+                if remediation_result is not None:
+                    report({'stage': 'remediation', 'finding_id': finding_id, 'execution': remediation_result})
+                    self._record_remediation(finding_id, finding.get('ProductArn'), remediation_result)
+                    if remediation_result.get('status') in (SUBMITTED, SUCCESS):
                         automated_count += 1
                     else:
                         manual_count += 1
@@ -316,30 +758,29 @@ Only suggest automated remediation for well-defined, low-risk changes."""
                     manual_count += 1
                 
                 responses.append({
-                    "finding_id": finding.get('Id', 'unknown'),
+                    "finding_id": finding_id,
                     "finding_title": finding.get('Title', 'Unknown Finding'),
+                    "product_arn": finding.get('ProductArn'),
                     "severity": finding.get('Severity', {}).get('Label', 'Unknown'),
+                    "classification": triage['classification'],
+                    "priority": round(float(priorities[i]), 3),
+                    "resources": [{'Id': r.get('Id', ''), 'Type': r.get('Type', '')} for r in finding.get('Resources', [])],
+                    "status": status,
                     "analysis": analysis,
                     "execution": remediation_result
                 })
+                report({'stage': 'finding', 'item': responses[-1]})
             
-            # Add remaining findings without AI analysis for speed
-            for finding in findings[3:]:  # Remaining findings after first 3
-                manual_count += 1
-                responses.append({
-                    "finding_id": finding.get('Id', 'unknown'),
-                    "finding_title": finding.get('Title', 'Unknown Finding'),
-                    "severity": finding.get('Severity', {}).get('Label', 'Unknown'),
-                    "analysis": {
-                        "remediation_action": "manual_review",
-                        "explanation": "Additional finding - requires manual review",
-                        "automated": False
-                    },
-                    "execution": None
-                })
+            if pending_analyses:
+                logger.info(f"AI analysis of {len(pending_analyses)} findings took: {time.time() - ai_start:.2f}s")
+            
+            # Persist buffered analyses, remediation outcomes and workflow updates in batches
+            self.flush()
             
             total_time = time.time() - start_time
             logger.info(f"Total processing time: {total_time:.2f}s")
+            if self.model_routing:
+                logger.info(f"Model routing stats: {json.dumps(self.router.stats())}")
             
             # Generate summary response
             summary = f"Analyzed {len(findings)} Security Hub findings in {total_time:.1f}s. "
@@ -350,8 +791,7 @@ Only suggest automated remediation for well-defined, low-risk changes."""
             
             summary += f"\n\nProcessed findings:\n"
             for i, resp in enumerate(responses, 1):
-                status = "🤖 AI-analyzed" if i <= 3 else "📋 Listed"
-                summary += f"{i}. {resp['finding_title']} ({resp['severity']}) - {status}\n"
+                summary += f"{i}. {resp['finding_title']} ({resp['severity']}) - {resp['status']}\n"
             
             return {
                 "response": summary,
@@ -359,6 +799,7 @@ Only suggest automated remediation for well-defined, low-risk changes."""
                 "remediations": responses,
                 "automated_count": automated_count,
                 "manual_count": manual_count,
+                "remediation_plan": plan['estimate'],
                 "processing_time": f"{total_time:.1f}s"
             }
             
@@ -0,0 +1,87 @@
+from typing import Dict, Optional
+
+from schema import compile_validator
+
+# Short codes the model returns in compact mode, expanded locally
+ACTION_CODES = {
+    'RSG': 'revoke_sg_rule',
+    'POL': 'update_policy',
+    'CFG': 'update_configuration',
+    'MAN': 'manual_review',
+}
+
+# SSM document codes; names are filled in per environment
+DOCUMENT_CODES = {
+    'SSH': 'SecurityHub-RemediateUnrestrictedSSH-{environment}',
+    'RDP': 'SecurityHub-RemediateUnrestrictedRDP-{environment}',
+    'NONE': None,
+}
+
+RISK_CODES = {
+    'C': 'CRITICAL',
+    'H': 'HIGH',
+    'M': 'MEDIUM',
+    'L': 'LOW',
+    'I': 'INFORMATIONAL',
+}
+
+ACTION_TEMPLATES = {
+    ('RSG', 'SSH'): "The security group allows SSH (port 22) from 0.0.0.0/0. Revoke the rule with {document}.",
+    ('RSG', 'RDP'): "The security group allows RDP (port 3389) from 0.0.0.0/0. Revoke the rule with {document}.",
+    ('RSG', 'NONE'): "The security group allows unrestricted ingress. Revoke or narrow the offending rule.",
+    ('POL', 'NONE'): "An IAM or resource policy is overly permissive. Review and tighten the policy.",
+    ('CFG', 'NONE'): "The resource configuration does not meet the control. Update the setting to comply.",
+    ('MAN', 'NONE'): "This finding needs manual review before any change is made.",
+}
+
+COMPACT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'a': {'type': 'string', 'enum': list(ACTION_CODES), 'description': 'Action code'},
+        'd': {'type': 'string', 'enum': list(DOCUMENT_CODES), 'description': 'SSM document code'},
+        'r': {'type': 'string', 'enum': list(RISK_CODES), 'description': 'Risk level code'},
+        'w': {'type': 'string', 'description': 'Optional rationale, at most 15 words'}
+    },
+    'required': ['a', 'd', 'r']
+}
+
+validate_compact = compile_validator(COMPACT_SCHEMA)
+
+# Output-token cap for compact answers (the full format uses 1000)
+COMPACT_MAX_TOKENS = 100
+
+
+def compact_output_format(structured: bool) -> str:
+    """Code legend for the system prompt in compact mode"""
+    legend = f"""Answer with short codes only:
+- a (action): RSG=revoke security group rule, POL=update policy, CFG=update configuration, MAN=manual review
+- d (SSM document): SSH=port 22 remediation, RDP=port 3389 remediation, NONE=no document
+- r (risk): C=critical, H=high, M=medium, L=low, I=informational
+- w (optional): rationale of at most 15 words"""
+    if structured:
+        return f"{legend}\n\nSubmit your answer by calling the submit_remediation tool."
+    return f'{legend}\n\nRespond with only a JSON object, e.g. {{"a":"RSG","d":"SSH","r":"H"}}'
+
+
+def expand_compact(codes: Dict, environment: str) -> Dict:
+    """Expand a validated compact answer into the full analysis dict"""
+    action_code = codes['a']
+    document_code = codes['d']
+    document_template: Optional[str] = DOCUMENT_CODES[document_code]
+    document = document_template.format(environment=environment) if document_template else None
+
+    template = ACTION_TEMPLATES.get((action_code, document_code)) or ACTION_TEMPLATES.get((action_code, 'NONE'))
+    explanation = template.format(document=document)
+    rationale = (codes.get('w') or '').strip()
+    if rationale:
+        explanation = f"{explanation} {rationale}"
+
+    return {
+        "remediation_action": ACTION_CODES[action_code],
+        "ssm_document": document,
+        "parameters": {},
+        "explanation": explanation,
+        "severity_assessment": RISK_CODES[codes['r']],
+        # Only the shipped documents are safe to run automatically
+        "automated": action_code == 'RSG' and document is not None
+    }
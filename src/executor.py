@@ -0,0 +1,115 @@
+import os
+import time
+import queue
+import random
+import logging
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ratelimit import TokenBucket, is_throttling_error
+
+logger = logging.getLogger()
+
+
+class RemediationExecutor:
+    """Bounded worker pool for remediation API calls.
+
+    Tasks wait in a priority queue (highest priority first, FIFO within a
+    priority) and run on at most `workers` threads. Before each call a
+    worker takes a token from the bucket of the (account, region) whose
+    endpoint the task calls, so a bulk remediation is paced to the SSM
+    SendCommand rate instead of bursting into throttling; each command
+    makes one EC2 call from the instance, so this paces those too.
+    Throttled calls are retried with full-jitter backoff.
+    """
+
+    def __init__(self, workers: int = 4, calls_per_second: float = 5.0, burst: float = 10.0,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 8.0,
+                 acquire_timeout: float = 30.0):
+        self.workers = workers
+        self.calls_per_second = calls_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.acquire_timeout = acquire_timeout
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.throttled = 0
+
+    def submit(self, fn: Callable[[], Any], priority: float = 0, account: str = '', region: str = '') -> Future:
+        """Queue `fn`; the returned future holds its result or exception"""
+        future: Future = Future()
+        self._queue.put((-priority, next(self._sequence), fn, (account, region), future))
+        self._start_workers()
+        return future
+
+    def _start_workers(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for _ in range(self.workers - len(self._threads)):
+                thread = threading.Thread(target=self._work, name='remediation-executor', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _bucket(self, key: Tuple[str, str]) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.calls_per_second, self.burst)
+            return bucket
+
+    def _work(self):
+        while True:
+            _, _, fn, key, future = self._queue.get()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self._call(fn, key))
+                except Exception as e:
+                    future.set_exception(e)
+            self.completed += 1
+            self._queue.task_done()
+
+    def _call(self, fn: Callable[[], Any], key: Tuple[str, str]) -> Any:
+        bucket = self._bucket(key)
+        attempt = 0
+        while True:
+            if not bucket.acquire(1, timeout=self.acquire_timeout):
+                raise TimeoutError(f"Timed out waiting for remediation capacity in {'/'.join(key)}")
+            try:
+                return fn()
+            except Exception as e:
+                if not is_throttling_error(e) or attempt >= self.max_retries:
+                    raise
+            self.throttled += 1
+            attempt += 1
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+            logger.info(f"Retrying throttled remediation call in {delay:.2f}s (attempt {attempt}/{self.max_retries})")
+            time.sleep(delay)
+
+    def stats(self) -> Dict:
+        return {'queued': self._queue.qsize(), 'completed': self.completed, 'throttled': self.throttled,
+                'buckets': len(self._buckets)}
+
+
+_executor: Optional[RemediationExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_remediation_executor() -> RemediationExecutor:
+    """Return the executor shared by every chatbot instance in this container"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = RemediationExecutor(
+                workers=int(os.environ.get('REMEDIATION_WORKERS', '4')),
+                calls_per_second=float(os.environ.get('REMEDIATION_CALLS_PER_SECOND', '5')),
+                burst=float(os.environ.get('REMEDIATION_BURST', '10'))
+            )
+        return _executor
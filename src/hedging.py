@@ -0,0 +1,122 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger()
+
+# Below this many observations the percentile is too noisy to hedge on
+MIN_SAMPLES = 20
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies per key (e.g. model id)"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class HedgedCaller:
+    """Sends a duplicate request when the first is slower than the observed pN latency.
+
+    The first response to arrive wins; the other is left to finish in the
+    background and its result is discarded (boto3 calls cannot be cancelled).
+    A hedge budget caps the extra load: each primary request earns
+    `budget_ratio` hedge credits and every hedge spends one.
+    """
+
+    def __init__(self, percentile: float = 90, budget_ratio: float = 0.1, max_credit: float = 5.0,
+                 max_workers: int = 16, tracker: Optional[LatencyTracker] = None):
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.max_credit = max_credit
+        self.tracker = tracker or LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bedrock-hedge')
+        self._lock = threading.Lock()
+        self._credit = 0.0
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _take_hedge_credit(self) -> bool:
+        with self._lock:
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                self.hedges += 1
+                return True
+            return False
+
+    def call(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn, hedging it once if it exceeds the adaptive threshold"""
+        with self._lock:
+            self.requests += 1
+            self._credit = min(self.max_credit, self._credit + self.budget_ratio)
+
+        start = time.monotonic()
+        primary = self._executor.submit(fn)
+        threshold = self.tracker.percentile(key, self.percentile)
+
+        if threshold is None:
+            result = primary.result()
+            self.tracker.record(key, time.monotonic() - start)
+            return result
+
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self._take_hedge_credit():
+            result = primary.result()
+            self.tracker.record(key, time.monotonic() - start)
+            return result
+
+        logger.info(f"Hedging {key} request after {threshold:.2f}s")
+        hedge = self._executor.submit(fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    # Latency as seen by the caller, not the per-attempt time
+                    self.tracker.record(key, time.monotonic() - start)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'requests': self.requests, 'hedges': self.hedges, 'hedge_wins': self.hedge_wins}
+
+
+_hedger: Optional[HedgedCaller] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedged_caller() -> HedgedCaller:
+    """Return the per-container hedged caller so latency history survives warm starts"""
+    global _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = HedgedCaller(
+                percentile=float(os.environ.get('BEDROCK_HEDGE_PERCENTILE', '90')),
+                budget_ratio=float(os.environ.get('BEDROCK_HEDGE_BUDGET', '0.1'))
+            )
+        return _hedger
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from typing import Dict, Optional
+
+import boto3
+
+from objectstore import ObjectStore, get_object_store
+from store import AnalysisStore, get_analysis_store
+
+logger = logging.getLogger()
+
+JOB = 'job'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class JobStore:
+    """Status, progress and partial results of asynchronous chat jobs.
+
+    Jobs live in the analysis store under their own namespace. Every
+    update is flushed straight away so a poller in another container sees
+    progress as it happens rather than at the end of the job. The final
+    result can exceed DynamoDB's 400 KB item limit, so it is written to
+    the object store and the job item keeps only its key.
+    """
+
+    def __init__(self, store: AnalysisStore, objects: ObjectStore, ttl_seconds: int = 86400):
+        self.store = store
+        self.objects = objects
+        self.ttl_seconds = ttl_seconds
+
+    def create(self, message: str) -> Dict:
+        now = int(time.time())
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': QUEUED,
+            'message': message,
+            'created_at': now,
+            'updated_at': now,
+            'progress': {'findings_total': None, 'findings_done': 0},
+            'partial': [],
+            'result_key': None,
+            'error': None
+        }
+        self.save(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(JOB, job_id)
+
+    def save(self, job: Dict):
+        job['updated_at'] = int(time.time())
+        self.store.put(JOB, job['job_id'], job, ttl_seconds=self.ttl_seconds)
+        self.store.flush()
+
+    def save_result(self, job: Dict, result: Dict):
+        """Write the final result to the object store; the partial results it supersedes are dropped"""
+        key = f"jobs/{job['job_id']}.json"
+        self.objects.put(key, json.dumps(result, default=str, separators=(',', ':')).encode('utf-8'))
+        job['result_key'] = key
+        job['partial'] = []
+
+    def result(self, job: Dict) -> Optional[Dict]:
+        """The final result of a finished job, None while it runs or if the object has expired"""
+        if not job.get('result_key'):
+            return None
+        data = self.objects.get(job['result_key'])
+        return json.loads(data) if data is not None else None
+
+
+def get_job_store(region: Optional[str] = None) -> JobStore:
+    """Job store on top of the per-container analysis store"""
+    return JobStore(get_analysis_store(region), get_object_store(region),
+                    ttl_seconds=int(os.environ.get('JOB_TTL_SECONDS', '86400')))
+
+
+def run_job(job_id: str, jobs: JobStore, chatbot) -> Dict:
+    """Worker side: process the job's message, recording progress as findings complete"""
+    job = jobs.get(job_id)
+    if job is None:
+        logger.error(f"Job {job_id} not found")
+        return {'job_id': job_id, 'status': FAILED, 'error': 'Job not found'}
+
+    job['status'] = RUNNING
+    jobs.save(job)
+
+    def on_progress(event: Dict):
+        if event['stage'] == 'findings':
+            job['progress']['findings_total'] = event['findings_count']
+        elif event['stage'] == 'finding':
+            job['partial'].append(event['item'])
+            job['progress']['findings_done'] = len(job['partial'])
+        else:
+            return
+        jobs.save(job)
+
+    try:
+        result = chatbot.process_chat_message(job['message'], on_progress=on_progress)
+        job['status'] = FAILED if 'error' in result else SUCCEEDED
+        job['error'] = result.get('error')
+        jobs.save_result(job, result)
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {str(e)}")
+        job['status'] = FAILED
+        job['error'] = str(e)
+
+    jobs.save(job)
+    logger.info(f"Job {job_id} finished with status {job['status']}")
+    return job
+
+
+def dispatch_job(job_id: str, function_name: Optional[str], worker) -> str:
+    """Start the worker for a job, returning how it was dispatched.
+
+    In Lambda the API function invokes itself asynchronously so the work
+    gets the full function timeout instead of API Gateway's 29 seconds.
+    Elsewhere (local runs, tests) the worker runs on a background thread.
+    """
+    mode = os.environ.get('JOB_DISPATCH') or ('lambda' if function_name else 'thread')
+    if mode == 'lambda':
+        boto3.client('lambda').invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'job_id': job_id}).encode('utf-8')
+        )
+    else:
+        threading.Thread(target=worker, args=(job_id,), name=f'job-{job_id}', daemon=True).start()
+    logger.info(f"Dispatched job {job_id} via {mode}")
+    return mode
@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+from store import AnalysisStore
+
+logger = logging.getLogger()
+
+# Record namespace in the analysis store
+LEDGER = 'ledger'
+
+# Entry states
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+
+
+def ledger_key(resource_id: str, action: str, parameters: Dict) -> str:
+    """Idempotency key for running `action` with `parameters` against a resource"""
+    raw = json.dumps({'resource': resource_id, 'action': action, 'parameters': parameters},
+                     sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class RemediationLedger:
+    """Makes remediation executions idempotent across requests and containers.
+
+    Before running an action the caller takes a lease with a conditional
+    write keyed by ledger_key(). Only one caller wins; everyone else
+    attaches to the winner's result, waiting up to `wait_seconds` while it
+    is still running. Successful results are kept for `result_ttl`
+    seconds, and failed executions release the lease so they can be
+    retried. A lease left behind by a crashed caller expires after
+    `lease_seconds`. Callers that learn later that an execution failed
+    delete its key (the tracker does) so it is not attached to again.
+    """
+
+    def __init__(self, store: AnalysisStore, lease_seconds: int = 60, result_ttl: int = 300,
+                 wait_seconds: float = 5.0, poll_interval: float = 0.25):
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+        self.executed = 0
+        self.attached = 0
+
+    def run(self, key: str, fn: Callable[[], Dict],
+            succeeded: Callable[[Dict], bool] = lambda result: True) -> Tuple[Dict, str]:
+        """Run `fn` once per key, returning (result, source) with source 'executed' or 'attached'"""
+        owner = uuid.uuid4().hex
+        lease = {'state': IN_PROGRESS, 'owner': owner, 'started_at': int(time.time())}
+        existing = self.store.put_if_absent(LEDGER, key, lease, ttl_seconds=self.lease_seconds)
+        if existing is not None:
+            self.attached += 1
+            return self._attach(key, existing), 'attached'
+
+        self.executed += 1
+        try:
+            result = fn()
+        except Exception:
+            self.store.delete(LEDGER, key)
+            raise
+
+        if succeeded(result):
+            self.store.put(LEDGER, key, {'state': DONE, 'owner': owner, 'result': result},
+                           ttl_seconds=self.result_ttl)
+            self.store.flush()
+        else:
+            self.store.delete(LEDGER, key)
+        return result, 'executed'
+
+    def _attach(self, key: str, entry: Dict) -> Dict:
+        deadline = time.monotonic() + self.wait_seconds
+        while entry.get('state') == IN_PROGRESS and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = self.store.get(LEDGER, key) or {}
+
+        if entry.get('state') == DONE:
+            logger.info(f"Attached to recent remediation {entry['result'].get('command_id')}")
+            return entry['result']
+        if not entry:
+            # The owner failed and released the lease; report rather than retry inside this request
+            return {'status': 'error', 'message': 'A concurrent attempt at this remediation failed; try again'}
+        return {'status': IN_PROGRESS, 'message': 'The same remediation is already being executed by another request'}
+
+    def stats(self) -> Dict:
+        return {'executed': self.executed, 'attached': self.attached}
+
+
+_ledger: Optional[RemediationLedger] = None
+
+
+def get_remediation_ledger(store: AnalysisStore) -> RemediationLedger:
+    """Return the per-container ledger"""
+    global _ledger
+    if _ledger is None:
+        _ledger = RemediationLedger(
+            store,
+            lease_seconds=int(os.environ.get('REMEDIATION_LEASE_SECONDS', '60')),
+            result_ttl=int(os.environ.get('REMEDIATION_DEDUP_SECONDS', '300'))
+        )
+    return _ledger
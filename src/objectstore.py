@@ -0,0 +1,102 @@
+import os
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+
+class ObjectStore(ABC):
+    """Blob storage for payloads too large to return or keep in the analysis store"""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str = 'application/json',
+            content_encoding: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def url(self, key: str, expires_in: int = 3600) -> str:
+        ...
+
+
+class S3ObjectStore(ObjectStore):
+    """ObjectStore backed by an S3 bucket, shared through presigned URLs"""
+
+    def __init__(self, bucket: str, prefix: str = '', region: Optional[str] = None, client: Any = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.s3 = client or boto3.client('s3', region_name=region)
+
+    def put(self, key: str, data: bytes, content_type: str = 'application/json',
+            content_encoding: Optional[str] = None):
+        extra = {'ContentEncoding': content_encoding} if content_encoding else {}
+        self.s3.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data,
+                           ContentType=content_type, **extra)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.s3.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            raise
+
+    def url(self, key: str, expires_in: int = 3600) -> str:
+        return self.s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self.prefix + key},
+            ExpiresIn=expires_in
+        )
+
+
+class LocalObjectStore(ObjectStore):
+    """ObjectStore on the local filesystem, used locally and in tests"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Object key escapes the store root: {key}")
+        return path
+
+    def put(self, key: str, data: bytes, content_type: str = 'application/json',
+            content_encoding: Optional[str] = None):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        return path.read_bytes() if path.exists() else None
+
+    def url(self, key: str, expires_in: int = 3600) -> str:
+        return self._path(key).as_uri()
+
+
+_object_store: Optional[ObjectStore] = None
+
+
+def get_object_store(region: Optional[str] = None) -> ObjectStore:
+    """Return the per-container object store, S3 when a bucket is configured"""
+    global _object_store
+    if _object_store is None:
+        bucket = os.environ.get('RESULTS_BUCKET')
+        if bucket:
+            _object_store = S3ObjectStore(bucket, prefix=os.environ.get('RESULTS_PREFIX', 'responses/'), region=region)
+            logger.info(f"Using S3 object store: {bucket}")
+        else:
+            root = os.environ.get('RESULTS_PATH', '/tmp/security-hub-chatbot-results')
+            _object_store = LocalObjectStore(root)
+            logger.info(f"Using local object store: {root}")
+    return _object_store
@@ -0,0 +1,134 @@
+import gzip
+import json
+import uuid
+import base64
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+
+from objectstore import ObjectStore
+
+logger = logging.getLogger()
+
+# Bodies below this size are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+# Lambda caps synchronous responses at 6 MB; spill well before that
+DEFAULT_SPILL_BYTES = 1024 * 1024
+
+
+class InvalidCursor(ValueError):
+    """Raised for malformed cursors or cursors whose stored result has expired"""
+
+
+def parse_fields(fields: Union[str, List[str], None]) -> Optional[List[List[str]]]:
+    """'finding_id,analysis.explanation' -> [['finding_id'], ['analysis', 'explanation']]"""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    return [field.strip().split('.') for field in fields if field.strip()]
+
+
+def project(item: Dict, paths: Optional[List[List[str]]]) -> Dict:
+    """Keep only the requested (possibly nested) fields of a dict"""
+    if paths is None:
+        return item
+    projected: Dict = {}
+    for path in paths:
+        value = item
+        for part in path:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = value
+    return projected
+
+
+def encode_cursor(result_id: str, offset: int) -> str:
+    raw = json.dumps({'r': result_id, 'o': offset}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        result_id, offset = str(data['r']), int(data['o'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {str(e)}")
+    if offset < 0:
+        raise InvalidCursor("Invalid cursor: negative offset")
+    return result_id, offset
+
+
+def paginate(result: Dict, limit: Optional[int], cursor: Optional[str],
+             objects: ObjectStore) -> Tuple[Dict, Optional[str]]:
+    """Slice result['remediations'] into a page, returning (page_result, next_cursor).
+
+    The first request for a multi-page result stores the full result in the
+    object store; cursors point back into that copy, so later pages neither
+    recompute the analysis nor depend on the findings being unchanged.
+    """
+    if limit is not None and limit < 1:
+        raise ValueError(f"limit must be at least 1, got {limit}")
+
+    offset = 0
+    if cursor:
+        result_id, offset = decode_cursor(cursor)
+        stored = objects.get(f"results/{result_id}.json")
+        if stored is None:
+            raise InvalidCursor("Cursor has expired; repeat the original request")
+        result = json.loads(stored)
+
+    remediations = result.get('remediations', [])
+    if not limit or (not cursor and len(remediations) <= limit):
+        return result, None
+
+    if not cursor:
+        result_id = uuid.uuid4().hex
+        objects.put(f"results/{result_id}.json", json.dumps(result, default=str).encode('utf-8'))
+
+    end = offset + limit
+    page = dict(result, remediations=remediations[offset:end])
+    return page, encode_cursor(result_id, end) if end < len(remediations) else None
+
+
+def accepts_gzip(headers: Optional[Dict]) -> bool:
+    for name, value in (headers or {}).items():
+        if name.lower() == 'accept-encoding':
+            return 'gzip' in (value or '').lower()
+    return False
+
+
+def encode_response(status_code: int, body: Dict, headers: Dict, event: Dict,
+                    objects: ObjectStore, spill_bytes: int = DEFAULT_SPILL_BYTES) -> Dict:
+    """Serialize a body for API Gateway, gzipping and spilling it to the object store as needed"""
+    raw = json.dumps(body, default=str, separators=(',', ':')).encode('utf-8')
+    use_gzip = accepts_gzip(event.get('headers')) and len(raw) >= GZIP_MIN_BYTES
+    data = gzip.compress(raw) if use_gzip else raw
+
+    if len(data) > spill_bytes:
+        key = f"spill/{uuid.uuid4().hex}.json"
+        objects.put(key, data, content_encoding='gzip' if use_gzip else None)
+        logger.info(f"Spilled {len(data)} byte response to object store: {key}")
+        return {
+            'statusCode': status_code,
+            'headers': headers,
+            'body': json.dumps({
+                'result_url': objects.url(key),
+                'size_bytes': len(data),
+                'content_encoding': 'gzip' if use_gzip else 'identity'
+            })
+        }
+
+    if use_gzip:
+        return {
+            'statusCode': status_code,
+            'headers': dict(headers, **{'Content-Encoding': 'gzip'}),
+            'body': base64.b64encode(data).decode('ascii'),
+            'isBase64Encoded': True
+        }
+    return {'statusCode': status_code, 'headers': headers, 'body': raw.decode('utf-8')}
@@ -0,0 +1,181 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from prioritize import SEVERITY_NORMALIZED
+
+logger = logging.getLogger()
+
+# Shipped single-port documents, keyed by the name fragment that identifies them
+DOCUMENT_PORTS = {
+    'UnrestrictedSSH': 22,
+    'UnrestrictedRDP': 3389,
+}
+
+
+def merged_ports_document(environment: str) -> str:
+    return f'SecurityHub-RemediateUnrestrictedPorts-{environment}'
+
+
+def security_group_id(finding: Dict) -> Optional[str]:
+    """Security group targeted by a finding, from its first resource ARN"""
+    resources = finding.get('Resources', [])
+    if not resources:
+        return None
+    resource_id = resources[0].get('Id', '')
+    if 'security-group' not in resource_id.lower():
+        return None
+    # Format: arn:aws:ec2:region:account:security-group/sg-xxxxxxxxx
+    sg_id = resource_id.split('/')[-1] if '/' in resource_id else resource_id.split(':')[-1]
+    return sg_id if sg_id.startswith('sg-') else None
+
+
+def document_port(document: str) -> Optional[int]:
+    for fragment, port in DOCUMENT_PORTS.items():
+        if fragment in document:
+            return port
+    return None
+
+
+def severity_priority(finding: Dict) -> int:
+    """Execution priority of a finding; critical findings are remediated first"""
+    return SEVERITY_NORMALIZED.get(finding.get('Severity', {}).get('Label', ''), 0)
+
+
+def plan_remediations(items: List[Tuple[Dict, Dict]], environment: str) -> Dict:
+    """Turn (finding, analysis) pairs into one remediation command per security group.
+
+    Findings that target the same group are merged: a single port keeps its
+    shipped document, and several ports use the multi-port document.
+    Repeated (group, port) pairs from different findings are deduplicated.
+    The plan lists every finding each action covers and estimates the
+    send_command calls saved compared with remediating one by one. Each
+    action carries the highest severity priority among its findings.
+    """
+    groups: Dict[str, Dict] = {}
+    skipped = []
+    automatable = 0
+    duplicates = 0
+
+    for finding, analysis in items:
+        finding_id = finding.get('Id', 'unknown')
+        document = analysis.get('ssm_document')
+        if not (analysis.get('automated') and document):
+            continue
+        automatable += 1
+
+        sg_id = security_group_id(finding)
+        port = document_port(document)
+        if sg_id is None or port is None:
+            skipped.append({
+                'finding_id': finding_id,
+                'reason': f"No mergeable security group action for {document}",
+                'priority': severity_priority(finding),
+                'finding': finding,
+                'analysis': analysis
+            })
+            continue
+
+        group = groups.setdefault(sg_id, {'ports': {}, 'finding_ids': [], 'priority': 0})
+        group['priority'] = max(group['priority'], severity_priority(finding))
+        if port in group['ports']:
+            duplicates += 1
+        group['ports'].setdefault(port, document)
+        if finding_id not in group['finding_ids']:
+            group['finding_ids'].append(finding_id)
+
+    actions = []
+    for sg_id, group in groups.items():
+        ports = sorted(group['ports'])
+        document, parameters = _action_for_ports(sg_id, group['ports'], ports, environment)
+        actions.append({
+            'security_group_id': sg_id,
+            'document': document,
+            'parameters': parameters,
+            'ports': ports,
+            'port_documents': group['ports'],
+            'finding_ids': group['finding_ids'],
+            'priority': group['priority']
+        })
+
+    planned_calls = len(actions) + len(skipped)
+    estimate = {
+        'findings': automatable,
+        'security_groups': len(actions),
+        'duplicates_removed': duplicates,
+        'naive_send_command_calls': automatable,
+        'planned_send_command_calls': planned_calls,
+        'calls_saved': automatable - planned_calls
+    }
+    logger.info(f"Remediation plan: {automatable} findings -> {planned_calls} commands "
+                f"({len(actions)} security groups, {duplicates} duplicates removed)")
+    return {'actions': actions, 'skipped': skipped, 'estimate': estimate}
+
+
+def _action_for_ports(sg_id: str, ports_to_documents: Dict[int, str], ports: List[int], environment: str) -> Tuple[str, Dict]:
+    if len(ports) == 1:
+        return ports_to_documents[ports[0]], {'SecurityGroupId': sg_id}
+    return merged_ports_document(environment), {'SecurityGroupId': sg_id, 'Ports': ','.join(str(p) for p in ports)}
+
+
+def apply_preflight(plan: Dict, open_by_group: Dict[str, Optional[Dict[str, set]]], environment: str) -> Dict[str, Dict]:
+    """Drop no-op work from a plan using the current rules of each group.
+
+    Ports no longer open to 0.0.0.0/0 are removed from their action, and
+    actions left with nothing to close are dropped. Ports open only to
+    ::/0, or to 0.0.0.0/0 only through an all-traffic or port-range rule,
+    need manual work, since the documents only revoke single-port tcp
+    rules on 0.0.0.0/0.
+    Groups that no longer exist are reported as errors. Groups missing
+    from `open_by_group` (lookup failed) are left as planned. Returns the
+    result for every finding whose action was dropped.
+    """
+    results = {}
+    kept = []
+    for action in plan['actions']:
+        sg_id = action['security_group_id']
+        if sg_id not in open_by_group:
+            kept.append(action)
+            continue
+
+        still_open = open_by_group[sg_id]
+        if still_open is None:
+            result = {"status": "error", "message": f"Security group {sg_id} no longer exists", "resource_id": sg_id}
+        else:
+            ipv4 = sorted(still_open['ipv4'] & set(action['ports']))
+            ipv6 = sorted(still_open['ipv6'] & set(action['ports']))
+            broad = sorted(still_open['broad'] & set(action['ports']))
+            if ipv4:
+                if ipv4 != action['ports']:
+                    documents = {port: document for port, document in action['port_documents'].items() if port in ipv4}
+                    action['document'], action['parameters'] = _action_for_ports(sg_id, documents, ipv4, environment)
+                    action['ports'] = ipv4
+                if ipv6:
+                    action['ipv6_ports'] = ipv6
+                if broad:
+                    action['broad_ports'] = broad
+                kept.append(action)
+                continue
+            if broad:
+                result = {"status": "manual", "message": f"Ports {', '.join(str(p) for p in broad)} of {sg_id} are open "
+                          f"to 0.0.0.0/0 through an all-traffic or port-range rule; the remediation documents only "
+                          f"revoke single-port tcp rules, so narrow or remove that rule manually",
+                          "resource_id": sg_id, "broad_ports": broad}
+                if ipv6:
+                    result['ipv6_ports'] = ipv6
+            elif ipv6:
+                result = {"status": "manual", "message": f"Ports {', '.join(str(p) for p in ipv6)} of {sg_id} are open "
+                          f"to ::/0; the remediation documents only revoke 0.0.0.0/0 rules, so remove the IPv6 rule manually",
+                          "resource_id": sg_id, "ipv6_ports": ipv6}
+            else:
+                result = {"status": "success", "message": f"Already remediated: no 0.0.0.0/0 or ::/0 rule on ports "
+                          f"{', '.join(str(p) for p in action['ports'])} of {sg_id}", "resource_id": sg_id, "no_op": True}
+
+        for finding_id in action['finding_ids']:
+            results[finding_id] = dict(result)
+
+    plan['estimate']['no_op_skipped'] = len(plan['actions']) - len(kept)
+    plan['estimate']['planned_send_command_calls'] -= len(plan['actions']) - len(kept)
+    plan['estimate']['calls_saved'] = plan['estimate']['naive_send_command_calls'] - plan['estimate']['planned_send_command_calls']
+    plan['actions'] = kept
+    return results
+
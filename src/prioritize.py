@@ -0,0 +1,137 @@
+import os
+import re
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger()
+
+# Column order of the feature matrix
+FEATURES = ('severity', 'age', 'exposure', 'criticality', 'failed')
+
+DEFAULT_WEIGHTS = {
+    'severity': 0.45,
+    'age': 0.10,
+    'exposure': 0.25,
+    'criticality': 0.15,
+    'failed': 0.05,
+}
+
+SEVERITY_NORMALIZED = {'CRITICAL': 90, 'HIGH': 70, 'MEDIUM': 40, 'LOW': 1, 'INFORMATIONAL': 0}
+
+# Findings older than this get the full age score
+AGE_SATURATION_DAYS = 90.0
+
+CRITICALITY_TAG_KEYS = ('criticality', 'data-classification', 'environment', 'env')
+CRITICALITY_TAG_VALUES = {
+    'critical': 1.0, 'high': 0.8, 'prod': 0.8, 'production': 0.8, 'confidential': 0.8,
+    'restricted': 1.0, 'medium': 0.5, 'staging': 0.4, 'low': 0.2, 'dev': 0.1, 'test': 0.1,
+}
+
+_EXPOSURE_RE = re.compile(r'0\.0\.0\.0/0|::/0|internet|public', re.IGNORECASE)
+
+
+def _to_datetime64(value: str) -> np.datetime64:
+    try:
+        return np.datetime64(value, 's')
+    except ValueError:
+        return np.datetime64('NaT')
+
+
+def _criticality(resources: List[Dict], cache: Dict[tuple, float]) -> float:
+    best = 0.0
+    for resource in resources:
+        tags = resource.get('Tags')
+        if not tags:
+            continue
+        key = tuple(tags.items())
+        score = cache.get(key)
+        if score is None:
+            score = max((CRITICALITY_TAG_VALUES.get(str(value).lower(), 0.0) for name, value in key
+                         if name.lower() in CRITICALITY_TAG_KEYS), default=0.0)
+            cache[key] = score
+        best = max(best, score)
+    return best
+
+
+def _severity(severity: Dict) -> float:
+    normalized = severity.get('Normalized')
+    return normalized if normalized is not None else SEVERITY_NORMALIZED.get(severity.get('Label', ''), 0)
+
+
+def extract_features(findings: List[Dict]) -> np.ndarray:
+    """Build the (n, len(FEATURES)) columnar feature matrix.
+
+    Each field is pulled into its own column in one pass and converted
+    with np.fromiter. Titles and resource tags repeat heavily across
+    findings, so the exposure regex and the criticality lookup run once
+    per distinct value.
+    """
+    n = len(findings)
+    severity = np.fromiter((_severity(f.get('Severity', {})) for f in findings), dtype=np.float32, count=n)
+    # ASFF timestamps are ISO 8601; the first 19 characters are second precision UTC
+    first_seen = [(f.get('FirstObservedAt') or f.get('CreatedAt') or 'NaT')[:19] for f in findings]
+
+    titles = [f.get('Title', '') for f in findings]
+    exposed_titles = {title for title in set(titles) if _EXPOSURE_RE.search(title)}
+    exposure = np.fromiter(
+        (title in exposed_titles or f.get('Network', {}).get('Direction') == 'IN' for title, f in zip(titles, findings)),
+        dtype=np.float32, count=n)
+    tag_scores = {}
+    criticality = np.fromiter((_criticality(f.get('Resources', []), tag_scores) for f in findings),
+                              dtype=np.float32, count=n)
+    failed = np.fromiter((f.get('Compliance', {}).get('Status') == 'FAILED' for f in findings),
+                         dtype=np.float32, count=n)
+
+    try:
+        observed = np.array(first_seen, dtype='datetime64[s]')
+    except ValueError:
+        observed = np.array([_to_datetime64(value) for value in first_seen], dtype='datetime64[s]')
+    now = np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None), 's')
+    age_days = np.where(np.isnat(observed), 0.0, (now - observed).astype(np.float64) / 86400.0)
+    age = np.clip(age_days / AGE_SATURATION_DAYS, 0.0, 1.0)
+
+    return np.column_stack([severity / 100.0, age, exposure, criticality, failed]).astype(np.float32)
+
+
+def weight_vector(weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    merged = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    return np.array([merged[name] for name in FEATURES], dtype=np.float32)
+
+
+def score_features(features: np.ndarray, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Weighted sum of the feature columns, one score in [0, 1] per finding"""
+    vector = weight_vector(weights)
+    return features @ (vector / vector.sum())
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the k highest scores, best first, without a full sort"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def load_weights() -> Dict[str, float]:
+    """Weights from PRIORITY_WEIGHTS (JSON object), falling back to the defaults"""
+    raw = os.environ.get('PRIORITY_WEIGHTS')
+    if not raw:
+        return dict(DEFAULT_WEIGHTS)
+    try:
+        weights = {k: float(v) for k, v in json.loads(raw).items() if k in DEFAULT_WEIGHTS}
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid PRIORITY_WEIGHTS: {str(e)}")
+        return dict(DEFAULT_WEIGHTS)
+    return dict(DEFAULT_WEIGHTS, **weights)
+
+
+def prioritize_findings(findings: List[Dict], weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Priority score per finding, aligned with the input order"""
+    if not findings:
+        return np.empty(0, dtype=np.float32)
+    return score_features(extract_features(findings), weights)
@@ -0,0 +1,225 @@
+import re
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from compact import compact_output_format
+
+# Rough characters-per-token ratio for English text on Claude/Titan tokenizers
+CHARS_PER_TOKEN = 4
+
+# Budget for the per-finding message; the static system prompt is not counted
+DEFAULT_TOKEN_BUDGET = 400
+
+# Sentences that appear in many ASFF descriptions but tell the model nothing
+BOILERPLATE_PATTERNS = [
+    re.compile(r'^for (more|additional) (information|details)\b', re.IGNORECASE),
+    re.compile(r'^see (also|the)\b.*\b(documentation|user guide)\b', re.IGNORECASE),
+    re.compile(r'^to remediate this (issue|finding)\b', re.IGNORECASE),
+    re.compile(r'^refer to\b', re.IGNORECASE),
+    re.compile(r'https?://\S+'),
+]
+
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate without loading a tokenizer"""
+    if not text:
+        return 0
+    # Word/punctuation pieces undercount long identifiers, char ratio undercounts
+    # punctuation-heavy JSON; taking the larger of the two stays conservative.
+    pieces = len(_TOKEN_RE.findall(text))
+    return max(pieces, len(text) // CHARS_PER_TOKEN)
+
+
+def compact_json(value) -> str:
+    """Serialize without indentation or spaces between separators"""
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+def compact_description(description: str, max_tokens: int) -> str:
+    """Drop boilerplate and repeated sentences, then truncate to the token budget"""
+    if not description:
+        return 'N/A'
+
+    text = _WHITESPACE_RE.sub(' ', description).strip()
+    sentences = []
+    seen = set()
+    for sentence in _SENTENCE_RE.split(text):
+        key = sentence.lower().strip()
+        if not key or key in seen:
+            continue
+        if any(pattern.search(sentence) for pattern in BOILERPLATE_PATTERNS):
+            continue
+        seen.add(key)
+        sentences.append(sentence)
+
+    compacted = ''
+    for sentence in sentences:
+        candidate = f"{compacted} {sentence}".strip()
+        if estimate_tokens(candidate) > max_tokens:
+            break
+        compacted = candidate
+
+    if not compacted and sentences:
+        # A single oversized sentence: hard-truncate on characters
+        compacted = sentences[0][:max(max_tokens, 1) * CHARS_PER_TOKEN].rstrip() + '...'
+    elif len(compacted) < len(' '.join(sentences)):
+        compacted += ' ...'
+
+    return compacted or 'N/A'
+
+
+def compact_resources(resources: List[Dict], finding_region: str = '', limit: int = 3) -> List[Dict]:
+    """Keep only the resource fields the model uses"""
+    compacted = []
+    for resource in resources[:limit]:
+        entry = {
+            'id': resource.get('Id', 'N/A'),
+            'type': resource.get('Type', 'N/A')
+        }
+        region = resource.get('Region')
+        if region and region != finding_region:
+            entry['region'] = region
+        compacted.append(entry)
+    return compacted
+
+
+# Models on Bedrock that accept prompt-caching checkpoints, with the minimum
+# number of tokens before a checkpoint; shorter prefixes are not cached
+PROMPT_CACHING_MODELS = {
+    'anthropic.claude-3-5-haiku': 2048,
+    'anthropic.claude-3-7-sonnet': 1024,
+    'anthropic.claude-haiku-4': 4096,
+    'anthropic.claude-sonnet-4': 1024,
+    'anthropic.claude-opus-4': 1024,
+    'amazon.nova': 1024,
+}
+
+# Remediation guidance for common Security Hub controls. Only sent to models
+# that cache the system prompt, where it lifts the static prefix above the
+# caching minimum and is paid for once per cache lifetime.
+REMEDIATION_CATALOG = """Remediation catalog for common Security Hub controls:
+- EC2.13 / EC2.14: security group allows 0.0.0.0/0 to port 22 / 3389. Automated: revoke_sg_rule with SecurityHub-RemediateUnrestrictedSSH-{environment} or SecurityHub-RemediateUnrestrictedRDP-{environment}.
+- EC2.18 / EC2.19: security group allows unrestricted traffic on unauthorized or high-risk ports. Automated only for single tcp ports open to 0.0.0.0/0, with SecurityHub-RemediateUnrestrictedPorts-{environment}; rules for all traffic, port ranges or ::/0 need manual review.
+- EC2.2: the default security group allows traffic. Manual review: remove its rules after checking nothing depends on them.
+- EC2.21: a network ACL allows 0.0.0.0/0 to port 22 or 3389. Manual review: replace the allow entry with a narrower CIDR; no SSM document covers network ACLs.
+- EC2.8: instance does not require IMDSv2. update_configuration: set HttpTokens to required after confirming the SDKs on the instance support IMDSv2.
+- EC2.9: instance has a public IPv4 address. Manual review: move it behind a load balancer or NAT.
+- EC2.7: EBS default encryption is disabled. update_configuration: enable default EBS encryption in the region.
+- EC2.1 / RDS.1 / EC2.40: public snapshots. update_configuration: remove the all-users permission from the snapshot.
+- IAM.1: a policy allows full "*:*" administrative privileges. update_policy: replace with least-privilege statements; never automate, detaching can lock administrators out.
+- IAM.2: IAM user has attached policies. update_policy: move permissions to groups or roles.
+- IAM.3: access keys older than 90 days. Manual review: rotate the key with the owner.
+- IAM.4 / IAM.6 / IAM.9: root user access keys or MFA. Manual review by the account owner only.
+- IAM.5 / IAM.19: console users without MFA. Manual review: enforce MFA for the user.
+- IAM.8: unused credentials older than 90 days. update_configuration: deactivate them after confirming they are unused.
+- S3.1 / S3.8: S3 Block Public Access is off. update_configuration: enable Block Public Access at the account or bucket level after checking for intended public hosting.
+- S3.2 / S3.3: bucket allows public read or write. update_policy: remove public grants and policy statements with a "*" principal.
+- S3.4: default encryption missing. update_configuration: enable SSE-S3 or SSE-KMS default encryption.
+- S3.5: bucket policy does not require TLS. update_policy: deny requests where aws:SecureTransport is false.
+- S3.9: server access logging disabled. update_configuration: enable logging to a dedicated log bucket.
+- CloudTrail.1 / CloudTrail.2 / CloudTrail.4: trail missing, unencrypted or without log file validation. update_configuration: create a multi-region trail with KMS encryption and validation.
+- Config.1: AWS Config is not recording. Manual review: account-level decision.
+- GuardDuty.1 / SecurityHub.1: service not enabled. Manual review: account-level decision.
+- KMS.4: key rotation disabled. update_configuration: enable automatic rotation of the customer managed key.
+- Lambda.1: function policy allows public invocation. update_policy: remove the "*" principal or add a source condition.
+- RDS.2: DB instance is publicly accessible. update_configuration: set PubliclyAccessible to false after checking clients.
+- RDS.3: storage not encrypted. Manual review: encryption requires restoring from an encrypted snapshot.
+- ELB.1 / ELB.2: listener without HTTPS redirect or a current TLS policy. update_configuration: redirect HTTP to HTTPS and use a recent security policy.
+- Account.1: security contact missing. Manual review by an account administrator.
+For controls not listed, prefer manual_review unless the change is reversible, limited to one resource and cannot break access."""
+
+
+def prompt_caching_minimum(model_id: str) -> Optional[int]:
+    """Minimum cacheable prefix for a model, or None when it does not support caching"""
+    return next((tokens for prefix, tokens in PROMPT_CACHING_MODELS.items() if prefix in model_id), None)
+
+
+def supports_prompt_caching(model_id: str, prefix_tokens: int) -> bool:
+    """Whether a checkpoint after `prefix_tokens` of static prompt would actually be cached"""
+    minimum = prompt_caching_minimum(model_id)
+    return minimum is not None and prefix_tokens >= minimum
+
+
+@lru_cache(maxsize=16)
+def build_system_prompt(environment: str, structured: bool = False, compact: bool = False,
+                        catalog: bool = False) -> str:
+    """Static instructions shared by every analysis, kept byte-identical so they cache.
+
+    In structured mode the output format comes from the tool schema, so the
+    inline JSON description is left out. Compact mode asks for short codes
+    that are expanded locally. `catalog` appends REMEDIATION_CATALOG.
+    """
+    if compact:
+        output_format = compact_output_format(structured)
+    elif structured:
+        output_format = "Submit your analysis by calling the submit_remediation tool."
+    else:
+        output_format = f"""Respond with a JSON object with these exact fields:
+{{
+    "remediation_action": "specific action to take (e.g., 'revoke_sg_rule', 'manual_review', 'update_policy')",
+    "ssm_document": "SSM document name if applicable (e.g., 'SecurityHub-RemediateUnrestrictedSSH-{environment}') or null",
+    "parameters": {{"key": "value pairs needed for remediation"}},
+    "explanation": "brief explanation of the issue and fix",
+    "severity_assessment": "your assessment of the risk level",
+    "automated": true/false whether this can be automatically remediated
+}}"""
+
+    prompt = f"""You are a security expert analyzing AWS Security Hub findings. Based on the user query and finding details, provide remediation recommendations.
+
+{output_format}
+
+Available SSM documents:
+- SecurityHub-RemediateUnrestrictedSSH-{environment}: revokes 0.0.0.0/0 ingress on port 22 (parameter SecurityGroupId)
+- SecurityHub-RemediateUnrestrictedRDP-{environment}: revokes 0.0.0.0/0 ingress on port 3389 (parameter SecurityGroupId)
+- SecurityHub-RemediateUnrestrictedPorts-{environment}: revokes 0.0.0.0/0 ingress on several tcp ports (parameters SecurityGroupId, Ports)
+
+Focus on common Security Hub findings like:
+- Unrestricted SSH (port 22) access from 0.0.0.0/0
+- Unrestricted RDP (port 3389) access from 0.0.0.0/0
+- Security group misconfigurations
+- IAM policy issues
+
+Only suggest automated remediation for well-defined, low-risk changes."""
+    if catalog:
+        prompt = f"{prompt}\n\n{REMEDIATION_CATALOG.format(environment=environment)}"
+    return prompt
+
+
+def build_finding_message(finding: Dict, user_query: str,
+                          token_budget: int = DEFAULT_TOKEN_BUDGET) -> Tuple[str, int]:
+    """Build the small per-finding message, returning it with its token estimate"""
+    title = finding.get('Title', 'N/A')
+    severity = finding.get('Severity', {}).get('Label', 'N/A')
+    compliance = finding.get('Compliance', {})
+    compliance_status = compliance.get('Status', 'N/A')
+    control_id = compliance.get('SecurityControlId')
+    resources = compact_resources(finding.get('Resources', []), finding.get('Region', ''))
+
+    def render(description: str) -> str:
+        details = [
+            f"- Title: {title}",
+            f"- Description: {description}",
+            f"- Severity: {severity}",
+            f"- Compliance Status: {compliance_status}",
+        ]
+        if control_id:
+            details.append(f"- Control: {control_id}")
+        details.append(f"- Resources: {compact_json(resources)}")
+
+        return f"""User Query: {user_query}
+
+Finding Details:
+{chr(10).join(details)}"""
+
+    # Whatever the fixed parts leave over goes to the description
+    fixed_tokens = estimate_tokens(render(''))
+    description_budget = max(token_budget - fixed_tokens, 32)
+    description = compact_description(finding.get('Description', ''), description_budget)
+
+    message = render(description)
+    return message, estimate_tokens(message)
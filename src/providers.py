@@ -0,0 +1,265 @@
+import os
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger()
+
+# Converse rejects system blocks for these model families
+NO_SYSTEM_PROMPT_MODELS = ('amazon.titan-text',)
+
+
+def supports_system_prompt(model_id: str) -> bool:
+    return not any(prefix in model_id for prefix in NO_SYSTEM_PROMPT_MODELS)
+
+
+def empty_usage() -> Dict[str, int]:
+    return {
+        'input_tokens': 0,
+        'output_tokens': 0,
+        'cache_read_input_tokens': 0,
+        'cache_write_input_tokens': 0
+    }
+
+
+class ModelProvider(ABC):
+    """One interface for sync, streaming and batched model calls.
+
+    Every backend returns the same normalized response:
+    {'model_id', 'text', 'tool_use', 'stop_reason', 'usage', 'latency_ms'}
+    where usage holds input/output/cache read/cache write token counts.
+    Sync calls go through the optional rate limiter and hedged caller.
+    """
+
+    def __init__(self, limiter: Any = None, hedger: Any = None, max_workers: int = 8):
+        self.limiter = limiter
+        self.hedger = hedger
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def executor(self) -> ThreadPoolExecutor:
+        """Worker pool for batched calls, created on first use and kept for the container"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='model-batch')
+            return self._pool
+
+    def converse(self, model_id: str, system: str, message: str, max_tokens: int = 1000,
+                 temperature: float = 0.1, cache_system: bool = False,
+                 tool_config: Optional[Dict] = None, estimated_tokens: int = 0,
+                 history: Optional[List[Dict]] = None) -> Dict:
+        """Single request/response call; `history` holds Converse turns that follow `message`"""
+        request = self._build_request(model_id, system, message, max_tokens, temperature,
+                                      cache_system, tool_config, history)
+
+        def call():
+            return self._converse(request)
+
+        if self.limiter is not None:
+            limited = call
+            call = lambda: self.limiter.call(limited, estimated_tokens + max_tokens)  # noqa: E731
+
+        start = time.time()
+        if self.hedger is not None:
+            response = self.hedger.call(model_id, call)
+        else:
+            response = call()
+        if response.get('latency_ms') is None:
+            response['latency_ms'] = int((time.time() - start) * 1000)
+        return response
+
+    def converse_stream(self, model_id: str, system: str, message: str, max_tokens: int = 1000,
+                        temperature: float = 0.1, cache_system: bool = False,
+                        tool_config: Optional[Dict] = None,
+                        history: Optional[List[Dict]] = None) -> Iterator[Dict]:
+        """Yield {'type': 'text', 'text': ...} deltas, then {'type': 'done', 'response': ...}"""
+        request = self._build_request(model_id, system, message, max_tokens, temperature,
+                                      cache_system, tool_config, history)
+        yield from self._converse_stream(request)
+
+    def converse_batch(self, requests: List[Dict]) -> List[Union[Dict, Exception]]:
+        """Run many converse() calls concurrently; failures are returned, not raised"""
+        def run(kwargs):
+            try:
+                return self.converse(**kwargs)
+            except Exception as e:
+                logger.error(f"Batched model call failed: {str(e)}")
+                return e
+
+        if len(requests) <= 1:
+            return [run(kwargs) for kwargs in requests]
+        return list(self.executor().map(run, requests))
+
+    @staticmethod
+    def _build_request(model_id: str, system: str, message: str, max_tokens: int, temperature: float,
+                       cache_system: bool, tool_config: Optional[Dict],
+                       history: Optional[List[Dict]] = None) -> Dict:
+        request = {
+            'modelId': model_id,
+            'inferenceConfig': {'maxTokens': max_tokens, 'temperature': temperature}
+        }
+        if system and supports_system_prompt(model_id):
+            system_blocks = [{'text': system}]
+            if cache_system:
+                system_blocks.append({'cachePoint': {'type': 'default'}})
+            request['system'] = system_blocks
+        elif system:
+            message = f"{system}\n\n{message}"
+        request['messages'] = [{'role': 'user', 'content': [{'text': message}]}] + list(history or [])
+        if tool_config:
+            request['toolConfig'] = tool_config
+        return request
+
+    @abstractmethod
+    def _converse(self, request: Dict) -> Dict:
+        ...
+
+    @abstractmethod
+    def _converse_stream(self, request: Dict) -> Iterator[Dict]:
+        ...
+
+
+class BedrockConverseProvider(ModelProvider):
+    """Provider backed by the Bedrock Converse and ConverseStream APIs"""
+
+    def __init__(self, region: Optional[str] = None, client: Any = None, **kwargs):
+        super().__init__(**kwargs)
+        # Throttling and transient-error retries are handled by the shared limiter so it sees every attempt
+        self.client = client or boto3.client(
+            'bedrock-runtime', region_name=region,
+            config=Config(retries={'mode': 'standard', 'max_attempts': 1})
+        )
+
+    @staticmethod
+    def _normalize_usage(usage: Dict) -> Dict[str, int]:
+        return {
+            'input_tokens': usage.get('inputTokens', 0),
+            'output_tokens': usage.get('outputTokens', 0),
+            'cache_read_input_tokens': usage.get('cacheReadInputTokens', 0),
+            'cache_write_input_tokens': usage.get('cacheWriteInputTokens', 0)
+        }
+
+    def _converse(self, request: Dict) -> Dict:
+        response = self.client.converse(**request)
+        text = ''
+        tool_use = None
+        for block in response.get('output', {}).get('message', {}).get('content', []):
+            if 'text' in block:
+                text += block['text']
+            elif 'toolUse' in block and tool_use is None:
+                tool_use = block['toolUse']
+        return {
+            'model_id': request['modelId'],
+            'text': text,
+            'tool_use': tool_use,
+            'stop_reason': response.get('stopReason'),
+            'usage': self._normalize_usage(response.get('usage', {})),
+            'latency_ms': response.get('metrics', {}).get('latencyMs')
+        }
+
+    def _converse_stream(self, request: Dict) -> Iterator[Dict]:
+        if self.limiter is not None:
+            # Only admission is limited; the stream itself is consumed lazily
+            response = self.limiter.call(lambda: self.client.converse_stream(**request))
+        else:
+            response = self.client.converse_stream(**request)
+
+        text = ''
+        tool_use = None
+        tool_input = ''
+        stop_reason = None
+        usage = {}
+        latency_ms = None
+        for event in response['stream']:
+            if 'contentBlockStart' in event:
+                start = event['contentBlockStart'].get('start', {})
+                if 'toolUse' in start and tool_use is None:
+                    tool_use = dict(start['toolUse'])
+            elif 'contentBlockDelta' in event:
+                delta = event['contentBlockDelta']['delta']
+                if 'text' in delta:
+                    text += delta['text']
+                    yield {'type': 'text', 'text': delta['text']}
+                elif 'toolUse' in delta:
+                    tool_input += delta['toolUse'].get('input', '')
+            elif 'messageStop' in event:
+                stop_reason = event['messageStop'].get('stopReason')
+            elif 'metadata' in event:
+                usage = event['metadata'].get('usage', {})
+                latency_ms = event['metadata'].get('metrics', {}).get('latencyMs')
+
+        if tool_use is not None:
+            tool_use['input'] = tool_input
+        yield {
+            'type': 'done',
+            'response': {
+                'model_id': request['modelId'],
+                'text': text,
+                'tool_use': tool_use,
+                'stop_reason': stop_reason,
+                'usage': self._normalize_usage(usage),
+                'latency_ms': latency_ms
+            }
+        }
+
+
+class FakeProvider(ModelProvider):
+    """Local provider for tests and benchmarks; no AWS calls.
+
+    `responder(request)` returns the text (or a full normalized response
+    dict) for a request; `latency()` returns seconds to sleep per call.
+    """
+
+    def __init__(self, responder: Callable[[Dict], Union[str, Dict]],
+                 latency: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.responder = responder
+        self.latency = latency
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def _converse(self, request: Dict) -> Dict:
+        with self._lock:
+            self.requests.append(request)
+        if self.latency is not None:
+            time.sleep(self.latency())
+        result = self.responder(request)
+        if isinstance(result, dict):
+            response = {'model_id': request['modelId'], 'text': '', 'tool_use': None,
+                        'stop_reason': 'end_turn', 'usage': empty_usage()}
+            response.update(result)
+            return response
+
+        usage = empty_usage()
+        usage['input_tokens'] = sum(len(b.get('text', '')) for b in request.get('system', [])) // 4 + \
+            sum(len(c.get('text', '')) for m in request['messages'] for c in m['content']) // 4
+        usage['output_tokens'] = len(result) // 4
+        return {'model_id': request['modelId'], 'text': result, 'tool_use': None,
+                'stop_reason': 'end_turn', 'usage': usage}
+
+    def _converse_stream(self, request: Dict) -> Iterator[Dict]:
+        response = self._converse(request)
+        for i in range(0, len(response['text']), 16):
+            yield {'type': 'text', 'text': response['text'][i:i + 16]}
+        yield {'type': 'done', 'response': response}
+
+
+_provider: Optional[ModelProvider] = None
+
+
+def get_model_provider(region: Optional[str] = None, limiter: Any = None, hedger: Any = None) -> ModelProvider:
+    """Return the per-container Bedrock provider"""
+    global _provider
+    if _provider is None:
+        _provider = BedrockConverseProvider(
+            region=region, limiter=limiter, hedger=hedger,
+            max_workers=int(os.environ.get('BEDROCK_MAX_CONCURRENCY', '8'))
+        )
+    return _provider
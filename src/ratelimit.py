@@ -0,0 +1,170 @@
+import os
+import time
+import random
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from botocore.exceptions import ClientError, ConnectionClosedError, ConnectionError, ReadTimeoutError
+
+logger = logging.getLogger()
+
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceQuotaExceededException',
+}
+
+
+# Server-side and network failures worth retrying; unlike throttling they don't shrink concurrency
+TRANSIENT_ERROR_CODES = {
+    'ServiceUnavailableException',
+    'InternalServerException',
+    'ModelNotReadyException',
+    'ModelTimeoutException',
+}
+
+
+def is_throttling_error(error: Exception) -> bool:
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+def is_transient_error(error: Exception) -> bool:
+    if isinstance(error, (ConnectionError, ConnectionClosedError, ReadTimeoutError)):
+        return True
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in TRANSIENT_ERROR_CODES
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens if available; otherwise return the seconds to wait"""
+        # Requests bigger than the bucket would never fit; let them drain it instead
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until `amount` tokens are available or the timeout passes"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(amount)
+            if wait == 0.0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit: grow by one per window of successes, halve on throttling"""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32, decrease_factor: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            ok = self._cond.wait_for(lambda: self.in_flight < int(self.limit), timeout=timeout)
+            if ok:
+                self.in_flight += 1
+            return ok
+
+    def release(self, throttled: bool = False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                logger.warning(f"Bedrock throttled; concurrency limit reduced to {int(self.limit)}")
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / max(self.limit, 1.0))
+            self._cond.notify_all()
+
+
+class BedrockRateLimiter:
+    """Client-side admission control for Bedrock calls.
+
+    Each call takes one request token and its estimated tokens from two
+    buckets, holds a slot in the adaptive concurrency limit, and is retried
+    with full-jitter exponential backoff when Bedrock throttles it or
+    fails transiently (5xx, model not ready, connection errors). Botocore's
+    own retries are off, so only throttling shrinks the concurrency limit.
+    """
+
+    def __init__(self, requests_per_minute: float = 200, tokens_per_minute: float = 200000,
+                 max_concurrency: int = 8, max_retries: int = 4, base_delay: float = 0.25,
+                 max_delay: float = 4.0, acquire_timeout: float = 10.0):
+        self.requests = TokenBucket(requests_per_minute / 60.0, max(requests_per_minute / 60.0, 1.0) * 2)
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute / 6.0)
+        self.concurrency = AdaptiveConcurrencyLimiter(initial=max(1, max_concurrency // 2), maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.acquire_timeout = acquire_timeout
+
+    def _admit(self, estimated_tokens: int):
+        if not self.requests.acquire(1, timeout=self.acquire_timeout):
+            raise TimeoutError("Timed out waiting for Bedrock request capacity")
+        if not self.tokens.acquire(estimated_tokens, timeout=self.acquire_timeout):
+            raise TimeoutError("Timed out waiting for Bedrock token capacity")
+        if not self.concurrency.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError("Timed out waiting for a Bedrock concurrency slot")
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: int = 0) -> Any:
+        """Run `fn` under the rate limits, retrying throttled attempts"""
+        attempt = 0
+        while True:
+            self._admit(estimated_tokens)
+            throttled = False
+            try:
+                return fn()
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                if not (throttled or is_transient_error(e)) or attempt >= self.max_retries:
+                    raise
+                reason = 'throttled' if throttled else 'failed'
+            finally:
+                self.concurrency.release(throttled=throttled)
+
+            attempt += 1
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+            logger.info(f"Retrying {reason} Bedrock call in {delay:.2f}s (attempt {attempt}/{self.max_retries})")
+            time.sleep(delay)
+
+
+_limiter: Optional[BedrockRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_bedrock_limiter() -> BedrockRateLimiter:
+    """Return the limiter shared by every chatbot instance in this container"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = BedrockRateLimiter(
+                requests_per_minute=float(os.environ.get('BEDROCK_REQUESTS_PER_MINUTE', '200')),
+                tokens_per_minute=float(os.environ.get('BEDROCK_TOKENS_PER_MINUTE', '200000')),
+                max_concurrency=int(os.environ.get('BEDROCK_MAX_CONCURRENCY', '8'))
+            )
+        return _limiter
@@ -0,0 +1,132 @@
+import os
+import re
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from triage import OPEN_CIDR_RE, security_control_id
+
+logger = logging.getLogger()
+
+HAIKU_MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+SONNET_MODEL_ID = 'anthropic.claude-3-sonnet-20240229-v1:0'
+TITAN_MODEL_ID = 'amazon.titan-text-express-v1'
+
+# Starting latency estimates (seconds) before any calls have been observed
+DEFAULT_LATENCY_PRIORS = {
+    HAIKU_MODEL_ID: 2.0,
+    SONNET_MODEL_ID: 6.0,
+    TITAN_MODEL_ID: 3.5,
+}
+
+EWMA_ALPHA = 0.2
+
+# Open-ingress findings on resources the shipped SSM documents don't cover
+# (network ACLs, instances); security groups are rule-matched by triage and
+# never reach the router
+_OPEN_PORT_RE = re.compile(r'\b(ports? \d+|ssh|rdp)\b', re.IGNORECASE)
+
+
+def has_fast_path(finding: Dict) -> bool:
+    """Whether a small model handles the finding reliably.
+
+    True for open-ingress findings and for non-critical findings backed by
+    a Security Hub control, which come with published remediation guidance.
+    """
+    text = f"{finding.get('Title', '')} {finding.get('Description', '')}"
+    if _OPEN_PORT_RE.search(text) and OPEN_CIDR_RE.search(text):
+        return True
+    severity = finding.get('Severity', {}).get('Label', '')
+    return bool(security_control_id(finding)) and severity != 'CRITICAL'
+
+
+class ModelRouter:
+    """Picks a Bedrock model per finding from severity, finding shape and latency.
+
+    Per-model latency is tracked as an exponentially weighted moving average
+    of observed call durations, so the router adapts when a model slows down.
+    """
+
+    def __init__(self, large_model_id: str = SONNET_MODEL_ID, fast_model_id: str = HAIKU_MODEL_ID,
+                 lite_model_id: Optional[str] = TITAN_MODEL_ID, alpha: float = EWMA_ALPHA):
+        self.large_model_id = large_model_id
+        self.fast_model_id = fast_model_id
+        self.lite_model_id = lite_model_id
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._latency: Dict[str, float] = {}
+        self._decisions: Dict[str, int] = {}
+        for model_id in self.models:
+            self._latency[model_id] = DEFAULT_LATENCY_PRIORS.get(model_id, 3.0)
+
+    @property
+    def models(self):
+        return [m for m in (self.large_model_id, self.fast_model_id, self.lite_model_id) if m]
+
+    def expected_latency(self, model_id: str) -> float:
+        with self._lock:
+            return self._latency.get(model_id, DEFAULT_LATENCY_PRIORS.get(model_id, 3.0))
+
+    def record_latency(self, model_id: str, seconds: float):
+        """Fold an observed call duration into the model's EWMA"""
+        with self._lock:
+            previous = self._latency.get(model_id)
+            if previous is None:
+                self._latency[model_id] = seconds
+            else:
+                self._latency[model_id] = self.alpha * seconds + (1 - self.alpha) * previous
+
+    def fastest_model(self) -> str:
+        with self._lock:
+            return min(self.models, key=lambda m: self._latency.get(m, float('inf')))
+
+    def choose(self, finding: Dict, remaining_budget: Optional[float] = None,
+               fast_path: Optional[bool] = None) -> Tuple[str, str]:
+        """Return (model_id, reason) for analysing this finding"""
+        severity = finding.get('Severity', {}).get('Label', '')
+        if fast_path is None:
+            fast_path = has_fast_path(finding)
+
+        if fast_path:
+            model_id, reason = self.fastest_model(), 'fast_path'
+        elif severity == 'CRITICAL':
+            model_id, reason = self.large_model_id, 'critical_ambiguous'
+        else:
+            model_id, reason = self.fast_model_id, 'routine'
+
+        # Never pick a model we expect to overrun the remaining latency budget
+        if remaining_budget is not None and self.expected_latency(model_id) > remaining_budget:
+            fastest = self.fastest_model()
+            if fastest != model_id:
+                model_id, reason = fastest, f"{reason}_over_budget"
+
+        with self._lock:
+            key = f"{model_id}:{reason}"
+            self._decisions[key] = self._decisions.get(key, 0) + 1
+
+        logger.info(f"Routed finding '{finding.get('Title', 'Unknown')}' ({severity or 'N/A'}) "
+                    f"to {model_id}: {reason}")
+        return model_id, reason
+
+    def stats(self) -> Dict:
+        """Routing decision counts and current latency estimates"""
+        with self._lock:
+            return {
+                'decisions': dict(self._decisions),
+                'latency_ewma': {m: round(v, 3) for m, v in self._latency.items()}
+            }
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """Return the per-container router so latency history survives warm starts"""
+    global _router
+    if _router is None:
+        _router = ModelRouter(
+            large_model_id=os.environ.get('ROUTER_LARGE_MODEL_ID', SONNET_MODEL_ID),
+            fast_model_id=os.environ.get('ROUTER_FAST_MODEL_ID', HAIKU_MODEL_ID),
+            lite_model_id=os.environ.get('ROUTER_LITE_MODEL_ID', TITAN_MODEL_ID) or None
+        )
+    return _router
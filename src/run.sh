@@ -0,0 +1,3 @@
+#!/bin/bash
+# Entry point for the streaming function; the Lambda Web Adapter proxies requests to this server
+exec python3 "${LAMBDA_TASK_ROOT:-.}/stream_server.py"
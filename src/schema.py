@@ -0,0 +1,201 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+REMEDIATION_TOOL_NAME = 'submit_remediation'
+
+REMEDIATION_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'remediation_action': {
+            'type': 'string',
+            'description': "Specific action to take, e.g. 'revoke_sg_rule', 'manual_review', 'update_policy'"
+        },
+        'ssm_document': {
+            'type': ['string', 'null'],
+            'description': 'SSM document name if applicable, otherwise null'
+        },
+        'parameters': {
+            'type': 'object',
+            'description': 'Key/value parameters needed for remediation',
+            'additionalProperties': {'type': 'string'}
+        },
+        'explanation': {'type': 'string', 'description': 'Brief explanation of the issue and fix'},
+        'severity_assessment': {'type': 'string', 'description': 'Your assessment of the risk level'},
+        'automated': {'type': 'boolean', 'description': 'Whether this can be automatically remediated'}
+    },
+    'required': ['remediation_action', 'ssm_document', 'parameters', 'explanation',
+                 'severity_assessment', 'automated']
+}
+
+# Model families that accept a forced toolChoice in Converse
+TOOL_USE_MODELS = ('anthropic.claude-3', 'anthropic.claude-haiku', 'anthropic.claude-sonnet',
+                   'anthropic.claude-opus', 'amazon.nova')
+
+_TYPE_CHECKS = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'boolean': lambda v: isinstance(v, bool),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+Validator = Callable[[Any, str, List[str]], None]
+
+
+def compile_validator(schema: Dict) -> Callable[[Any], List[str]]:
+    """Compile the JSON Schema subset we use into nested closures, once.
+
+    Supports type (single or list), enum, required, properties and
+    additionalProperties. Returns a function giving a list of error strings.
+    """
+    check = _compile(schema)
+
+    def validate(value: Any) -> List[str]:
+        errors: List[str] = []
+        check(value, '$', errors)
+        return errors
+
+    return validate
+
+
+def _compile(schema: Dict) -> Validator:
+    checks: List[Validator] = []
+
+    types = schema.get('type')
+    if types:
+        type_list = types if isinstance(types, list) else [types]
+        type_fns = [_TYPE_CHECKS[t] for t in type_list]
+        expected = ' or '.join(type_list)
+
+        def check_type(value, path, errors):
+            if not any(fn(value) for fn in type_fns):
+                errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if 'enum' in schema:
+        allowed = frozenset(schema['enum'])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: must be one of {sorted(allowed, key=str)}")
+        checks.append(check_enum)
+
+    required = tuple(schema.get('required', ()))
+    properties = {name: _compile(sub) for name, sub in schema.get('properties', {}).items()}
+    extra = schema.get('additionalProperties')
+    extra_check = _compile(extra) if isinstance(extra, dict) else None
+
+    if required or properties or extra_check:
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}: required field missing")
+            for name, item in value.items():
+                sub = properties.get(name, extra_check)
+                if sub is not None:
+                    sub(item, f"{path}.{name}", errors)
+        checks.append(check_object)
+
+    def check_all(value, path, errors):
+        for fn in checks:
+            fn(value, path, errors)
+
+    return check_all
+
+
+validate_remediation = compile_validator(REMEDIATION_SCHEMA)
+
+
+def supports_tool_use(model_id: str) -> bool:
+    return any(prefix in model_id for prefix in TOOL_USE_MODELS)
+
+
+def remediation_tool_config(schema: Dict = REMEDIATION_SCHEMA) -> Dict:
+    """Converse toolConfig that forces the model to answer through the schema"""
+    return {
+        'tools': [{
+            'toolSpec': {
+                'name': REMEDIATION_TOOL_NAME,
+                'description': 'Submit the remediation analysis for the Security Hub finding',
+                'inputSchema': {'json': schema}
+            }
+        }],
+        'toolChoice': {'tool': {'name': REMEDIATION_TOOL_NAME}}
+    }
+
+
+def extract_json_object(text: str) -> Optional[Dict]:
+    """Pull the outermost JSON object out of free text"""
+    start_idx = text.find('{')
+    end_idx = text.rfind('}') + 1
+    if start_idx == -1 or end_idx <= start_idx:
+        return None
+    try:
+        value = json.loads(text[start_idx:end_idx])
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def parse_remediation(response: Dict, validator: Callable[[Any], List[str]] = validate_remediation
+                      ) -> Tuple[Optional[Dict], List[str]]:
+    """Read the analysis from a tool call (or JSON text) and validate it"""
+    tool_use = response.get('tool_use')
+    if tool_use is not None:
+        value = tool_use.get('input')
+        if isinstance(value, str):
+            # Streamed tool input arrives as a JSON string
+            try:
+                value = json.loads(value) if value else {}
+            except json.JSONDecodeError as e:
+                return None, [f"$: tool input is not valid JSON ({e.msg})"]
+    else:
+        value = extract_json_object(response.get('text', ''))
+        if value is None:
+            return None, ['$: no JSON object found in response']
+
+    errors = validator(value)
+    return (value, []) if not errors else (None, errors)
+
+
+def repair_instructions(errors: List[str]) -> str:
+    """Follow-up text asking the model to fix specific validation errors"""
+    listed = '\n'.join(f"- {error}" for error in errors[:10])
+    return ("\n\nYour previous answer did not match the required schema:\n"
+            f"{listed}\n"
+            "Answer again with every required field and the correct types.")
+
+
+def repair_turns(response: Dict, errors: List[str]) -> List[Dict]:
+    """Converse turns that replay an invalid answer and ask for a corrected one.
+
+    A tool call is answered with an error toolResult so the conversation
+    stays valid; a text answer is followed by a user turn. Returns [] when
+    there is nothing to replay (an empty answer).
+    """
+    instructions = repair_instructions(errors).strip()
+    text = response.get('text') or ''
+    tool_use = response.get('tool_use')
+    if tool_use is not None and isinstance(tool_use.get('input'), dict) and tool_use.get('toolUseId'):
+        content = [{'text': text}] if text.strip() else []
+        content.append({'toolUse': {'toolUseId': tool_use['toolUseId'], 'name': tool_use.get('name'),
+                                    'input': tool_use['input']}})
+        return [
+            {'role': 'assistant', 'content': content},
+            {'role': 'user', 'content': [{'toolResult': {'toolUseId': tool_use['toolUseId'],
+                                                         'content': [{'text': instructions}],
+                                                         'status': 'error'}}]}
+        ]
+    if tool_use is not None and isinstance(tool_use.get('input'), str):
+        # Unparseable streamed tool input is replayed as plain text
+        text = text or tool_use['input']
+    if not text.strip():
+        return []
+    return [
+        {'role': 'assistant', 'content': [{'text': text}]},
+        {'role': 'user', 'content': [{'text': instructions}]}
+    ]
@@ -0,0 +1,125 @@
+import os
+import re
+import time
+import uuid
+import logging
+from typing import Dict, List, Optional
+
+from store import AnalysisStore, get_analysis_store
+
+logger = logging.getLogger()
+
+SESSION = 'session'
+
+# Fields of each remediation kept in a session; enough to explain or remediate it again
+SESSION_ITEM_FIELDS = ('finding_id', 'finding_title', 'product_arn', 'severity', 'classification', 'status',
+                       'resources', 'analysis', 'execution')
+
+ORDINALS = {
+    'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
+    'sixth': 6, 'seventh': 7, 'eighth': 8, 'ninth': 9, 'tenth': 10,
+}
+
+_REFERENCE_NOUN = r'(?:one|finding|issue)\b'
+# "#2", "finding 2", "number 2", "fix 2" at the end of the message, "the 2nd one"
+_NUMBER_RE = re.compile(
+    r'(?:^|\s)#(\d+)\b'
+    r'|\b(?:number|no\.|item|finding|issue)\s+#?(\d+)\b'
+    r'|\b(?:fix|remediate|explain)\s+#?(\d+)\s*[.!?]?\s*$'
+    r'|\b(\d+)(?:st|nd|rd|th)\s+' + _REFERENCE_NOUN,
+    re.IGNORECASE
+)
+# "the second one", "the last finding"; a bare "the last week" is not a reference
+_ORDINAL_RE = re.compile(r'\bthe\s+(' + '|'.join(ORDINALS) + r'|last)\s+' + _REFERENCE_NOUN, re.IGNORECASE)
+_KEYWORD_RE = re.compile(r'\bthe\s+([\w.-]+)\s+' + _REFERENCE_NOUN, re.IGNORECASE)
+# The fix verb has to act on the reference ("fix the SSH one", "remediate #2", "fix it")
+FIX_RE = re.compile(
+    r'\b(?:fix|remediate)\s+(?:it\b|that\b|this\b|the\b|#|number\b|item\b|finding\b|issue\b|\d)',
+    re.IGNORECASE
+)
+_QUESTION_RE = re.compile(r'^\s*(?:how|why|what|when|should|would|could|can i)\b', re.IGNORECASE)
+
+
+def is_fix_request(message: str) -> bool:
+    """Whether a follow-up asks to remediate the finding it refers to, not to explain it"""
+    return bool(FIX_RE.search(message)) and not _QUESTION_RE.search(message)
+
+
+def _item_text(item: Dict) -> str:
+    analysis = item.get('analysis') or {}
+    return ' '.join(str(part) for part in (
+        item.get('finding_title', ''), item.get('severity', ''), item.get('classification', ''),
+        analysis.get('ssm_document') or '', analysis.get('remediation_action') or '',
+        ' '.join(r.get('Type', '') for r in item.get('resources') or [])
+    )).lower()
+
+
+def resolve_reference(message: str, items: List[Dict]) -> List[int]:
+    """Indexes of the session items a follow-up message refers to.
+
+    Handles "#2" / "finding 2" / "fix 2", ordinals ("the second one", "the
+    last finding", "the 2nd one") and keywords ("the SSH one"). A number or
+    ordinal only counts when it names a finding, so "the last week" or "2
+    accounts" start a new query. An empty list means the message is not a
+    follow-up; more than one index means it is ambiguous.
+    """
+    if not items:
+        return []
+
+    match = _NUMBER_RE.search(message)
+    if match:
+        number = int(next(group for group in match.groups() if group))
+        return [number - 1] if 1 <= number <= len(items) else []
+
+    match = _ORDINAL_RE.search(message)
+    if match:
+        word = match.group(1).lower()
+        number = len(items) if word == 'last' else ORDINALS[word]
+        return [number - 1] if number <= len(items) else []
+
+    match = _KEYWORD_RE.search(message)
+    if match:
+        keyword = match.group(1).lower()
+        return [i for i, item in enumerate(items) if keyword in _item_text(item)]
+
+    return []
+
+
+class SessionStore:
+    """Per-conversation findings and analyses, expiring after a period of inactivity.
+
+    Sessions live in the analysis store under their own namespace and are
+    flushed on every save so the next turn can land on any container.
+    """
+
+    def __init__(self, store: AnalysisStore, ttl_seconds: int = 1800):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    def get(self, session_id: Optional[str]) -> Optional[Dict]:
+        return self.store.get(SESSION, session_id) if session_id else None
+
+    def save(self, session: Dict):
+        session['updated_at'] = int(time.time())
+        self.store.put(SESSION, session['session_id'], session, ttl_seconds=self.ttl_seconds)
+        self.store.flush()
+
+    def record_result(self, session_id: str, message: str, result: Dict) -> Dict:
+        """Replace the session's findings with those of a freshly processed message"""
+        session = self.get(session_id) or {'session_id': session_id, 'turns': 0}
+        session['turns'] += 1
+        session['last_query'] = message
+        session['items'] = [
+            {k: rem.get(k) for k in SESSION_ITEM_FIELDS} for rem in result.get('remediations', [])
+        ]
+        self.save(session)
+        return session
+
+
+def get_session_store(region: Optional[str] = None) -> SessionStore:
+    """Session store on top of the per-container analysis store"""
+    return SessionStore(get_analysis_store(region), ttl_seconds=int(os.environ.get('SESSION_TTL_SECONDS', '1800')))
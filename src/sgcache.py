@@ -0,0 +1,133 @@
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# World-open ranges per address family; the shipped documents only revoke the IPv4 one
+OPEN_CIDRS = {'0.0.0.0/0'}
+OPEN_IPV6_CIDRS = {'::/0'}
+
+# Values per group-id filter; DescribeSecurityGroups allows up to 200
+DESCRIBE_BATCH_SIZE = 200
+
+
+def open_ports(group: Dict, ports: Iterable[int]) -> Dict[str, Set[int]]:
+    """Which of `ports` the group's ingress rules leave open to the internet over TCP.
+
+    'ipv4' holds ports opened to 0.0.0.0/0 by a single-port tcp rule, the
+    only kind the shipped documents can revoke. 'broad' holds ports opened
+    to 0.0.0.0/0 by an all-traffic rule or a port range, and 'ipv6' ports
+    opened to ::/0 by any rule; both need manual remediation.
+    """
+    ports = list(ports)
+    result = {'ipv4': set(), 'ipv6': set(), 'broad': set()}
+    for permission in group.get('IpPermissions', []):
+        protocol = str(permission.get('IpProtocol', ''))
+        if protocol not in ('tcp', '6', '-1'):
+            continue
+        from_port = permission.get('FromPort', 0) if protocol != '-1' else 0
+        to_port = permission.get('ToPort', 65535) if protocol != '-1' else 65535
+        if from_port == -1:
+            from_port, to_port = 0, 65535
+        covered = {port for port in ports if from_port <= port <= to_port}
+        if any(r.get('CidrIp') in OPEN_CIDRS for r in permission.get('IpRanges', [])):
+            result['ipv4' if protocol != '-1' and from_port == to_port else 'broad'] |= covered
+        if any(r.get('CidrIpv6') in OPEN_IPV6_CIDRS for r in permission.get('Ipv6Ranges', [])):
+            result['ipv6'] |= covered
+    return result
+
+
+class SecurityGroupCache:
+    """Current security group rules, fetched in batches and kept for a short TTL.
+
+    Misses are looked up with one paginated DescribeSecurityGroups call per
+    DESCRIBE_BATCH_SIZE groups, using a group-id filter so a deleted group
+    doesn't fail the whole batch. Groups that don't exist are cached as
+    None. Call invalidate() after changing a group.
+    """
+
+    def __init__(self, ec2: Any, ttl_seconds: float = 60.0):
+        self.ec2 = ec2
+        self.ttl_seconds = ttl_seconds
+        self._groups: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.calls = 0
+
+    def get_many(self, group_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """Group description per id; None for groups that do not exist"""
+        now = time.monotonic()
+        results: Dict[str, Optional[Dict]] = {}
+        missing = []
+        with self._lock:
+            for group_id in dict.fromkeys(group_ids):
+                cached = self._groups.get(group_id)
+                if cached is not None and cached[0] > now:
+                    results[group_id] = cached[1]
+                    self.hits += 1
+                else:
+                    missing.append(group_id)
+                    self.misses += 1
+
+        for i in range(0, len(missing), DESCRIBE_BATCH_SIZE):
+            chunk = missing[i:i + DESCRIBE_BATCH_SIZE]
+            fetched = {group_id: None for group_id in chunk}
+            self.calls += 1
+            paginator = self.ec2.get_paginator('describe_security_groups')
+            for page in paginator.paginate(Filters=[{'Name': 'group-id', 'Values': chunk}]):
+                for group in page.get('SecurityGroups', []):
+                    fetched[group['GroupId']] = group
+            expires = time.monotonic() + self.ttl_seconds
+            with self._lock:
+                for group_id, group in fetched.items():
+                    self._groups[group_id] = (expires, group)
+            results.update(fetched)
+        return results
+
+    def get(self, group_id: str) -> Optional[Dict]:
+        return self.get_many([group_id]).get(group_id)
+
+    def invalidate(self, group_ids: Optional[Iterable[str]] = None):
+        """Forget cached groups (all of them when no ids are given)"""
+        with self._lock:
+            if group_ids is None:
+                self._groups.clear()
+            else:
+                for group_id in group_ids:
+                    self._groups.pop(group_id, None)
+
+    def open_ports_by_group(self, ports_by_group: Dict[str, Iterable[int]]) -> Dict[str, Optional[Dict[str, Set[int]]]]:
+        """Ports still open to the internet per group, as returned by open_ports(); None for missing groups.
+
+        Returns an empty mapping when the lookup fails, so callers proceed
+        without pre-flight information rather than skipping remediations.
+        """
+        try:
+            groups = self.get_many(ports_by_group)
+        except ClientError as e:
+            logger.error(f"Error describing security groups: {e.response['Error']['Code']}")
+            return {}
+        return {
+            group_id: open_ports(groups[group_id], ports) if groups.get(group_id) else None
+            for group_id, ports in ports_by_group.items()
+        }
+
+    def stats(self) -> Dict:
+        return {'hits': self.hits, 'misses': self.misses, 'describe_calls': self.calls,
+                'cached': len(self._groups)}
+
+
+_cache: Optional[SecurityGroupCache] = None
+
+
+def get_security_group_cache(ec2: Any, ttl_seconds: float = 60.0) -> SecurityGroupCache:
+    """Return the per-container security group cache"""
+    global _cache
+    if _cache is None:
+        _cache = SecurityGroupCache(ec2, ttl_seconds=ttl_seconds)
+    return _cache
@@ -0,0 +1,105 @@
+import re
+import json
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger()
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION_RE = re.compile(r'[\s?!.]+$')
+
+
+def normalize_query(message: str) -> str:
+    """Case, whitespace and trailing punctuation insensitive form of a chat message"""
+    return _TRAILING_PUNCTUATION_RE.sub('', _WHITESPACE_RE.sub(' ', message.strip().lower()))
+
+
+def request_key(message: str, filters: Dict, scope: str = '') -> str:
+    """Coalescing key for a chat request: normalized query plus the compiled filter.
+
+    `scope` separates requests that run the same query with different limits.
+    """
+    return f"{scope}|{normalize_query(message)}|{json.dumps(filters, sort_keys=True, separators=(',', ':'))}"
+
+
+class SingleFlight:
+    """Runs one computation per key at a time and keeps results briefly.
+
+    Callers that arrive while a computation for their key is running wait
+    on the same future instead of starting their own. Successful results
+    are cached for `ttl_seconds`; failures are shared with the callers
+    already waiting but never cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._cache: Dict[Hashable, Tuple[float, Any]] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           cacheable: Callable[[Any], bool] = lambda result: True) -> Tuple[Any, str]:
+        """Return (result, source) where source is 'cache', 'coalesced' or 'computed'"""
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                if cached[0] > time.monotonic():
+                    self.hits += 1
+                    return cached[1], 'cache'
+                del self._cache[key]
+
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result(), 'coalesced'
+
+        try:
+            result = fn()
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if self.ttl_seconds > 0 and cacheable(result):
+                self._evict_expired()
+                if len(self._cache) >= self.max_entries:
+                    # Drop the entry closest to expiry
+                    self._cache.pop(min(self._cache, key=lambda k: self._cache[k][0]))
+                self._cache[key] = (time.monotonic() + self.ttl_seconds, result)
+        future.set_result(result)
+        return result, 'computed'
+
+    def invalidate(self, key: Hashable = None):
+        """Drop one cached result, or all of them"""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'hits': self.hits, 'coalesced': self.coalesced, 'misses': self.misses,
+                    'cached': len(self._cache)}
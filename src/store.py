@@ -0,0 +1,316 @@
+import json
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional, Iterable
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# Record namespaces sharing the same table
+ANALYSIS = 'analysis'
+REMEDIATION = 'remediation'
+
+# DynamoDB batch API limits
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+
+
+def finding_fingerprint(finding: Dict, model_id: str = '') -> str:
+    """Stable cache key for a finding revision analysed by a given model"""
+    raw = '|'.join([
+        finding.get('Id', ''),
+        finding.get('UpdatedAt', ''),
+        finding.get('Compliance', {}).get('Status', ''),
+        model_id
+    ])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AnalysisStore(ABC):
+    """Persistent key/value store for AI analyses and remediation outcomes.
+
+    Reads are batched so a page of findings costs one round trip. Writes are
+    buffered (write-behind) and flushed in batches when the buffer fills up
+    or when flush() is called at the end of a request.
+    """
+
+    def __init__(self, flush_size: int = BATCH_WRITE_LIMIT):
+        self.flush_size = flush_size
+        self._pending: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(namespace: str, key: str) -> str:
+        return f"{namespace}#{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[Dict]:
+        """Fetch a single record"""
+        return self.batch_get(namespace, [key]).get(key)
+
+    def batch_get(self, namespace: str, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Fetch many records at once, serving unflushed writes from memory"""
+        results = {}
+        missing = []
+        now = time.time()
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                record = self._pending.get(self.make_key(namespace, key))
+                if record is None:
+                    missing.append(key)
+                elif not self._expired(record, now):
+                    results[key] = record['data']
+
+        if missing:
+            try:
+                fetched = self._batch_get_records([self.make_key(namespace, k) for k in missing])
+            except Exception as e:
+                logger.error(f"Error reading from analysis store: {str(e)}")
+                fetched = {}
+
+            for key in missing:
+                record = fetched.get(self.make_key(namespace, key))
+                if record and not self._expired(record, now):
+                    results[key] = record['data']
+
+        return results
+
+    def put(self, namespace: str, key: str, data: Dict, ttl_seconds: Optional[int] = None):
+        """Buffer a write; it is persisted on the next flush"""
+        record = {
+            'data': data,
+            'expires_at': int(time.time() + ttl_seconds) if ttl_seconds else None
+        }
+        with self._lock:
+            self._pending[self.make_key(namespace, key)] = record
+            should_flush = len(self._pending) >= self.flush_size
+
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """Persist all buffered writes, returning the number of records written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        try:
+            self._batch_write_records(pending)
+            logger.info(f"Flushed {len(pending)} records to analysis store")
+            return len(pending)
+        except Exception as e:
+            logger.error(f"Error flushing analysis store: {str(e)}")
+            # Re-queue anything that was not superseded by a newer write
+            with self._lock:
+                for pk, record in pending.items():
+                    self._pending.setdefault(pk, record)
+            return 0
+
+    def put_if_absent(self, namespace: str, key: str, data: Dict, ttl_seconds: Optional[int] = None) -> Optional[Dict]:
+        """Write a record unless a live one exists, bypassing the write buffer.
+
+        The write is conditional in the backing store, so exactly one caller
+        wins. Returns None when this call wrote the record, or the data of
+        the live record that blocked it.
+        """
+        pk = self.make_key(namespace, key)
+        now = time.time()
+        with self._lock:
+            pending = self._pending.get(pk)
+        if pending is not None and not self._expired(pending, now):
+            return pending['data']
+
+        record = {
+            'data': data,
+            'expires_at': int(now + ttl_seconds) if ttl_seconds else None
+        }
+        existing = self._conditional_put(pk, record, int(now))
+        return existing['data'] if existing is not None else None
+
+    def delete(self, namespace: str, key: str):
+        """Remove a record immediately, including any buffered write"""
+        pk = self.make_key(namespace, key)
+        with self._lock:
+            self._pending.pop(pk, None)
+        self._delete_record(pk)
+
+    @staticmethod
+    def _expired(record: Dict, now: float) -> bool:
+        expires_at = record.get('expires_at')
+        return bool(expires_at) and expires_at <= now
+
+    @abstractmethod
+    def _batch_get_records(self, pks: List[str]) -> Dict[str, Dict]:
+        ...
+
+    @abstractmethod
+    def _batch_write_records(self, records: Dict[str, Dict]):
+        ...
+
+    @abstractmethod
+    def _conditional_put(self, pk: str, record: Dict, now: int) -> Optional[Dict]:
+        """Write `record` unless `pk` holds an unexpired record, which is returned instead"""
+
+    @abstractmethod
+    def _delete_record(self, pk: str):
+        ...
+
+
+class DynamoDBAnalysisStore(AnalysisStore):
+    """AnalysisStore backed by a DynamoDB table keyed on 'pk'"""
+
+    def __init__(self, table_name: str, region: Optional[str] = None, client: Any = None, **kwargs):
+        super().__init__(**kwargs)
+        self.table_name = table_name
+        self.dynamodb = client or boto3.client('dynamodb', region_name=region)
+
+    @staticmethod
+    def _to_item(pk: str, record: Dict) -> Dict:
+        item = {
+            'pk': {'S': pk},
+            'data': {'S': json.dumps(record['data'], default=str)}
+        }
+        if record.get('expires_at'):
+            item['expires_at'] = {'N': str(record['expires_at'])}
+        return item
+
+    @staticmethod
+    def _from_item(item: Dict) -> Dict:
+        return {
+            'data': json.loads(item['data']['S']),
+            'expires_at': int(item['expires_at']['N']) if 'expires_at' in item else None
+        }
+
+    def _batch_get_records(self, pks: List[str]) -> Dict[str, Dict]:
+        records = {}
+        for i in range(0, len(pks), BATCH_GET_LIMIT):
+            request = {self.table_name: {'Keys': [{'pk': {'S': pk}} for pk in pks[i:i + BATCH_GET_LIMIT]]}}
+            attempt = 0
+            while request:
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    records[item['pk']['S']] = self._from_item(item)
+                request = response.get('UnprocessedKeys') or None
+                attempt += 1
+                if request:
+                    time.sleep(min(0.05 * (2 ** attempt), 1.0))
+        return records
+
+    def _batch_write_records(self, records: Dict[str, Dict]):
+        requests = [{'PutRequest': {'Item': self._to_item(pk, record)}} for pk, record in records.items()]
+
+        for i in range(0, len(requests), BATCH_WRITE_LIMIT):
+            request = {self.table_name: requests[i:i + BATCH_WRITE_LIMIT]}
+            attempt = 0
+            while request:
+                response = self.dynamodb.batch_write_item(RequestItems=request)
+                request = response.get('UnprocessedItems') or None
+                attempt += 1
+                if request:
+                    time.sleep(min(0.05 * (2 ** attempt), 1.0))
+
+    def _conditional_put(self, pk: str, record: Dict, now: int) -> Optional[Dict]:
+        try:
+            self.dynamodb.put_item(
+                TableName=self.table_name,
+                Item=self._to_item(pk, record),
+                ConditionExpression='attribute_not_exists(pk) OR expires_at <= :now',
+                ExpressionAttributeValues={':now': {'N': str(now)}},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            return None
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            item = e.response.get('Item')
+            if item is None:
+                item = self.dynamodb.get_item(TableName=self.table_name, Key={'pk': {'S': pk}},
+                                              ConsistentRead=True).get('Item')
+            # The blocking record may have been deleted since; report it as a plain conflict
+            return self._from_item(item) if item else {'data': {}, 'expires_at': None}
+
+    def _delete_record(self, pk: str):
+        self.dynamodb.delete_item(TableName=self.table_name, Key={'pk': {'S': pk}})
+
+
+class SQLiteAnalysisStore(AnalysisStore):
+    """AnalysisStore backed by SQLite, used locally and in tests"""
+
+    def __init__(self, path: str = ':memory:', **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._db_lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS records (pk TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at INTEGER)"
+        )
+        self.conn.commit()
+
+    def _batch_get_records(self, pks: List[str]) -> Dict[str, Dict]:
+        records = {}
+        with self._db_lock:
+            # Stay well below SQLite's bound parameter limit
+            for i in range(0, len(pks), 500):
+                chunk = pks[i:i + 500]
+                placeholders = ','.join('?' for _ in chunk)
+                rows = self.conn.execute(
+                    f"SELECT pk, data, expires_at FROM records WHERE pk IN ({placeholders})", chunk
+                ).fetchall()
+                for pk, data, expires_at in rows:
+                    records[pk] = {'data': json.loads(data), 'expires_at': expires_at}
+        return records
+
+    def _batch_write_records(self, records: Dict[str, Dict]):
+        rows = [
+            (pk, json.dumps(record['data'], default=str), record.get('expires_at'))
+            for pk, record in records.items()
+        ]
+        with self._db_lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO records (pk, data, expires_at) VALUES (?, ?, ?)", rows
+            )
+            self.conn.commit()
+
+    def _conditional_put(self, pk: str, record: Dict, now: int) -> Optional[Dict]:
+        with self._db_lock:
+            row = self.conn.execute("SELECT data, expires_at FROM records WHERE pk = ?", (pk,)).fetchone()
+            if row is not None and (row[1] is None or row[1] > now):
+                return {'data': json.loads(row[0]), 'expires_at': row[1]}
+            self.conn.execute(
+                "INSERT OR REPLACE INTO records (pk, data, expires_at) VALUES (?, ?, ?)",
+                (pk, json.dumps(record['data'], default=str), record.get('expires_at'))
+            )
+            self.conn.commit()
+            return None
+
+    def _delete_record(self, pk: str):
+        with self._db_lock:
+            self.conn.execute("DELETE FROM records WHERE pk = ?", (pk,))
+            self.conn.commit()
+
+
+_store: Optional[AnalysisStore] = None
+
+
+def get_analysis_store(region: Optional[str] = None) -> AnalysisStore:
+    """Return the per-container store, DynamoDB when a table is configured"""
+    global _store
+    if _store is None:
+        table_name = os.environ.get('ANALYSIS_TABLE_NAME')
+        if table_name:
+            _store = DynamoDBAnalysisStore(table_name, region=region)
+            logger.info(f"Using DynamoDB analysis store: {table_name}")
+        else:
+            path = os.environ.get('ANALYSIS_STORE_PATH', ':memory:')
+            _store = SQLiteAnalysisStore(path)
+            logger.info(f"Using SQLite analysis store: {path}")
+    return _store
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Streaming chat server
+Serves POST requests as newline-delimited JSON events, one per completed
+stage, writing each event to the socket as soon as it happens. In Lambda
+it runs behind the Lambda Web Adapter on a Function URL with
+InvokeMode RESPONSE_STREAM, which forwards the chunks to the client
+instead of buffering the whole response like API Gateway does.
+"""
+
+import os
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from chatbot import SecurityHubChatbot
+from streaming import NDJSON_CONTENT_TYPE, chat_events, to_ndjson
+
+logger = logging.getLogger()
+
+DEFAULT_MESSAGE = 'Show me security findings that need remediation'
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """POST {"message", "session_id"} -> chunked application/x-ndjson events"""
+
+    # Chunked transfer encoding needs HTTP/1.1
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        # Readiness check used by the Lambda Web Adapter
+        self._send_json(200, {'status': 'ok'})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict):
+                raise ValueError('Request body must be a JSON object')
+        except ValueError as e:
+            self._send_json(400, {'error': str(e), 'message': 'Invalid request'})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', NDJSON_CONTENT_TYPE)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        events = chat_events(SecurityHubChatbot(), body.get('message') or DEFAULT_MESSAGE, body.get('session_id'))
+        try:
+            for line in to_ndjson(events):
+                self._write_chunk(line.encode('utf-8'))
+            self._write_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            logger.warning("Client disconnected before the stream finished")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status_code: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    port = int(os.environ.get('PORT', '8080'))
+    server = ThreadingHTTPServer(('127.0.0.1', port), StreamHandler)
+    logger.info(f"Streaming chat server listening on port {port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import json
+import queue
+import logging
+import threading
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger()
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def result_events(result: Dict) -> Iterator[Dict]:
+    """Rebuild the per-stage events of a finished result (served from cache or coalesced)"""
+    remediations = result.get('remediations', [])
+    yield {
+        'stage': 'findings',
+        'findings_count': result.get('findings_count', 0),
+        'findings': [{k: rem.get(k) for k in ('finding_id', 'finding_title', 'severity', 'classification', 'priority')}
+                     for rem in remediations]
+    }
+    for rem in remediations:
+        yield {'stage': 'analysis', 'finding_id': rem['finding_id'], 'status': rem.get('status'),
+               'analysis': rem.get('analysis')}
+        if rem.get('execution'):
+            yield {'stage': 'remediation', 'finding_id': rem['finding_id'], 'execution': rem['execution']}
+
+
+def final_event(result: Dict) -> Dict:
+    """Closing event: the summary on success, the error otherwise"""
+    if 'error' in result:
+        return {'stage': 'error', 'error': result['error'], 'response': result.get('response')}
+    summary = {k: v for k, v in result.items() if k != 'remediations'}
+    return dict(summary, stage='done')
+
+
+def chat_events(chatbot, message: str, session_id: Optional[str] = None) -> Iterator[Dict]:
+    """Yield findings, analysis and remediation events as each stage completes.
+
+    The chat message is processed on a worker thread whose progress
+    callback feeds a queue, so events are yielded as soon as they happen.
+    The last event is always 'done' or 'error'.
+    """
+    events: queue.Queue = queue.Queue()
+
+    def worker():
+        try:
+            result = chatbot.process_session_message(message, session_id, on_progress=events.put)
+        except Exception as e:
+            logger.error(f"Error streaming chat message: {str(e)}")
+            result = {'error': str(e), 'response': 'Failed to process chat message'}
+        events.put({'stage': '_result', 'result': result})
+
+    threading.Thread(target=worker, name='chat-stream', daemon=True).start()
+
+    streamed = False
+    while True:
+        event = events.get()
+        if event['stage'] == '_result':
+            result = event['result']
+            break
+        if event['stage'] == 'finding':
+            # Whole-item event used by job progress; streams send the finer-grained stages
+            continue
+        streamed = True
+        yield event
+
+    if not streamed and 'error' not in result:
+        yield from result_events(result)
+    yield final_event(result)
+
+
+def to_ndjson(events: Iterator[Dict]) -> Iterator[str]:
+    """Encode events as newline-delimited JSON"""
+    for event in events:
+        yield json.dumps(event, default=str) + '\n'
@@ -0,0 +1,217 @@
+import re
+import time
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from prompts import estimate_tokens
+from providers import empty_usage
+from triage import AUTO_REMEDIABLE, SEVERITY_CODES, classify_finding, security_control_id
+
+logger = logging.getLogger()
+
+# Explicit requests only; words like "overall" or "posture" alone are ordinary questions
+SUMMARY_RE = re.compile(r'\b(summari[sz]e|summary|overview of)\b', re.IGNORECASE)
+
+SEVERITY_ORDER = ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW', 'INFORMATIONAL')
+SEVERITY_RANK_WEIGHTS = {'CRITICAL': 1000, 'HIGH': 100, 'MEDIUM': 10, 'LOW': 1, 'INFORMATIONAL': 0}
+
+# Groups per map call and output tokens allowed per group digest
+MAP_GROUPS_PER_CALL = 10
+MAP_TOKENS_PER_GROUP = 60
+REDUCE_MAX_TOKENS = 600
+
+# Sample resource ids kept per group; counts are exact regardless
+SAMPLE_RESOURCES = 3
+
+MAP_SYSTEM_PROMPT = """You are a cloud security analyst. Each input line is a digest of one group of AWS Security Hub findings that share a control and resource type.
+For every group write exactly one line: "<group number>. <risk in a few words>; <recommended next step>". Do not repeat the digest."""
+
+REDUCE_SYSTEM_PROMPT = """You are a cloud security analyst writing for an engineering lead.
+From the account totals and per-group notes, write a concise summary of the security posture:
+1. Overall posture in two sentences.
+2. The top three priorities, naming the groups.
+3. Quick wins that can be remediated automatically.
+Use plain text, at most 200 words."""
+
+
+def is_summary_request(message: str) -> bool:
+    return bool(SUMMARY_RE.search(message))
+
+
+class GroupAggregate:
+    """Running aggregate of one (control, resource type) partition"""
+
+    __slots__ = ('control_id', 'resource_type', 'count', 'severity', 'compliance', 'titles',
+                 'resources', 'accounts', 'auto_remediable', 'oldest', 'sample')
+
+    def __init__(self, control_id: str, resource_type: str):
+        self.control_id = control_id
+        self.resource_type = resource_type
+        self.count = 0
+        self.severity: Counter = Counter()
+        self.compliance: Counter = Counter()
+        self.titles: Counter = Counter()
+        self.resources = set()
+        self.accounts = set()
+        self.auto_remediable = 0
+        self.oldest: Optional[str] = None
+        self.sample: List[str] = []
+
+    def add(self, finding: Dict, classification: str):
+        self.count += 1
+        self.severity[finding.get('Severity', {}).get('Label', 'INFORMATIONAL')] += 1
+        self.compliance[finding.get('Compliance', {}).get('Status', 'UNKNOWN')] += 1
+        self.titles[finding.get('Title', 'Unknown')] += 1
+        if finding.get('AwsAccountId'):
+            self.accounts.add(finding['AwsAccountId'])
+        for resource in finding.get('Resources', []):
+            resource_id = resource.get('Id', '')
+            if resource_id not in self.resources and len(self.sample) < SAMPLE_RESOURCES:
+                self.sample.append(resource_id)
+            self.resources.add(resource_id)
+        if classification == AUTO_REMEDIABLE:
+            self.auto_remediable += 1
+        first_seen = finding.get('FirstObservedAt') or finding.get('CreatedAt')
+        if first_seen and (self.oldest is None or first_seen < self.oldest):
+            self.oldest = first_seen
+
+    @property
+    def rank(self) -> int:
+        return sum(SEVERITY_RANK_WEIGHTS.get(label, 0) * n for label, n in self.severity.items())
+
+    def age_days(self) -> Optional[int]:
+        if not self.oldest:
+            return None
+        try:
+            first_seen = datetime.fromisoformat(self.oldest.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        return (datetime.now(timezone.utc) - first_seen).days
+
+    def digest(self) -> str:
+        """One compact line for the map prompt; its size does not grow with the group"""
+        severity = ' '.join(f"{SEVERITY_CODES[label]}{self.severity[label]}"
+                            for label in SEVERITY_ORDER if self.severity[label])
+        title = self.titles.most_common(1)[0][0][:100]
+        parts = [
+            f"{self.control_id or 'no-control'} on {self.resource_type or 'unknown resource'}",
+            f'"{title}"',
+            f"{self.count} findings ({severity})",
+            f"{len(self.resources)} resources in {max(len(self.accounts), 1)} account(s)"
+        ]
+        age = self.age_days()
+        if age is not None:
+            parts.append(f"oldest {age}d")
+        if self.auto_remediable:
+            parts.append(f"{self.auto_remediable} auto-remediable")
+        return ' | '.join(parts)
+
+    def to_dict(self) -> Dict:
+        return {
+            'control_id': self.control_id,
+            'resource_type': self.resource_type,
+            'title': self.titles.most_common(1)[0][0],
+            'count': self.count,
+            'severity': dict(self.severity),
+            'compliance': dict(self.compliance),
+            'resources': len(self.resources),
+            'accounts': len(self.accounts),
+            'auto_remediable': self.auto_remediable,
+            'oldest_days': self.age_days(),
+            'sample_resources': self.sample
+        }
+
+
+def aggregate_findings(findings: Iterable[Dict], environment: str,
+                       deadline: Optional[float] = None) -> Tuple[List[GroupAggregate], Dict]:
+    """Partition findings by (control, resource type) in one pass.
+
+    `findings` may be a generator over Security Hub pages; only the
+    per-group aggregates are kept in memory. Reading stops at `deadline`
+    (a time.time() value), with totals['truncated'] set.
+    """
+    groups: Dict[Tuple[str, str], GroupAggregate] = {}
+    totals: Counter = Counter()
+    for finding in findings:
+        if deadline is not None and time.time() >= deadline:
+            totals['truncated'] = 1
+            break
+        resources = finding.get('Resources') or [{}]
+        key = (security_control_id(finding), resources[0].get('Type', ''))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = GroupAggregate(*key)
+        classification = classify_finding(finding, environment)['classification']
+        group.add(finding, classification)
+        totals['findings'] += 1
+        totals[finding.get('Severity', {}).get('Label', 'INFORMATIONAL')] += 1
+        totals['auto_remediable'] += classification == AUTO_REMEDIABLE
+
+    ranked = sorted(groups.values(), key=lambda g: (g.rank, g.count), reverse=True)
+    return ranked, dict(totals)
+
+
+def _add_usage(total: Dict, response: Dict):
+    for key, value in (response.get('usage') or {}).items():
+        total[key] = total.get(key, 0) + value
+
+
+def summarize_groups(provider, model_id: str, groups: List[GroupAggregate], totals: Dict,
+                     user_query: str) -> Dict:
+    """Map digests of the groups to short notes in parallel, then reduce them to one summary.
+
+    Model calls grow with the number of groups (one map call per
+    MAP_GROUPS_PER_CALL groups, plus one reduce call), never with the
+    number of findings. Failed map calls fall back to the raw digests.
+    """
+    digests = [f"{i}. {group.digest()}" for i, group in enumerate(groups, 1)]
+    chunks = [digests[i:i + MAP_GROUPS_PER_CALL] for i in range(0, len(digests), MAP_GROUPS_PER_CALL)]
+    usage = empty_usage()
+
+    requests = []
+    for chunk in chunks:
+        message = '\n'.join(chunk)
+        requests.append({
+            'model_id': model_id,
+            'system': MAP_SYSTEM_PROMPT,
+            'message': message,
+            'max_tokens': MAP_TOKENS_PER_GROUP * len(chunk),
+            'estimated_tokens': estimate_tokens(MAP_SYSTEM_PROMPT) + estimate_tokens(message)
+        })
+
+    notes = []
+    for chunk, response in zip(chunks, provider.converse_batch(requests)):
+        if isinstance(response, Exception) or not (response.get('text') or '').strip():
+            notes.extend(chunk)
+        else:
+            _add_usage(usage, response)
+            notes.append(response['text'].strip())
+
+    severity = ', '.join(f"{totals[label]} {label.lower()}" for label in SEVERITY_ORDER if totals.get(label))
+    reduce_message = (
+        f"Question: {user_query}\n"
+        f"Totals: {totals.get('findings', 0)} active findings ({severity}) in {len(groups)} groups; "
+        f"{totals.get('auto_remediable', 0)} auto-remediable.\n"
+        f"Group notes:\n" + '\n'.join(notes)
+    )
+    try:
+        response = provider.converse(
+            model_id=model_id,
+            system=REDUCE_SYSTEM_PROMPT,
+            message=reduce_message,
+            max_tokens=REDUCE_MAX_TOKENS,
+            estimated_tokens=estimate_tokens(REDUCE_SYSTEM_PROMPT) + estimate_tokens(reduce_message)
+        )
+        _add_usage(usage, response)
+        summary = response.get('text', '').strip()
+    except Exception as e:
+        logger.error(f"Summary reduce call failed: {str(e)}")
+        summary = ''
+
+    if not summary:
+        summary = f"Totals: {totals.get('findings', 0)} findings in {len(groups)} groups.\n" + '\n'.join(notes)
+
+    usage.update({'map_calls': len(requests), 'reduce_calls': 1, 'groups': len(groups)})
+    return {'summary': summary, 'usage': usage}
@@ -0,0 +1,250 @@
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from botocore.exceptions import ClientError
+
+from ledger import LEDGER
+from store import REMEDIATION, AnalysisStore
+from workflow import FindingWorkflowUpdater, finding_identifier
+
+logger = logging.getLogger()
+
+# Remediation record statuses
+SUBMITTED = 'submitted'
+SUCCESS = 'success'
+ERROR = 'error'
+
+TERMINAL_INVOCATION_STATUSES = {'Success', 'Cancelled', 'TimedOut', 'Failed'}
+# Most severe first; decides the command status when instances disagree
+FAILURE_STATUSES = ('Failed', 'TimedOut', 'Cancelled')
+
+# Commands with no invocations after this long most likely matched no instances
+NO_INVOCATION_GRACE_SECONDS = 300
+# Stop tracking commands that never finish
+TRACK_TIMEOUT_SECONDS = 3600
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def summarize_invocations(invocations: Iterable[Dict]) -> Dict:
+    """Collapse per-instance invocations of one command into a command-level outcome"""
+    counts: Dict[str, int] = {}
+    for invocation in invocations:
+        counts[invocation['Status']] = counts.get(invocation['Status'], 0) + 1
+
+    terminal = bool(counts) and all(status in TERMINAL_INVOCATION_STATUSES for status in counts)
+    command_status = next((s for s in FAILURE_STATUSES if counts.get(s)), None)
+    if command_status is None:
+        command_status = 'Success' if terminal else ('InProgress' if counts else 'Pending')
+    return {'terminal': terminal, 'command_status': command_status, 'instances': counts}
+
+
+class RemediationTracker:
+    """Tracks submitted SSM remediation commands until they finish.
+
+    All outstanding commands are checked with one ListCommandInvocations
+    call per cycle (filtered to invocations since the oldest submission)
+    instead of one GetCommandInvocation per command. The interval doubles
+    while nothing changes and resets when a command finishes. Outcomes
+    are written back to the remediation records in the analysis store.
+
+    An optional `verifier` receives the records of commands that succeeded
+    and returns {command_id: bool}; a command whose change is not visible
+    afterwards is recorded as an error. Findings whose remediation was
+    verified are handed to the optional `workflow` updater to be resolved
+    in Security Hub.
+    """
+
+    def __init__(self, ssm: Any, store: AnalysisStore, ttl_seconds: int = 86400,
+                 min_interval: float = 2.0, max_interval: float = 60.0,
+                 verifier: Optional[Callable[[List[Dict]], Dict[str, bool]]] = None,
+                 workflow: Optional[FindingWorkflowUpdater] = None):
+        self.ssm = ssm
+        self.verifier = verifier
+        self.workflow = workflow
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._outstanding: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.cycles = 0
+
+    def track(self, finding_id: str, record: Dict, background: bool = True):
+        """Start tracking a submitted remediation record; merged commands cover several findings"""
+        if record.get('status') != SUBMITTED or not record.get('command_id'):
+            return
+        with self._lock:
+            tracked = self._outstanding.get(record['command_id'])
+            if tracked is None:
+                tracked = self._outstanding[record['command_id']] = dict(record, finding_ids=[], product_arns={})
+            if finding_id not in tracked['finding_ids']:
+                tracked['finding_ids'].append(finding_id)
+            tracked['product_arns'][finding_id] = record.get('product_arn')
+            self.interval = self.min_interval
+        if background:
+            self.start()
+
+    def outstanding(self) -> int:
+        with self._lock:
+            return len(self._outstanding)
+
+    def start(self):
+        """Poll in the background until nothing is outstanding"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='remediation-tracker', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Remediation tracking cycle failed: {str(e)}")
+                self.interval = min(self.interval * 2, self.max_interval)
+            if not self.outstanding():
+                return
+
+    def poll(self) -> int:
+        """Run one tracking cycle, returning the number of commands that finished"""
+        with self._lock:
+            outstanding = dict(self._outstanding)
+        if not outstanding:
+            return 0
+
+        self.cycles += 1
+        oldest = min(record['submitted_at'] for record in outstanding.values())
+        invocations: Dict[str, list] = {}
+        try:
+            paginator = self.ssm.get_paginator('list_command_invocations')
+            for page in paginator.paginate(
+                Filters=[{'key': 'InvokedAfter', 'value': _iso(oldest - 60)}],
+                PaginationConfig={'PageSize': 50}
+            ):
+                for invocation in page.get('CommandInvocations', []):
+                    if invocation['CommandId'] in outstanding:
+                        invocations.setdefault(invocation['CommandId'], []).append(invocation)
+        except ClientError as e:
+            logger.error(f"Error listing command invocations: {e.response['Error']['Code']}")
+            self.interval = min(self.interval * 2, self.max_interval)
+            return 0
+
+        now = time.time()
+        outcomes = {}
+        for command_id, record in outstanding.items():
+            outcome = summarize_invocations(invocations.get(command_id, []))
+            age = now - record['submitted_at']
+            if not outcome['terminal']:
+                if not outcome['instances'] and age > NO_INVOCATION_GRACE_SECONDS:
+                    outcome.update(terminal=True, command_status='NoInstances')
+                elif age > TRACK_TIMEOUT_SECONDS:
+                    outcome.update(terminal=True, command_status='Unknown')
+            outcomes[command_id] = outcome
+
+        succeeded = [outstanding[c] for c, o in outcomes.items() if o['terminal'] and o['command_status'] == 'Success']
+        if succeeded and self.verifier is not None:
+            try:
+                verified = self.verifier(succeeded)
+            except Exception as e:
+                logger.error(f"Remediation verification failed: {str(e)}")
+                verified = {}
+            for record in succeeded:
+                if record['command_id'] in verified:
+                    outcomes[record['command_id']]['verified'] = verified[record['command_id']]
+
+        finished = 0
+        for command_id, outcome in outcomes.items():
+            record = outstanding[command_id]
+            if outcome['terminal'] or outcome['command_status'] != record.get('command_status'):
+                self._update(record, outcome)
+            if outcome['terminal']:
+                finished += 1
+                with self._lock:
+                    self._outstanding.pop(command_id, None)
+
+        self.store.flush()
+        if self.workflow is not None:
+            self.workflow.flush()
+        self.interval = self.min_interval if finished else min(self.interval * 2, self.max_interval)
+        logger.info(f"Remediation tracking: {finished} finished, {len(outstanding) - finished} outstanding")
+        return finished
+
+    def _update(self, record: Dict, outcome: Dict):
+        updated = {k: v for k, v in record.items() if k not in ('finding_ids', 'product_arns')}
+        updated.update(command_status=outcome['command_status'], instances=outcome['instances'],
+                       checked_at=int(time.time()))
+        if outcome['terminal']:
+            succeeded = outcome['command_status'] == 'Success'
+            updated['status'] = SUCCESS if succeeded else ERROR
+            updated['message'] = (
+                f"Remediation completed for {record.get('resource_id', record['command_id'])}" if succeeded else
+                f"Remediation command {record['command_id']} ended with status {outcome['command_status']}"
+            )
+            if 'verified' in outcome:
+                updated['verified'] = outcome['verified']
+                if not outcome['verified']:
+                    updated['status'] = ERROR
+                    updated['message'] = (f"Remediation command {record['command_id']} succeeded but "
+                                          f"{record.get('resource_id', 'the resource')} is still open to the internet")
+        else:
+            with self._lock:
+                if record['command_id'] in self._outstanding:
+                    self._outstanding[record['command_id']]['command_status'] = outcome['command_status']
+        if updated['status'] == ERROR and record.get('ledger_key'):
+            # Let a retry send the command again instead of attaching to this failed one
+            self.store.delete(LEDGER, record['ledger_key'])
+        for finding_id in record['finding_ids']:
+            self.store.put(REMEDIATION, finding_id, dict(updated, product_arn=record['product_arns'].get(finding_id)),
+                           ttl_seconds=self.ttl_seconds)
+        # Only resolve in Security Hub what verification confirmed; a missing check is not a confirmation
+        if outcome.get('verified') is True and self.workflow is not None:
+            self.workflow.resolve(filter(None, (finding_identifier(finding_id, record['product_arns'].get(finding_id))
+                                                for finding_id in record['finding_ids'])))
+
+    def status(self, finding_ids: Iterable[str], refresh: bool = False) -> Dict[str, Dict]:
+        """Stored remediation state per finding, adopting unfinished commands other containers started.
+
+        With `refresh`, unfinished commands are checked with one synchronous
+        poll before returning. Lambda freezes the background thread as soon
+        as the response is sent, so request handlers must not rely on it.
+        """
+        finding_ids = list(finding_ids)
+        records = self.store.batch_get(REMEDIATION, finding_ids)
+        unfinished = False
+        for finding_id, record in records.items():
+            if record.get('status') == SUBMITTED:
+                unfinished = True
+                with self._lock:
+                    known = record.get('command_id') in self._outstanding
+                if not known:
+                    self.track(finding_id, record, background=not refresh)
+        if refresh and unfinished:
+            self.poll()
+            records = self.store.batch_get(REMEDIATION, finding_ids)
+        return records
+
+    def stats(self) -> Dict:
+        return {'outstanding': self.outstanding(), 'cycles': self.cycles, 'interval': self.interval}
+
+
+_tracker: Optional[RemediationTracker] = None
+
+
+def get_remediation_tracker(ssm: Any, store: AnalysisStore, ttl_seconds: int = 86400,
+                            verifier: Optional[Callable[[List[Dict]], Dict[str, bool]]] = None,
+                            workflow: Optional[FindingWorkflowUpdater] = None) -> RemediationTracker:
+    """Return the per-container tracker"""
+    global _tracker
+    if _tracker is None:
+        _tracker = RemediationTracker(ssm, store, ttl_seconds=ttl_seconds, verifier=verifier, workflow=workflow)
+    return _tracker
@@ -0,0 +1,127 @@
+import re
+from typing import Dict, Optional
+
+from compact import expand_compact
+
+AUTO_REMEDIABLE = 'auto_remediable'
+KNOWN_MANUAL = 'known_manual'
+NEEDS_AI = 'needs_ai'
+
+SEVERITY_CODES = {'CRITICAL': 'C', 'HIGH': 'H', 'MEDIUM': 'M', 'LOW': 'L', 'INFORMATIONAL': 'I'}
+
+# Controls covered by the shipped SSM documents
+AUTO_REMEDIATION_CONTROLS = {
+    'EC2.13': 'SSH',  # Security groups should not allow ingress from 0.0.0.0/0 to port 22
+    'EC2.14': 'RDP',  # Security groups should not allow ingress from 0.0.0.0/0 to port 3389
+}
+
+# Controls that always need a human (account-level or root-credential changes)
+MANUAL_CONTROLS = {
+    'Account.1': 'Security contact information must be set by an account administrator.',
+    'IAM.6': 'Hardware MFA for the root user must be configured by the account owner.',
+    'IAM.9': 'MFA for the root user must be configured by the account owner.',
+    'IAM.4': 'Root user access keys must be removed by the account owner.',
+    'GuardDuty.1': 'Enabling GuardDuty is an account-level decision.',
+    'SecurityHub.1': 'Enabling Security Hub is an account-level decision.',
+}
+
+MANUAL_RESOURCE_TYPES = {'AwsAccount'}
+
+OPEN_CIDR_RE = re.compile(r'0\.0\.0\.0/0|::/0|unrestricted', re.IGNORECASE)
+_PORT_RULES = (
+    (re.compile(r'\b(port 22|ssh)\b', re.IGNORECASE), 'SSH'),
+    (re.compile(r'\b(port 3389|rdp)\b', re.IGNORECASE), 'RDP'),
+)
+
+# Feature weights for findings no rule covers; a higher score means the
+# finding is more likely to benefit from model analysis.
+SEVERITY_WEIGHTS = {'CRITICAL': 3.0, 'HIGH': 2.0, 'MEDIUM': 1.0, 'LOW': -0.5, 'INFORMATIONAL': -2.0}
+COMPLIANCE_WEIGHTS = {'FAILED': 1.0, 'WARNING': 0.5, 'NOT_AVAILABLE': -1.0, 'PASSED': -5.0}
+RESOURCE_TYPE_WEIGHTS = {
+    'AwsEc2SecurityGroup': 1.0,
+    'AwsIamPolicy': 1.0,
+    'AwsIamRole': 0.5,
+    'AwsIamUser': 0.5,
+    'AwsS3Bucket': 0.5,
+    'AwsEc2Instance': 0.5,
+}
+NEEDS_AI_THRESHOLD = 1.5
+
+
+def security_control_id(finding: Dict) -> str:
+    compliance = finding.get('Compliance', {})
+    control_id = compliance.get('SecurityControlId')
+    if not control_id:
+        # Older ASFF findings carry the control in ProductFields
+        control_id = finding.get('ProductFields', {}).get('ControlId', '')
+    return control_id
+
+
+def _rule_document(finding: Dict, control_id: str) -> Optional[str]:
+    if control_id in AUTO_REMEDIATION_CONTROLS:
+        return AUTO_REMEDIATION_CONTROLS[control_id]
+    text = f"{finding.get('Title', '')} {finding.get('Description', '')}"
+    if not OPEN_CIDR_RE.search(text):
+        return None
+    for pattern, document in _PORT_RULES:
+        if pattern.search(text):
+            return document
+    return None
+
+
+def score_finding(finding: Dict) -> float:
+    """Feature-weighted score; findings at or above NEEDS_AI_THRESHOLD go to the model"""
+    severity = finding.get('Severity', {}).get('Label', '')
+    compliance = finding.get('Compliance', {}).get('Status', '')
+    resource_types = [r.get('Type', '') for r in finding.get('Resources', [])]
+    score = SEVERITY_WEIGHTS.get(severity, 0.0) + COMPLIANCE_WEIGHTS.get(compliance, 0.0)
+    score += max((RESOURCE_TYPE_WEIGHTS.get(t, 0.0) for t in resource_types), default=0.0)
+    return score
+
+
+def classify_finding(finding: Dict, environment: str) -> Dict:
+    """Classify a finding as auto-remediable, known-manual or needs-AI.
+
+    Rule-covered findings come with a locally built analysis so no model
+    call is needed; only the needs_ai bucket has 'analysis' set to None.
+    """
+    severity = finding.get('Severity', {}).get('Label', '')
+    risk_code = SEVERITY_CODES.get(severity, 'M')
+    control_id = security_control_id(finding)
+    resource_types = {r.get('Type', '') for r in finding.get('Resources', [])}
+
+    document = _rule_document(finding, control_id)
+    if document and 'AwsEc2SecurityGroup' in resource_types:
+        return {
+            'classification': AUTO_REMEDIABLE,
+            'reason': f"Matches shipped {document} remediation",
+            'score': None,
+            'analysis': expand_compact({'a': 'RSG', 'd': document, 'r': risk_code}, environment)
+        }
+
+    manual_reason = MANUAL_CONTROLS.get(control_id)
+    if not manual_reason and resource_types & MANUAL_RESOURCE_TYPES:
+        manual_reason = 'Account-level finding that must be handled by an administrator.'
+    if not manual_reason and finding.get('Compliance', {}).get('Status') == 'PASSED':
+        manual_reason = 'Control is passing; no remediation needed.'
+
+    score = score_finding(finding)
+    if not manual_reason and score < NEEDS_AI_THRESHOLD:
+        manual_reason = 'Low-impact finding; queue for routine manual review.'
+
+    if manual_reason:
+        analysis = expand_compact({'a': 'MAN', 'd': 'NONE', 'r': risk_code}, environment)
+        analysis['explanation'] = manual_reason
+        return {
+            'classification': KNOWN_MANUAL,
+            'reason': manual_reason,
+            'score': score,
+            'analysis': analysis
+        }
+
+    return {
+        'classification': NEEDS_AI,
+        'reason': f"Score {score:.1f} meets the AI threshold",
+        'score': score,
+        'analysis': None
+    }
@@ -0,0 +1,135 @@
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from ratelimit import is_throttling_error
+
+logger = logging.getLogger()
+
+# BatchUpdateFindings accepts up to 100 finding identifiers per call
+BATCH_UPDATE_LIMIT = 100
+
+RESOLVED = 'RESOLVED'
+UPDATED_BY = 'security-hub-chatbot'
+REMEDIATED_NOTE = 'Remediated automatically through Systems Manager; the 0.0.0.0/0 rule was removed.'
+ALREADY_REMEDIATED_NOTE = 'Checked by the remediation pre-flight: no 0.0.0.0/0 or ::/0 rule remains.'
+
+# Unprocessed findings with these error codes will not succeed on retry
+PERMANENT_ERROR_CODES = {'FindingNotFound', 'InvalidInput', 'AccessDeniedException', 'FindingSizeExceeded'}
+
+
+def finding_identifier(finding_id: str, product_arn: Optional[str]) -> Optional[Dict]:
+    if not finding_id or not product_arn:
+        return None
+    return {'Id': finding_id, 'ProductArn': product_arn}
+
+
+class FindingWorkflowUpdater:
+    """Write-behind workflow status updates for remediated findings.
+
+    Identifiers are buffered per (status, note) and sent with one
+    BatchUpdateFindings call per BATCH_UPDATE_LIMIT findings, either when
+    a buffer fills up or when flush() is called. Unprocessed findings and
+    throttled calls are retried with backoff; findings that keep failing
+    are dropped and logged.
+    """
+
+    def __init__(self, securityhub: Any, max_attempts: int = 4):
+        self.securityhub = securityhub
+        self.max_attempts = max_attempts
+        self._pending: Dict[Tuple[str, str], Dict[Tuple[str, str], Dict]] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.updated = 0
+        self.failed = 0
+
+    def resolve(self, identifiers: Iterable[Dict], note: str = REMEDIATED_NOTE):
+        """Queue findings to be marked RESOLVED with a note"""
+        full = []
+        with self._lock:
+            batch = self._pending.setdefault((RESOLVED, note), {})
+            for identifier in identifiers:
+                batch[(identifier['Id'], identifier['ProductArn'])] = identifier
+            if len(batch) >= BATCH_UPDATE_LIMIT:
+                full.append((RESOLVED, note))
+        for key in full:
+            self.flush(key)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(batch) for batch in self._pending.values())
+
+    def flush(self, only: Optional[Tuple[str, str]] = None) -> int:
+        """Send buffered updates, returning the number of findings updated"""
+        with self._lock:
+            if only is None:
+                pending, self._pending = self._pending, {}
+            else:
+                pending = {only: self._pending.pop(only, {})}
+
+        updated = 0
+        for (status, note), batch in pending.items():
+            identifiers = list(batch.values())
+            for i in range(0, len(identifiers), BATCH_UPDATE_LIMIT):
+                updated += self._update(identifiers[i:i + BATCH_UPDATE_LIMIT], status, note)
+        if updated:
+            logger.info(f"Marked {updated} findings {RESOLVED.lower()} in Security Hub")
+        return updated
+
+    def _update(self, identifiers: List[Dict], status: str, note: str) -> int:
+        remaining = identifiers
+        updated = 0
+        for attempt in range(self.max_attempts):
+            if attempt:
+                time.sleep(min(0.2 * (2 ** attempt), 2.0))
+            try:
+                self.calls += 1
+                response = self.securityhub.batch_update_findings(
+                    FindingIdentifiers=remaining,
+                    Workflow={'Status': status},
+                    Note={'Text': note, 'UpdatedBy': UPDATED_BY}
+                )
+            except ClientError as e:
+                if is_throttling_error(e):
+                    continue
+                logger.error(f"Error updating finding workflow: {e.response['Error']['Code']}")
+                break
+            except Exception as e:
+                logger.error(f"Error updating finding workflow: {str(e)}")
+                break
+
+            updated += len(response.get('ProcessedFindings', []))
+            retry = []
+            for unprocessed in response.get('UnprocessedFindings', []):
+                if unprocessed.get('ErrorCode') in PERMANENT_ERROR_CODES:
+                    logger.warning(f"Finding {unprocessed['FindingIdentifier']['Id']} not updated: "
+                                   f"{unprocessed.get('ErrorCode')} - {unprocessed.get('ErrorMessage')}")
+                    self.failed += 1
+                else:
+                    retry.append(unprocessed['FindingIdentifier'])
+            remaining = retry
+            if not remaining:
+                break
+
+        if remaining:
+            logger.error(f"Gave up updating workflow status for {len(remaining)} findings")
+            self.failed += len(remaining)
+        self.updated += updated
+        return updated
+
+    def stats(self) -> Dict:
+        return {'pending': self.pending(), 'calls': self.calls, 'updated': self.updated, 'failed': self.failed}
+
+
+_updater: Optional[FindingWorkflowUpdater] = None
+
+
+def get_workflow_updater(securityhub: Any) -> FindingWorkflowUpdater:
+    """Return the per-container workflow updater"""
+    global _updater
+    if _updater is None:
+        _updater = FindingWorkflowUpdater(securityhub)
+    return _updater
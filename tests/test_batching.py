@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def test_items_in_one_window_run_as_one_batch():
+    batches = []
+
+    def run(items):
+        batches.append(dict(items))
+        return {key: item * 2 for key, item in items.items()}
+
+    batcher = MicroBatcher(run, max_wait=0.05)
+    futures = [batcher.submit(key, key) for key in range(3)]
+    assert [f.result(1) for f in futures] == [0, 2, 4]
+    assert batches == [{0: 0, 1: 1, 2: 2}]
+
+
+def test_duplicate_keys_share_a_future():
+    release = threading.Event()
+
+    def run(items):
+        release.wait(1)
+        return dict(items)
+
+    batcher = MicroBatcher(run, max_wait=0.01)
+    first = batcher.submit('k', 1)
+    assert batcher.submit('k', 2) is first
+    release.set()
+    assert first.result(1) == 1
+    assert batcher.stats()['deduplicated'] == 1
+
+
+def test_full_batch_runs_before_the_deadline():
+    batcher = MicroBatcher(lambda items: dict(items), max_wait=10, max_batch=2)
+    futures = [batcher.submit(key, key) for key in ('a', 'b')]
+    assert [f.result(1) for f in futures] == ['a', 'b']
+
+
+def test_errors_and_missing_results_reach_every_caller():
+    def fail(items):
+        raise RuntimeError('boom')
+
+    future = MicroBatcher(fail, max_wait=0.01).submit('k', 1)
+    with pytest.raises(RuntimeError):
+        future.result(1)
+
+    future = MicroBatcher(lambda items: {}, max_wait=0.01).submit('k', 1)
+    with pytest.raises(KeyError):
+        future.result(1)
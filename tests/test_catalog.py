@@ -0,0 +1,57 @@
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+from catalog import DocumentCatalog, InvalidRemediation
+
+SSH = 'SecurityHub-RemediateUnrestrictedSSH-dev'
+CONTENT = json.dumps({'parameters': {
+    'SecurityGroupId': {'type': 'String', 'allowedPattern': '^sg-[0-9a-f]{8,17}$'},
+    'AutomationAssumeRole': {'type': 'String', 'default': ''},
+}})
+
+
+class FakeSSM:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get_document(self, Name, DocumentFormat):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return {'Content': response}
+
+
+def throttled():
+    return ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}, 'GetDocument')
+
+
+def test_validate_checks_parameters_against_the_schema():
+    catalog = DocumentCatalog(FakeSSM(CONTENT), [SSH])
+    assert catalog.validate(SSH, {'SecurityGroupId': 'sg-0123456789abcdef0'}) == {'SecurityGroupId': 'sg-0123456789abcdef0'}
+    with pytest.raises(InvalidRemediation):
+        catalog.validate(SSH, {'SecurityGroupId': 'sg-123; rm -rf /'})
+    with pytest.raises(InvalidRemediation):
+        catalog.validate(SSH, {'SecurityGroupId': 'sg-0123456789abcdef0', 'Extra': '1'})
+    with pytest.raises(InvalidRemediation):
+        catalog.validate('AWS-RunShellScript', {})
+
+
+def test_unavailable_schema_fails_closed_and_is_retried():
+    ssm = FakeSSM(throttled(), CONTENT)
+    catalog = DocumentCatalog(ssm, [SSH], failed_retry_seconds=0.0)
+    with pytest.raises(InvalidRemediation, match='unavailable'):
+        catalog.validate(SSH, {'SecurityGroupId': 'sg-0123456789abcdef0'})
+    assert catalog.validate(SSH, {'SecurityGroupId': 'sg-0123456789abcdef0'})
+    assert ssm.calls == 2
+
+
+def test_loaded_schemas_are_cached_for_the_ttl():
+    ssm = FakeSSM(CONTENT)
+    catalog = DocumentCatalog(ssm, [SSH], failed_retry_seconds=0.0)
+    catalog.validate(SSH, {'SecurityGroupId': 'sg-0123456789abcdef0'})
+    catalog.validate(SSH, {'SecurityGroupId': 'sg-0123456789abcdef0'})
+    assert ssm.calls == 1
@@ -0,0 +1,46 @@
+from jobs import FAILED, SUCCEEDED, JobStore, run_job
+from objectstore import LocalObjectStore
+from store import SQLiteAnalysisStore
+
+
+class FakeChatbot:
+    def __init__(self, result):
+        self.result = result
+
+    def process_chat_message(self, message, on_progress=None):
+        on_progress({'stage': 'findings', 'findings_count': 1})
+        on_progress({'stage': 'finding', 'item': {'finding_id': 'f1'}})
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def job_store(tmp_path):
+    return JobStore(SQLiteAnalysisStore(':memory:'), LocalObjectStore(str(tmp_path)))
+
+
+def test_result_is_kept_out_of_the_job_item(tmp_path):
+    jobs = job_store(tmp_path)
+    job = jobs.create('Analyze all critical findings')
+    result = {'response': 'x' * 500000, 'remediations': [{'finding_id': 'f1'}]}
+
+    run_job(job['job_id'], jobs, FakeChatbot(result))
+
+    stored = jobs.get(job['job_id'])
+    assert stored['status'] == SUCCEEDED
+    assert stored['progress'] == {'findings_total': 1, 'findings_done': 1}
+    assert stored['partial'] == [] and 'result' not in stored
+    assert stored['result_key'] == f"jobs/{job['job_id']}.json"
+    assert jobs.result(stored) == result
+
+
+def test_failed_job_records_the_error(tmp_path):
+    jobs = job_store(tmp_path)
+    job = jobs.create('Analyze all critical findings')
+
+    run_job(job['job_id'], jobs, FakeChatbot(RuntimeError('boom')))
+
+    stored = jobs.get(job['job_id'])
+    assert (stored['status'], stored['error']) == (FAILED, 'boom')
+    assert stored['partial'] == [{'finding_id': 'f1'}]
+    assert jobs.result(stored) is None
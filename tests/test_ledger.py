@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from ledger import DONE, IN_PROGRESS, LEDGER, RemediationLedger, ledger_key
+from store import SQLiteAnalysisStore
+
+
+@pytest.fixture
+def ledger():
+    return RemediationLedger(SQLiteAnalysisStore(':memory:'), wait_seconds=0.5, poll_interval=0.01)
+
+
+def test_key_ignores_parameter_order():
+    assert ledger_key('sg-1', 'doc', {'a': 1, 'b': 2}) == ledger_key('sg-1', 'doc', {'b': 2, 'a': 1})
+    assert ledger_key('sg-1', 'doc', {'a': 1}) != ledger_key('sg-2', 'doc', {'a': 1})
+
+
+def test_second_run_attaches_to_result(ledger):
+    calls = []
+
+    def send():
+        calls.append(1)
+        return {'status': 'submitted', 'command_id': 'cmd-1'}
+
+    assert ledger.run('k', send) == ({'status': 'submitted', 'command_id': 'cmd-1'}, 'executed')
+    assert ledger.run('k', send) == ({'status': 'submitted', 'command_id': 'cmd-1'}, 'attached')
+    assert len(calls) == 1
+    assert ledger.store.get(LEDGER, 'k')['state'] == DONE
+
+
+def test_concurrent_runs_execute_once(ledger):
+    started = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def send():
+        started.set()
+        release.wait(1)
+        return {'status': 'submitted', 'command_id': 'cmd-1'}
+
+    first = threading.Thread(target=lambda: results.append(ledger.run('k', send)))
+    first.start()
+    started.wait(1)
+    assert ledger.store.get(LEDGER, 'k')['state'] == IN_PROGRESS
+    release.set()
+    second = ledger.run('k', send)
+    first.join()
+    assert results[0][1] == 'executed'
+    assert second == ({'status': 'submitted', 'command_id': 'cmd-1'}, 'attached')
+
+
+def test_failures_release_the_key(ledger):
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        ledger.run('k', fail)
+    assert ledger.store.get(LEDGER, 'k') is None
+
+    result, source = ledger.run('k', lambda: {'status': 'error'}, succeeded=lambda r: r['status'] != 'error')
+    assert source == 'executed'
+    assert ledger.store.get(LEDGER, 'k') is None
+    assert ledger.run('k', lambda: {'status': 'submitted'})[1] == 'executed'
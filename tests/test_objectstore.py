@@ -0,0 +1,21 @@
+import pytest
+
+from objectstore import LocalObjectStore, ObjectStore
+
+
+def test_base_object_store_is_abstract():
+    with pytest.raises(TypeError):
+        ObjectStore()
+
+
+def test_local_store_round_trip(tmp_path):
+    store = LocalObjectStore(str(tmp_path))
+    assert store.get('results/a.json') is None
+    store.put('results/a.json', b'{}')
+    assert store.get('results/a.json') == b'{}'
+    assert store.url('results/a.json').startswith('file://')
+
+
+def test_local_store_rejects_keys_outside_its_root(tmp_path):
+    with pytest.raises(ValueError):
+        LocalObjectStore(str(tmp_path / 'root')).put('../escape.json', b'{}')
@@ -0,0 +1,47 @@
+import pytest
+
+from objectstore import LocalObjectStore
+from payload import InvalidCursor, decode_cursor, encode_cursor, paginate, parse_fields, project
+
+
+@pytest.fixture
+def objects(tmp_path):
+    return LocalObjectStore(str(tmp_path))
+
+
+def test_project_keeps_nested_fields():
+    item = {'finding_id': 'f1', 'analysis': {'explanation': 'x', 'parameters': {}}, 'status': 'ok'}
+    assert project(item, parse_fields('finding_id,analysis.explanation')) == {
+        'finding_id': 'f1', 'analysis': {'explanation': 'x'}
+    }
+    assert project(item, parse_fields(None)) is item
+
+
+def test_pages_follow_the_stored_result(objects):
+    result = {'response': 'r', 'remediations': list(range(5))}
+    page, cursor = paginate(result, 2, None, objects)
+    assert page['remediations'] == [0, 1]
+    page, cursor = paginate({}, 2, cursor, objects)
+    assert page['remediations'] == [2, 3]
+    page, cursor = paginate({}, 2, cursor, objects)
+    assert (page['remediations'], cursor) == ([4], None)
+
+
+def test_small_results_are_not_stored(objects, tmp_path):
+    assert paginate({'remediations': [1]}, 2, None, objects) == ({'remediations': [1]}, None)
+    assert not any(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_limit_below_one_is_rejected(objects, limit):
+    with pytest.raises(ValueError):
+        paginate({'remediations': [1, 2]}, limit, None, objects)
+
+
+def test_bad_cursors_are_rejected(objects):
+    with pytest.raises(InvalidCursor):
+        decode_cursor('not-a-cursor')
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor('r', -1))
+    with pytest.raises(InvalidCursor):
+        paginate({}, 2, encode_cursor('missing', 2), objects)
@@ -0,0 +1,128 @@
+from planner import apply_preflight, plan_remediations, security_group_id
+from sgcache import open_ports
+
+ENVIRONMENT = 'dev'
+SSH = f'SecurityHub-RemediateUnrestrictedSSH-{ENVIRONMENT}'
+RDP = f'SecurityHub-RemediateUnrestrictedRDP-{ENVIRONMENT}'
+PORTS = f'SecurityHub-RemediateUnrestrictedPorts-{ENVIRONMENT}'
+
+
+def finding(finding_id, sg_id, severity='HIGH'):
+    return {
+        'Id': finding_id,
+        'Severity': {'Label': severity},
+        'Resources': [{'Id': f'arn:aws:ec2:ap-southeast-2:123456789012:security-group/{sg_id}'}]
+    }
+
+
+def analysis(document, automated=True):
+    return {'ssm_document': document, 'automated': automated}
+
+
+def test_security_group_id_from_resource_arn():
+    assert security_group_id(finding('f1', 'sg-0123')) == 'sg-0123'
+    assert security_group_id({'Resources': [{'Id': 'arn:aws:s3:::bucket'}]}) is None
+
+
+def test_findings_for_one_group_are_merged():
+    plan = plan_remediations([
+        (finding('f1', 'sg-1'), analysis(SSH)),
+        (finding('f2', 'sg-1', 'CRITICAL'), analysis(RDP)),
+        (finding('f3', 'sg-1'), analysis(SSH)),
+        (finding('f4', 'sg-2'), analysis(SSH)),
+        (finding('f5', 'sg-3'), analysis(SSH, automated=False)),
+    ], ENVIRONMENT)
+
+    merged, single = plan['actions']
+    assert merged['document'] == PORTS
+    assert merged['parameters'] == {'SecurityGroupId': 'sg-1', 'Ports': '22,3389'}
+    assert merged['finding_ids'] == ['f1', 'f2', 'f3']
+    assert merged['priority'] > single['priority']
+    assert single['document'] == SSH
+    assert plan['estimate'] == {
+        'findings': 4,
+        'security_groups': 2,
+        'duplicates_removed': 1,
+        'naive_send_command_calls': 4,
+        'planned_send_command_calls': 2,
+        'calls_saved': 2
+    }
+
+
+def test_unmergeable_findings_are_skipped():
+    plan = plan_remediations([({'Id': 'f1', 'Resources': []}, analysis(SSH))], ENVIRONMENT)
+    assert plan['actions'] == []
+    assert [s['finding_id'] for s in plan['skipped']] == ['f1']
+    assert plan['estimate']['planned_send_command_calls'] == 1
+
+
+def merged_plan():
+    return plan_remediations([
+        (finding('f1', 'sg-1'), analysis(SSH)),
+        (finding('f2', 'sg-1'), analysis(RDP)),
+    ], ENVIRONMENT)
+
+
+def test_preflight_narrows_to_ports_still_open():
+    plan = merged_plan()
+    results = apply_preflight(plan, {'sg-1': {'ipv4': {3389}, 'ipv6': {22}, 'broad': set()}}, ENVIRONMENT)
+    assert results == {}
+    action, = plan['actions']
+    assert (action['document'], action['ports'], action['ipv6_ports']) == (RDP, [3389], [22])
+    assert action['parameters'] == {'SecurityGroupId': 'sg-1'}
+
+
+def test_preflight_skips_groups_already_closed():
+    plan = merged_plan()
+    results = apply_preflight(plan, {'sg-1': {'ipv4': set(), 'ipv6': set(), 'broad': set()}}, ENVIRONMENT)
+    assert plan['actions'] == []
+    assert set(results) == {'f1', 'f2'}
+    assert results['f1']['status'] == 'success' and results['f1']['no_op']
+    assert plan['estimate']['planned_send_command_calls'] == 0
+    assert plan['estimate']['calls_saved'] == 2
+
+
+def test_preflight_leaves_ipv6_only_groups_to_a_human():
+    plan = merged_plan()
+    results = apply_preflight(plan, {'sg-1': {'ipv4': set(), 'ipv6': {22}, 'broad': set()}}, ENVIRONMENT)
+    assert plan['actions'] == []
+    assert results['f1']['status'] == 'manual'
+    assert results['f1']['ipv6_ports'] == [22]
+    assert 'no_op' not in results['f1']
+
+
+def test_open_ports_separates_all_traffic_and_port_range_rules():
+    group = {'IpPermissions': [
+        {'IpProtocol': 'tcp', 'FromPort': 22, 'ToPort': 22, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]},
+        {'IpProtocol': 'tcp', 'FromPort': 0, 'ToPort': 65535, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]},
+        {'IpProtocol': '-1', 'Ipv6Ranges': [{'CidrIpv6': '::/0'}]},
+    ]}
+    assert open_ports(group, [22, 3389]) == {'ipv4': {22}, 'ipv6': {22, 3389}, 'broad': {22, 3389}}
+    assert open_ports({'IpPermissions': [{'IpProtocol': '-1', 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}]},
+                      [3389]) == {'ipv4': set(), 'ipv6': set(), 'broad': {3389}}
+
+
+def test_preflight_leaves_port_range_rules_to_a_human():
+    plan = merged_plan()
+    results = apply_preflight(plan, {'sg-1': {'ipv4': set(), 'ipv6': set(), 'broad': {22, 3389}}}, ENVIRONMENT)
+    assert plan['actions'] == []
+    assert results['f1']['status'] == 'manual'
+    assert results['f1']['broad_ports'] == [22, 3389]
+    assert 'no_op' not in results['f1']
+
+
+def test_preflight_keeps_single_port_rules_next_to_a_port_range():
+    plan = merged_plan()
+    results = apply_preflight(plan, {'sg-1': {'ipv4': {22}, 'ipv6': set(), 'broad': {3389}}}, ENVIRONMENT)
+    assert results == {}
+    action, = plan['actions']
+    assert (action['document'], action['ports'], action['broad_ports']) == (SSH, [22], [3389])
+
+
+def test_preflight_reports_missing_groups_and_keeps_unknown_ones():
+    plan = merged_plan()
+    assert apply_preflight(plan, {'sg-1': None}, ENVIRONMENT)['f1']['status'] == 'error'
+
+    plan = merged_plan()
+    assert apply_preflight(plan, {}, ENVIRONMENT) == {}
+    assert len(plan['actions']) == 1
@@ -0,0 +1,33 @@
+import numpy as np
+
+from prioritize import FEATURES, extract_features, prioritize_findings, top_k
+
+
+def finding(title, label='HIGH', tags=None, status='FAILED', **extra):
+    return dict({
+        'Title': title,
+        'Severity': {'Label': label},
+        'Compliance': {'Status': status},
+        'Resources': [{'Tags': tags or {}}],
+    }, **extra)
+
+
+def test_extract_features_columns():
+    features = extract_features([
+        finding('Port 22 open to 0.0.0.0/0', 'CRITICAL', {'Environment': 'prod'}),
+        finding('S3 bucket logging disabled', 'LOW', status='PASSED', Severity={'Normalized': 50}),
+        finding('S3 bucket logging disabled', Network={'Direction': 'IN'}, FirstObservedAt='not a date'),
+    ])
+    assert features.shape == (3, len(FEATURES))
+    np.testing.assert_allclose(features[:, 0], [0.9, 0.5, 0.7])
+    np.testing.assert_array_equal(features[:, 1], [0, 0, 0])
+    np.testing.assert_array_equal(features[:, 2], [1, 0, 1])
+    np.testing.assert_allclose(features[:, 3], [0.8, 0, 0])
+    np.testing.assert_array_equal(features[:, 4], [1, 0, 1])
+
+
+def test_top_k_orders_by_priority():
+    scores = prioritize_findings([finding('logging disabled', 'LOW'), finding('public snapshot', 'CRITICAL'),
+                                  finding('logging disabled', 'MEDIUM')])
+    assert list(top_k(scores, 2)) == [1, 2]
+    assert len(prioritize_findings([])) == 0
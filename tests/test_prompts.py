@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import chatbot
+from providers import FakeProvider
+from prompts import build_system_prompt, estimate_tokens, prompt_caching_minimum, supports_prompt_caching
+
+CACHING_MODEL = 'apac.anthropic.claude-3-7-sonnet-20250219-v1:0'
+HAIKU = 'anthropic.claude-3-haiku-20240307-v1:0'
+
+FINDING = {
+    'Id': 'arn:aws:securityhub:ap-southeast-2:123456789012:finding/1',
+    'Title': 'Security groups should not allow ingress from 0.0.0.0/0 to port 22',
+    'Description': 'This control checks whether security groups allow unrestricted incoming traffic on port 22.',
+    'Severity': {'Label': 'HIGH'},
+    'Compliance': {'Status': 'FAILED', 'SecurityControlId': 'EC2.13'},
+    'Resources': [{'Id': 'arn:aws:ec2:ap-southeast-2:123456789012:security-group/sg-0123456789abcdef0',
+                   'Type': 'AwsEc2SecurityGroup'}]
+}
+
+ANALYSIS = {
+    'remediation_action': 'revoke_sg_rule',
+    'ssm_document': 'SecurityHub-RemediateUnrestrictedSSH-dev',
+    'parameters': {},
+    'explanation': 'Port 22 is open to the internet.',
+    'severity_assessment': 'HIGH',
+    'automated': True
+}
+
+
+@pytest.fixture
+def bot():
+    bot = chatbot.SecurityHubChatbot()
+    bot.prompt_caching = True
+    bot.provider = FakeProvider(lambda request: {'tool_use': {'toolUseId': 't1', 'name': 'submit_remediation',
+                                                              'input': ANALYSIS}})
+    return bot
+
+
+def test_catalog_lifts_the_prefix_above_the_caching_minimum():
+    prompt = build_system_prompt('dev', structured=False, compact=False, catalog=True)
+    assert estimate_tokens(prompt) >= prompt_caching_minimum(CACHING_MODEL)
+    assert not supports_prompt_caching(CACHING_MODEL, estimate_tokens(build_system_prompt('dev')))
+
+
+def test_checkpoint_is_sent_for_caching_models(bot):
+    bot.analyze_finding_with_ai(FINDING, 'Fix unrestricted SSH access', model_id=CACHING_MODEL)
+    request = bot.provider.requests[-1]
+    assert request['system'][-1] == {'cachePoint': {'type': 'default'}}
+    assert 'Remediation catalog' in request['system'][0]['text']
+    assert 'toolConfig' in request
+
+
+def test_no_checkpoint_or_catalog_for_other_models(bot):
+    bot.analyze_finding_with_ai(FINDING, 'Fix unrestricted SSH access', model_id=HAIKU)
+    request = bot.provider.requests[-1]
+    assert all('cachePoint' not in block for block in request['system'])
+    assert 'Remediation catalog' not in json.dumps(request)
+
+
+def test_caching_can_be_disabled(bot):
+    bot.prompt_caching = False
+    bot.analyze_finding_with_ai(FINDING, 'Fix unrestricted SSH access', model_id=CACHING_MODEL)
+    assert all('cachePoint' not in block for block in bot.provider.requests[-1]['system'])
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from providers import FakeProvider, ModelProvider
+
+TITAN = 'amazon.titan-text-express-v1'
+HAIKU = 'anthropic.claude-3-haiku-20240307-v1:0'
+
+
+def test_base_provider_is_abstract():
+    with pytest.raises(TypeError):
+        ModelProvider()
+
+
+def test_request_carries_system_and_message():
+    request = ModelProvider._build_request(HAIKU, 'system', 'question', 100, 0.1, False, None)
+    assert request['system'] == [{'text': 'system'}]
+    assert request['messages'] == [{'role': 'user', 'content': [{'text': 'question'}]}]
+    assert request['inferenceConfig'] == {'maxTokens': 100, 'temperature': 0.1}
+
+
+def test_system_prompt_is_inlined_for_models_without_system_blocks():
+    request = ModelProvider._build_request(TITAN, 'system', 'question', 100, 0.1, True, None)
+    assert 'system' not in request
+    assert request['messages'][0]['content'][0]['text'] == 'system\n\nquestion'
+
+
+def test_fake_provider_normalizes_responses():
+    provider = FakeProvider(lambda request: json.dumps({'ok': True}))
+    response = provider.converse(HAIKU, 'system', 'question')
+    assert response['text'] == '{"ok": true}'
+    assert response['tool_use'] is None
+    assert set(response['usage']) == {'input_tokens', 'output_tokens',
+                                      'cache_read_input_tokens', 'cache_write_input_tokens'}
+    assert provider.requests[0]['modelId'] == HAIKU
+
+
+def test_batched_calls_reuse_one_worker_pool():
+    provider = FakeProvider(lambda request: 'ok', max_workers=2)
+    requests = [{'model_id': HAIKU, 'system': 's', 'message': str(i)} for i in range(4)]
+    assert [r['text'] for r in provider.converse_batch(requests)] == ['ok'] * 4
+    pool = provider.executor()
+    provider.converse_batch(requests)
+    assert provider.executor() is pool
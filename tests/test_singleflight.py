@@ -0,0 +1,62 @@
+import time
+import threading
+
+import pytest
+
+from singleflight import SingleFlight, request_key
+
+
+def test_results_are_cached():
+    flight = SingleFlight(ttl_seconds=30)
+    assert flight.do('k', lambda: 1) == (1, 'computed')
+    assert flight.do('k', lambda: 2) == (1, 'cache')
+    flight.invalidate('k')
+    assert flight.do('k', lambda: 3) == (3, 'computed')
+
+
+def test_uncacheable_results_are_recomputed():
+    flight = SingleFlight(ttl_seconds=30)
+    flight.do('k', lambda: {'error': 'x'}, cacheable=lambda r: 'error' not in r)
+    assert flight.do('k', lambda: {}, cacheable=lambda r: 'error' not in r)[1] == 'computed'
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return 'result'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('k', compute)))
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=lambda: results.append(flight.do('k', compute)))
+    follower.start()
+    while flight.stats()['coalesced'] == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ['coalesced', 'computed']
+
+
+def test_failures_are_not_cached():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        flight.do('k', fail)
+    assert flight.do('k', lambda: 1) == (1, 'computed')
+
+
+def test_request_key_normalizes_the_message():
+    assert request_key('Show  CRITICAL findings', {}) == request_key('show critical findings', {})
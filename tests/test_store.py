@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from store import ANALYSIS, AnalysisStore, SQLiteAnalysisStore
+
+
+@pytest.fixture
+def store():
+    return SQLiteAnalysisStore(':memory:')
+
+
+def test_base_store_is_abstract():
+    with pytest.raises(TypeError):
+        AnalysisStore()
+
+
+def test_put_is_buffered_until_flush(store):
+    store.put(ANALYSIS, 'a', {'v': 1})
+    assert store.get(ANALYSIS, 'a') == {'v': 1}
+    assert store._batch_get_records([store.make_key(ANALYSIS, 'a')]) == {}
+    assert store.flush() == 1
+    assert store._batch_get_records([store.make_key(ANALYSIS, 'a')])['analysis#a']['data'] == {'v': 1}
+
+
+def test_expired_records_are_not_returned(store, monkeypatch):
+    store.put(ANALYSIS, 'a', {'v': 1}, ttl_seconds=10)
+    store.flush()
+    assert store.get(ANALYSIS, 'a') == {'v': 1}
+    monkeypatch.setattr(time, 'time', lambda: 2 ** 40)
+    assert store.get(ANALYSIS, 'a') is None
+
+
+def test_put_if_absent_only_first_caller_wins(store):
+    assert store.put_if_absent(ANALYSIS, 'k', {'owner': 'first'}, ttl_seconds=60) is None
+    assert store.put_if_absent(ANALYSIS, 'k', {'owner': 'second'}, ttl_seconds=60) == {'owner': 'first'}
+    assert store.get(ANALYSIS, 'k') == {'owner': 'first'}
+
+
+def test_put_if_absent_sees_buffered_writes(store):
+    store.put(ANALYSIS, 'k', {'owner': 'buffered'})
+    assert store.put_if_absent(ANALYSIS, 'k', {'owner': 'new'}) == {'owner': 'buffered'}
+
+
+def test_put_if_absent_replaces_expired_record(store, monkeypatch):
+    assert store.put_if_absent(ANALYSIS, 'k', {'owner': 'old'}, ttl_seconds=1) is None
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 5)
+    assert store.put_if_absent(ANALYSIS, 'k', {'owner': 'new'}, ttl_seconds=60) is None
+    assert store.get(ANALYSIS, 'k') == {'owner': 'new'}
+
+
+def test_delete_removes_stored_and_buffered_records(store):
+    store.put_if_absent(ANALYSIS, 'k', {'owner': 'first'})
+    store.put(ANALYSIS, 'k', {'owner': 'buffered'})
+    store.delete(ANALYSIS, 'k')
+    assert store.get(ANALYSIS, 'k') is None
+    assert store.put_if_absent(ANALYSIS, 'k', {'owner': 'next'}) is None
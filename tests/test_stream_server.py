@@ -0,0 +1,58 @@
+import json
+import threading
+import http.client
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import stream_server
+
+
+@pytest.fixture
+def server(monkeypatch):
+    release = threading.Event()
+
+    def events(chatbot, message, session_id):
+        yield {'stage': 'findings', 'findings_count': 1, 'message': message}
+        release.wait(2)
+        yield {'stage': 'done', 'session_id': session_id}
+
+    monkeypatch.setattr(stream_server, 'SecurityHubChatbot', lambda: None)
+    monkeypatch.setattr(stream_server, 'chat_events', events)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), stream_server.StreamHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1], release
+    release.set()
+    httpd.shutdown()
+
+
+def test_events_are_sent_before_the_analysis_finishes(server):
+    port, release = server
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    conn.request('POST', '/', body=json.dumps({'message': 'show findings', 'session_id': 's1'}),
+                 headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    assert response.getheader('Content-Type') == 'application/x-ndjson'
+
+    # The first event arrives while the second is still blocked
+    assert json.loads(response.readline()) == {'stage': 'findings', 'findings_count': 1,
+                                                  'message': 'show findings'}
+    release.set()
+    rest = [json.loads(line) for line in response.read().decode('utf-8').splitlines() if line]
+    assert rest == [{'stage': 'done', 'session_id': 's1'}]
+
+
+def test_invalid_body_is_rejected(server):
+    port, _ = server
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    conn.request('POST', '/', body='not json', headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    assert response.status == 400
+    assert json.loads(response.read())['message'] == 'Invalid request'
+
+
+def test_readiness_check(server):
+    port, _ = server
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    conn.request('GET', '/')
+    assert conn.getresponse().status == 200
@@ -0,0 +1,40 @@
+import time
+
+from summarize import aggregate_findings, is_summary_request
+
+
+def finding(i, label='HIGH'):
+    return {
+        'Id': f'finding-{i}',
+        'Title': 'S3 general purpose buckets should block public access',
+        'Severity': {'Label': label},
+        'Compliance': {'Status': 'FAILED', 'SecurityControlId': 'S3.8'},
+        'Resources': [{'Id': f'bucket-{i}', 'Type': 'AwsS3Bucket'}]
+    }
+
+
+def test_only_explicit_summary_requests_match():
+    assert is_summary_request('Summarize all my critical findings')
+    assert is_summary_request('Give me a summary of open findings')
+    assert is_summary_request('An overview of my S3 findings')
+    assert not is_summary_request('What is my overall risk from port 22?')
+    assert not is_summary_request('Improve the posture of sg-123')
+
+
+def test_aggregate_findings_groups_and_counts():
+    groups, totals = aggregate_findings([finding(1), finding(2, 'CRITICAL')], 'dev')
+    group, = groups
+    assert (group.control_id, group.resource_type, group.count) == ('S3.8', 'AwsS3Bucket', 2)
+    assert totals['findings'] == 2 and 'truncated' not in totals
+
+
+def test_aggregate_findings_stops_at_the_deadline():
+    def slow_findings():
+        for i in range(100):
+            if i == 3:
+                time.sleep(0.05)
+            yield finding(i)
+
+    groups, totals = aggregate_findings(slow_findings(), 'dev', deadline=time.time() + 0.02)
+    assert totals['findings'] == 3
+    assert totals['truncated']
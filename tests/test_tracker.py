@@ -0,0 +1,30 @@
+from tracker import summarize_invocations
+
+
+def invocations(*statuses):
+    return [{'Status': status} for status in statuses]
+
+
+def test_no_invocations_is_pending():
+    assert summarize_invocations([]) == {'terminal': False, 'command_status': 'Pending', 'instances': {}}
+
+
+def test_all_successful_invocations_succeed():
+    summary = summarize_invocations(invocations('Success', 'Success'))
+    assert summary == {'terminal': True, 'command_status': 'Success', 'instances': {'Success': 2}}
+
+
+def test_running_invocations_are_in_progress():
+    summary = summarize_invocations(invocations('Success', 'InProgress'))
+    assert (summary['terminal'], summary['command_status']) == (False, 'InProgress')
+
+
+def test_most_severe_failure_wins():
+    summary = summarize_invocations(invocations('Success', 'Cancelled', 'TimedOut', 'Failed'))
+    assert (summary['terminal'], summary['command_status']) == (True, 'Failed')
+    assert summarize_invocations(invocations('Cancelled', 'TimedOut'))['command_status'] == 'TimedOut'
+
+
+def test_failure_is_reported_before_other_instances_finish():
+    summary = summarize_invocations(invocations('Failed', 'InProgress'))
+    assert (summary['terminal'], summary['command_status']) == (False, 'Failed')